@@ -7,48 +7,32 @@ This script helps answer:
 2. What value does it have? (1000, or patched value 65535?)
 3. Are our overlay patches loaded in RAM or ignored?
 
-ePSXe savestate format: gzip compressed, RAM at offset 0x1BA (2MB).
+Savestate decoding and RAM caching: tools/savestate.py (ePSXe, DuckStation,
+2 MB RAM dumps).
 """
 
-import gzip
-import struct
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "tools"))
+from mips_search import search, word
+import savestate
+from ram_search import find_values
 
-def decompress_savestate(savestate_path):
-    """Decompress ePSXe savestate and extract RAM."""
-    with gzip.open(savestate_path, 'rb') as f:
-        data = f.read()
-
-    # RAM starts at offset 0x1BA in decompressed data
-    ram_offset = 0x1BA
-    ram_size = 2 * 1024 * 1024  # 2MB
-
-    if len(data) < ram_offset + ram_size:
-        raise ValueError(f"Savestate too small: {len(data)} bytes")
 
-    ram = data[ram_offset:ram_offset + ram_size]
-    print(f"Savestate: {savestate_path.name}")
-    print(f"  Decompressed: {len(data):,} bytes")
-    print(f"  RAM extracted: {len(ram):,} bytes (2MB)")
-    return ram
+def decompress_savestate(savestate_path):
+    """RAM of a savestate (decompressed once, then mapped from the cache)."""
+    state = savestate.load(savestate_path)
+    print(f"Savestate: {savestate_path.name} ({state.format})")
+    print(f"  RAM: {len(state.ram):,} bytes (2MB)")
+    return state.ram
 
 
 def search_timer_values(ram, target_values):
     """Search RAM for timer values (as halfwords)."""
-    matches = {}
-
-    for value in target_values:
-        value_name = f"{value} (0x{value:04X})"
-        matches[value_name] = []
-
-        for i in range(0, len(ram) - 2, 2):
-            hw = struct.unpack_from('<H', ram, i)[0]
-            if hw == value:
-                ram_addr = 0x80000000 + i
-                matches[value_name].append(ram_addr)
-
-    return matches
+    # Last halfword excluded, as the old range(0, len(ram) - 2, 2) scan
+    found = find_values(ram, target_values, "u16", end=len(ram) - 2)
+    return {f"{value} (0x{value:04X})": addrs for value, addrs in found.items()}
 
 
 def check_overlay_patches(ram):
@@ -65,23 +49,18 @@ def check_overlay_patches(ram):
     original = 0x240203E8
     patched = 0x2402FFFF
 
-    original_count = 0
-    patched_count = 0
-
-    for i in range(0, len(ram) - 4, 4):
-        word = struct.unpack_from('<I', ram, i)[0]
-
-        if word == original:
-            ram_addr = 0x80000000 + i
-            original_count += 1
-            if original_count <= 5:
-                print(f"  ORIGINAL found at RAM 0x{ram_addr:08X}")
+    # Last word excluded, as the old range(0, len(ram) - 4, 4) scan
+    hits = [(m.offset, "ORIGINAL") for m in search(ram, [word(original)], end=len(ram) - 4)]
+    hits += [(m.offset, "PATCHED") for m in search(ram, [word(patched)], end=len(ram) - 4)]
 
-        elif word == patched:
-            ram_addr = 0x80000000 + i
-            patched_count += 1
-            if patched_count <= 5:
-                print(f"  PATCHED found at RAM 0x{ram_addr:08X}")
+    counts = {"ORIGINAL": 0, "PATCHED": 0}
+    for i, kind in sorted(hits):
+        ram_addr = 0x80000000 + i
+        counts[kind] += 1
+        if counts[kind] <= 5:
+            print(f"  {kind} found at RAM 0x{ram_addr:08X}")
+    original_count = counts["ORIGINAL"]
+    patched_count = counts["PATCHED"]
 
     print()
     print(f"  Total ORIGINAL instructions: {original_count}")
@@ -124,6 +103,8 @@ def main():
     if len(savestate_files) == 1:
         savestate_path = savestate_files[0]
     else:
+        print("  (to narrow the timer across them: py -3 tools/ram_search.py "
+              "--step A.gpz \"== 1000\" --step B.gpz \"dec\" ...)")
         choice = int(input("\nSelect savestate number: ")) - 1
         savestate_path = savestate_files[choice]
 
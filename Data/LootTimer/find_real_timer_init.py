@@ -11,20 +11,17 @@ This script finds which of the 2918 data table entries are loaded in RAM,
 so we can patch the RIGHT data tables instead of code immediates.
 """
 
-import gzip
 import struct
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "tools"))
+import savestate
+
 
 def decompress_savestate(savestate_path):
-    """Decompress ePSXe savestate and extract RAM."""
-    with gzip.open(savestate_path, 'rb') as f:
-        data = f.read()
-
-    ram_offset = 0x1BA
-    ram_size = 2 * 1024 * 1024
-    ram = data[ram_offset:ram_offset + ram_size]
-    return ram
+    """RAM of a savestate (decompressed once, then mapped from the cache)."""
+    return savestate.load(savestate_path).ram
 
 
 def find_timer_1000_in_ram(ram):
@@ -10,8 +10,12 @@ to resolve the contradiction.
 """
 
 import struct
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "tools"))
+from mips_search import lhu, search, sh, word
+
 
 def disasm_simple(word):
     """Simple MIPS disassembly for common instructions."""
@@ -65,31 +69,14 @@ def disasm_simple(word):
 
 def find_timer_patterns(data):
     """Find the v10 chest timer decrement patterns."""
-    matches = []
-
     # v10 pattern: lhu 0x14 / nop / addiu -1 / sh 0x14 / ... / lui 0x0200
-    for i in range(0, len(data) - 28, 4):
-        pre2 = struct.unpack_from('<I', data, i)[0]
-        pre1 = struct.unpack_from('<I', data, i + 4)[0]
-        target = struct.unpack_from('<I', data, i + 8)[0]
-        post1 = struct.unpack_from('<I', data, i + 12)[0]
-
-        # Check pattern
-        if (pre1 != 0x00000000 or  # nop
-            target != 0x2442FFFF or  # addiu $v0,$v0,-1
-            (pre2 >> 26) != 0x25 or  # lhu
-            (post1 >> 26) != 0x29):  # sh
-            continue
-
-        # Check offsets
-        pre2_offset = pre2 & 0xFFFF
-        post1_offset = post1 & 0xFFFF
-
-        # Both should be 0x14 according to v10
-        if pre2_offset == 0x0014 and post1_offset == 0x0014:
-            matches.append(i)
-
-    return matches
+    pattern = [
+        lhu(imm=0x14),
+        word(0x00000000),       # nop
+        word(0x2442FFFF),       # addiu $v0,$v0,-1
+        sh(imm=0x14),
+    ]
+    return [m.offset for m in search(data, pattern) if m.offset < len(data) - 28]
 
 
 def analyze_context(data, offset, context_size=80):
@@ -7,11 +7,14 @@ This no-op version allows the build to complete without timer patches.
 """
 
 import sys
-from pathlib import Path
 
-def main():
-    script_dir = Path(__file__).parent
+def patch_data(data):
+    """Build stage entry point: nothing to patch, data is left untouched."""
+    print_status()
+    return 0
+
 
+def print_status():
     print("="*60)
     print("Loot Timer Patcher: DISABLED")
     print("="*60)
@@ -20,6 +23,10 @@ def main():
     print("  Reason: 13 attempts failed, v13-v14 affected enemy damage")
     print("="*60)
 
+
+def main():
+    print_status()
+
     # Exit successfully without patching
     sys.exit(0)
 
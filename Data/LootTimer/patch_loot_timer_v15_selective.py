@@ -25,6 +25,11 @@ import struct
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'tools'))
+
+import disc_sector
+import iso9660
+
 OLD_VALUE = 1000  # Original value to find
 
 # Grouped offsets
@@ -81,11 +86,12 @@ def main():
         print(f"[ERROR] BIN not found: {bin_path}")
         sys.exit(1)
 
-    # SLES_008.45 at LBA 295081
+    # SLES_008.45 LBA from the disc directory (295081 on the EU disc)
     SECTOR_SIZE = 2352
     DATA_OFFSET_IN_SECTOR = 24
     DATA_SIZE_IN_SECTOR = 2048
-    SLES_LBA = 295081
+    SLES_LBA = iso9660.find_file(bin_path, 'SLES_008.45').lba
+    print(f"  SLES_008.45 at LBA {SLES_LBA}")
 
     data = bytearray(bin_path.read_bytes())
     print(f"  BIN size: {len(data):,} bytes")
@@ -93,6 +99,7 @@ def main():
 
     patched = 0
     skipped = 0
+    touched_lbas = set()
 
     for sles_offset in offsets_to_patch:
         # Calculate BIN offset
@@ -115,6 +122,7 @@ def main():
 
         # Patch
         struct.pack_into('<H', data, bin_offset, new_value)
+        touched_lbas.add(lba)
         patched += 1
         print(f"  PATCH SLES 0x{sles_offset:06X} (RAM 0x{ram_addr:08X}): {current} -> {new_value}")
 
@@ -124,6 +132,9 @@ def main():
         print(f"  All {len(offsets_to_patch)} values already patched")
         print(f"{'='*60}")
     else:
+        # Modified sectors need fresh EDC/ECC or the drive reports read errors
+        disc_sector.regenerate_in_buffer(data, touched_lbas)
+        print(f"  EDC/ECC regenerated for {len(touched_lbas)} sector(s)")
         bin_path.write_bytes(data)
         print()
         print(f"{'='*60}")
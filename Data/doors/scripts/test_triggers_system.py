@@ -23,10 +23,22 @@ import json
 import sys
 import shutil
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "tools"))
+import iso9660
+
+GAME_BIN = Path("../../../Blaze  Blade - Eternal Quest (Europe)/Blaze & Blade - Eternal Quest (Europe).bin")
 LEVELS_DAT = Path("../../../Blaze  Blade - Eternal Quest (Europe)/extract/LEVELS.DAT")
 OUTPUT_DIR = Path("../trigger_tests")
 TRIGGERS_DB = OUTPUT_DIR / "triggers_database.json"
 
+def read_levels_dat():
+    """LEVELS.DAT lu dans le BIN (repertoire ISO9660), sinon la copie extraite"""
+    if GAME_BIN.exists():
+        return iso9660.read_file(GAME_BIN, "LEVELS.DAT")
+    if LEVELS_DAT.exists():
+        return LEVELS_DAT.read_bytes()
+    return None
+
 def extract_all_triggers(data):
     """Extrait TOUS les triggers candidats de LEVELS.DAT"""
     print("=" * 70)
@@ -141,7 +153,11 @@ def create_test_patch(group_num):
     print(f"Nombre de triggers à désactiver: {len(trigger_ids)}")
 
     # Lire LEVELS.DAT
-    data = bytearray(LEVELS_DAT.read_bytes())
+    data = read_levels_dat()
+    if data is None:
+        print(f"ERREUR: ni {GAME_BIN} ni {LEVELS_DAT} trouvés!")
+        return
+    data = bytearray(data)
 
     # Patcher les triggers du groupe
     disabled_count = 0
@@ -224,7 +240,11 @@ def disable_specific_trigger(trigger_id):
     print(f"  Type: {trigger['type']}, Dest: {trigger['dest']}, Flags: 0x{trigger['flags']:04X}")
 
     # Patcher
-    data = bytearray(LEVELS_DAT.read_bytes())
+    data = read_levels_dat()
+    if data is None:
+        print(f"ERREUR: ni {GAME_BIN} ni {LEVELS_DAT} trouvés!")
+        return
+    data = bytearray(data)
 
     offset = trigger['offset']
     struct.pack_into('<h', data, offset, 9999)
@@ -278,11 +298,11 @@ def main():
     command = sys.argv[1]
 
     if command == 'extract':
-        if not LEVELS_DAT.exists():
-            print(f"ERREUR: {LEVELS_DAT} introuvable!")
+        data = read_levels_dat()
+        if data is None:
+            print(f"ERREUR: ni {GAME_BIN} ni {LEVELS_DAT} trouvés!")
             return
 
-        data = LEVELS_DAT.read_bytes()
         triggers = extract_all_triggers(data)
         save_triggers_database(triggers)
 
@@ -13,6 +13,10 @@ import json
 import sys
 import os
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tools'))
+
+from patch_journal import tagged
+
 # Shop data offsets in BLAZE.ALL (10 copies for different game areas)
 SHOP_OFFSETS = [
     0x00B1443C,
@@ -29,6 +33,9 @@ SHOP_OFFSETS = [
 
 NUM_ITEMS = 23  # Number of items in the shop
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+JSON_PATH = os.path.join(SCRIPT_DIR, 'fate_coin_shop.json')
+
 
 def get_item_name(item_data):
     """Get item name from item data (handles both formats)."""
@@ -48,8 +55,8 @@ def load_shop_data(json_path):
         return json.load(f)
 
 
-def patch_blaze_all(blaze_path, shop_data, dry_run=False):
-    """Patch BLAZE.ALL with new shop prices."""
+def patch_shop_prices(data, shop_data, dry_run=False):
+    """Patch shop prices into an in-memory BLAZE.ALL buffer."""
 
     # Build price array from shop data
     items = shop_data['items']
@@ -79,15 +86,28 @@ def patch_blaze_all(blaze_path, shop_data, dry_run=False):
         print("DRY RUN - No changes written")
         return True
 
+    # Patch all locations
+    for offset in SHOP_OFFSETS:
+        print(f"Patching offset 0x{offset:08X}...")
+        with tagged(data, f"fate_coin_shop.json @0x{offset:08X}"):
+            for i, price in enumerate(prices):
+                data[offset + i] = price
+
+    return True
+
+
+def patch_blaze_all(blaze_path, shop_data, dry_run=False):
+    """Patch BLAZE.ALL with new shop prices."""
+
     # Read BLAZE.ALL
     with open(blaze_path, 'rb') as f:
         data = bytearray(f.read())
 
-    # Patch all locations
-    for offset in SHOP_OFFSETS:
-        print(f"Patching offset 0x{offset:08X}...")
-        for i, price in enumerate(prices):
-            data[offset + i] = price
+    if not patch_shop_prices(data, shop_data, dry_run):
+        return False
+
+    if dry_run:
+        return True
 
     # Write back
     with open(blaze_path, 'wb') as f:
@@ -97,11 +117,27 @@ def patch_blaze_all(blaze_path, shop_data, dry_run=False):
     return True
 
 
+def patch_data(data):
+    """Build stage entry point: patch an already loaded BLAZE.ALL buffer.
+
+    Returns 0 on success, 1 on error (same codes as main()).
+    """
+    if not os.path.exists(JSON_PATH):
+        print(f"Error: {JSON_PATH} not found")
+        return 1
+
+    shop_data = load_shop_data(JSON_PATH)
+    if not patch_shop_prices(data, shop_data):
+        return 1
+
+    print(f"\nPatched {len(SHOP_OFFSETS)} locations")
+    return 0
+
+
 def main():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(os.path.dirname(script_dir))
+    project_root = os.path.dirname(os.path.dirname(SCRIPT_DIR))
 
-    json_path = os.path.join(script_dir, 'fate_coin_shop.json')
+    json_path = JSON_PATH
     blaze_path = os.path.join(project_root, 'output', 'BLAZE.ALL')
 
     dry_run = '--dry-run' in sys.argv or '-n' in sys.argv
@@ -12,22 +12,38 @@ All three types use the same 32-byte record format (26 data + 6 FF terminator):
 Output: Data/formations/<level_key>/<area_key>.json
 """
 
-import struct
 import json
 import os
 import re
+import sys
 from pathlib import Path
 
+import numpy as np
+
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent.parent.parent
 SPAWN_GROUPS_DIR = PROJECT_ROOT / "WIP" / "level_design" / "spawns" / "data" / "spawn_groups"
 OUTPUT_DIR = SCRIPT_DIR.parent
 
+sys.path.insert(0, str(PROJECT_ROOT / "tools"))
+
+import blaze_index
+
 BLAZE_ALL = PROJECT_ROOT / "output" / "BLAZE.ALL"
 if not BLAZE_ALL.exists():
     BLAZE_ALL = PROJECT_ROOT / "Blaze  Blade - Eternal Quest (Europe)" / "extract" / "BLAZE.ALL"
 
 
+# 32-byte record (26 data bytes + 6 FF terminator)
+RECORD = np.dtype({
+    'names': ['byte0', 'inner_ff', 'byte8', 'byte9', 'byte10', 'byte11',
+              'x', 'y', 'z', 'area_id'],
+    'formats': ['u1', '<u4', 'u1', 'u1', 'u1', 'u1', '<i2', '<i2', '<i2', '<u2'],
+    'offsets': [0, 4, 8, 9, 10, 11, 12, 14, 16, 24],
+    'itemsize': 32,
+})
+
+
 def area_name_to_key(name):
     """Convert area name to filename-safe key. e.g. 'Floor 1 - Area 2' -> 'floor_1_area_2'"""
     return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
@@ -63,89 +79,69 @@ def scan_records(blaze_data, group_offset, num_monsters, scan_end):
 
     Returns (formations, spawn_points, zone_spawns) where each is a list of
     raw record dicts ready for grouping.
+
+    The 6-byte FF terminators are found from the runs of 0xFF bytes (a run
+    of L bytes holds L // 6 terminators, as a left-to-right scan finds
+    them), and the candidate records are decoded and filtered as a NumPy
+    structured array; dicts are only built for the records kept.
     """
     script_start = group_offset + num_monsters * 96
     scan_size = scan_end - script_start
     if scan_size <= 0:
         return [], [], []
 
-    data = blaze_data[script_start:scan_end]
-
-    # Find all 6-byte FF blocks (record terminators) in one pass
-    ff6_positions = []
-    i = 0
-    while i < len(data) - 5:
-        if data[i:i+6] == b'\xff\xff\xff\xff\xff\xff':
-            ff6_positions.append(i)
-            i += 6
-        else:
-            i += 1
+    data = np.frombuffer(blaze_data, dtype=np.uint8,
+                         count=max(0, min(scan_end, len(blaze_data)) - script_start),
+                         offset=script_start)
+
+    # Runs of 0xFF: start and length, then every 6th byte of the long ones
+    is_ff = np.concatenate(([False], data == 0xFF, [False]))
+    edges = np.flatnonzero(is_ff[1:] != is_ff[:-1])
+    run_start, run_len = edges[0::2], edges[1::2] - edges[0::2]
+    count = run_len // 6
+    ff6_positions = (np.repeat(run_start, count)
+                     + 6 * (np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)))
+
+    rec_starts = ff6_positions[ff6_positions >= 26] - 26
+    recs = data[rec_starts[:, None] + np.arange(32)].view(RECORD)[:, 0]
+    coords = np.stack([recs['x'], recs['y'], recs['z']], axis=1)
+
+    # Reject false positives from FF-dense data regions:
+    # - byte10_11 containing 0xFF (legit records use small values)
+    # - any coordinate with |value| > 15000 (outside game world)
+    keep = ((recs['byte8'] < num_monsters)
+            & (recs['byte10'] != 0xFF) & (recs['byte11'] != 0xFF)
+            & (np.abs(coords.astype(np.int32)) <= 15000).all(axis=1))
+    zero = (coords == 0).all(axis=1)
+    kind = np.where(recs['byte9'] == 0x0B, np.where(zero, 0, 2),
+                    np.where(recs['byte9'] == 0xFF, np.where(zero, 1, 3), 0))
+    kind[~keep] = 0
 
     formations = []
     spawn_points = []
     zone_spawns = []
 
-    for ff_pos in ff6_positions:
-        rec_start = ff_pos - 26
-        if rec_start < 0:
-            continue
-        rec = data[rec_start:ff_pos + 6]
-        if len(rec) != 32:
-            continue
-
-        byte8 = rec[8]
-        byte9 = rec[9]
-        if byte8 >= num_monsters:
-            continue
-
-        coord = (
-            struct.unpack_from('<h', rec, 12)[0],
-            struct.unpack_from('<h', rec, 14)[0],
-            struct.unpack_from('<h', rec, 16)[0],
-        )
-        has_inner_ff = (rec[4:8] == b'\xff\xff\xff\xff')
-        abs_offset = script_start + rec_start
-
-        # Reject false positives from FF-dense data regions:
-        # - byte10_11 containing 0xFF (legit records use small values)
-        # - any coordinate with |value| > 15000 (outside game world)
-        byte10_11 = rec[10:12]
-        if 0xFF in byte10_11:
-            continue
-        if any(abs(c) > 15000 for c in coord):
+    for k in np.flatnonzero(kind).tolist():
+        rec_start = int(rec_starts[k])
+        rec = blaze_data[script_start + rec_start:script_start + rec_start + 32]
+        entry = {
+            'abs_offset': script_start + rec_start,
+            'byte0': rec[0],
+            'byte8': rec[8],
+        }
+        if kind[k] == 1:
+            # Formation template: byte9=0xFF, coords=(0,0,0)
+            entry['area_id'] = rec[24:26]
+            entry['is_group_start'] = bool(recs['inner_ff'][k] == 0xFFFFFFFF)
+            formations.append(entry)
             continue
-
-        if byte9 == 0xFF and coord == (0, 0, 0):
-            # Formation template
-            formations.append({
-                'abs_offset': abs_offset,
-                'byte0': rec[0],
-                'byte8': byte8,
-                'area_id': rec[24:26],
-                'is_group_start': has_inner_ff,
-            })
-        elif byte9 == 0x0B and coord != (0, 0, 0):
-            # Direct spawn point
-            spawn_points.append({
-                'abs_offset': abs_offset,
-                'byte0': rec[0],
-                'byte8': byte8,
-                'byte10_11': byte10_11,
-                'x': coord[0], 'y': coord[1], 'z': coord[2],
-                'area_id': rec[24:26],
-                'is_group_start': has_inner_ff,
-            })
-        elif byte9 == 0xFF and coord != (0, 0, 0):
-            # Zone spawn (0xFF marker with real coordinates)
-            zone_spawns.append({
-                'abs_offset': abs_offset,
-                'byte0': rec[0],
-                'byte8': byte8,
-                'byte10_11': byte10_11,
-                'x': coord[0], 'y': coord[1], 'z': coord[2],
-                'area_id': rec[24:26],
-                'is_group_start': has_inner_ff,
-            })
+        # Direct spawn point (byte9=0x0B) / zone spawn (0xFF marker with
+        # real coordinates)
+        entry['byte10_11'] = rec[10:12]
+        entry['x'], entry['y'], entry['z'] = coords[k].tolist()
+        entry['area_id'] = rec[24:26]
+        entry['is_group_start'] = bool(recs['inner_ff'][k] == 0xFFFFFFFF)
+        (spawn_points if kind[k] == 2 else zone_spawns).append(entry)
 
     return formations, spawn_points, zone_spawns
 
@@ -246,6 +242,7 @@ def main():
     print("Loading BLAZE.ALL from {}...".format(BLAZE_ALL))
     blaze_data = BLAZE_ALL.read_bytes()
     print("  Size: {:,} bytes".format(len(blaze_data)))
+    index = blaze_index.get(blaze_data)
 
     levels = load_all_spawn_groups()
     print("  Levels: {}".format(len(levels)))
@@ -276,8 +273,8 @@ def main():
             else:
                 scan_end = offset + num_monsters * 96 + 32768
 
-            f_recs, sp_recs, zs_recs = scan_records(
-                blaze_data, offset, num_monsters, scan_end)
+            f_recs, sp_recs, zs_recs = index.call(
+                scan_records, offset, num_monsters, scan_end)
             formations = group_records(f_recs)
             sp_groups = group_records(sp_recs)
             zs_groups = group_records(zs_recs)
@@ -412,6 +409,7 @@ def main():
 
         print()
 
+    index.save()
     print("Done! {} area JSONs written to {}".format(total_files, OUTPUT_DIR))
 
 
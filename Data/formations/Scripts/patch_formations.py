@@ -20,10 +20,19 @@ Usage: py -3 Data/formations/patch_formations.py
 
 import json
 import struct
+import sys
 from pathlib import Path
 
+import numpy as np
+
 SCRIPT_DIR = Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent.parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "tools"))
+
+import blaze_index
+from area_layout import AreaLayout
+from patch_journal import tagged
+
 BLAZE_ALL = PROJECT_ROOT / "output" / "BLAZE.ALL"
 FORMATIONS_DIR = SCRIPT_DIR.parent
 
@@ -54,33 +63,33 @@ def parse_original_formation_sizes(data, formation_start, formation_bytes):
     using the gaps between starts.
 
     Returns list of record counts (one per formation), e.g. [3, 3, 2, 4].
+    During a build it is parsed once per area from the BLAZE.ALL index
+    (see update_offset_table()).
     """
-    # Find all formation-start positions by scanning for the combined
-    # signature: byte[4:8]=FFFFFFFF, byte[9]=0xFF, byte[26:32]=FF*6
-    starts = []
-    end = formation_start + formation_bytes
-    for pos in range(formation_start, end - 31):
-        if (data[pos + 4:pos + 8] == b'\xff\xff\xff\xff'
-                and data[pos + 9] == 0xFF
-                and data[pos + 26:pos + 32] == b'\xff\xff\xff\xff\xff\xff'):
-            starts.append(pos)
-
-    if not starts:
+    # Find all formation-start positions by testing the combined signature
+    # byte[4:8]=FFFFFFFF, byte[9]=0xFF, byte[26:32]=FF*6 at every offset at
+    # once: runs of FF bytes are counted with a cumulative sum
+    area = np.frombuffer(data, dtype=np.uint8, offset=formation_start,
+                         count=max(0, min(formation_bytes, len(data) - formation_start)))
+    positions = area.size - 31
+    if positions <= 0:
+        return []
+    ff = area == 0xFF
+    ff_count = np.concatenate(([0], np.cumsum(ff)))
+    pos = np.arange(positions)
+    is_start = ((ff_count[pos + 8] - ff_count[pos + 4] == 4)
+                & ff[9:9 + positions]
+                & (ff_count[pos + 32] - ff_count[pos + 26] == 6))
+    starts = np.flatnonzero(is_start)
+    if starts.size == 0:
         return []
 
     # Derive sizes from gaps between consecutive starts
-    sizes = []
-    for i in range(len(starts)):
-        if i + 1 < len(starts):
-            gap = starts[i + 1] - starts[i]
-        else:
-            gap = (formation_start + formation_bytes) - starts[i]
-        # gap = num_records * 32 + 4 (suffix)
-        if (gap - SUFFIX_SIZE) % RECORD_SIZE != 0:
-            return []  # alignment error
-        sizes.append((gap - SUFFIX_SIZE) // RECORD_SIZE)
-
-    return sizes
+    # gap = num_records * 32 + 4 (suffix)
+    gaps = np.diff(np.append(starts, formation_bytes))
+    if ((gaps - SUFFIX_SIZE) % RECORD_SIZE != 0).any():
+        return []  # alignment error
+    return ((gaps - SUFFIX_SIZE) // RECORD_SIZE).tolist()
 
 
 def read_offset_table(data, script_start, script_size):
@@ -163,7 +172,8 @@ def find_fm_entries_in_table(table_entries, original_byte_sizes,
     return None
 
 
-def update_offset_table(data, area, user_byte_sizes, filler_sources=None):
+def update_offset_table(data, area, user_byte_sizes, filler_sources=None,
+                        index=None):
     """Update formation offsets in the script area offset table.
 
     Must be called BEFORE writing new formation data (needs original binary).
@@ -172,6 +182,8 @@ def update_offset_table(data, area, user_byte_sizes, filler_sources=None):
                     entry duplicates. Filler binary data stays in the area
                     (as FFFFFFFF termination barriers) but the offset table
                     entries point back to user formations.
+    index: BLAZE.ALL index (tools/blaze_index.py) of the unpatched image;
+           the original formation sizes are parsed once per area from it.
 
     Returns (updated: bool, message: str).
     """
@@ -210,8 +222,12 @@ def update_offset_table(data, area, user_byte_sizes, filler_sources=None):
     # Find FM start index in the offset table.
     # Method 1: match consecutive diffs against parsed binary sizes.
     fm_start_idx = None
-    original_sizes = parse_original_formation_sizes(
-        data, formation_start, formation_bytes)
+    if index is not None:
+        original_sizes = index.call(
+            parse_original_formation_sizes, formation_start, formation_bytes)
+    else:
+        original_sizes = parse_original_formation_sizes(
+            data, formation_start, formation_bytes)
     if original_sizes:
         original_byte_sizes = [s * RECORD_SIZE + SUFFIX_SIZE
                                for s in original_sizes]
@@ -259,7 +275,7 @@ def update_offset_table(data, area, user_byte_sizes, filler_sources=None):
     # Write new values back to binary
     for i, val in enumerate(new_values):
         offset = script_start + (fm_start_idx + i) * 4
-        struct.pack_into('<I', data, offset, val)
+        data[offset:offset + 4] = struct.pack('<I', val)
 
     msg = "entries [{}..{}] updated ({} formations".format(
         fm_start_idx, fm_start_idx + len(new_values) - 1,
@@ -506,8 +522,8 @@ def patch_placed_records(data, area, section_key="spawn_points"):
                 data[offset + 8] = slot
                 rec_changed = True
             if old_coord != (new_x, new_y, new_z):
-                struct.pack_into('<hhh', data, offset + 12,
-                                 new_x, new_y, new_z)
+                data[offset + 12:offset + 18] = struct.pack(
+                    '<hhh', new_x, new_y, new_z)
                 rec_changed = True
             if old_byte0 != new_byte0:
                 data[offset] = new_byte0
@@ -525,7 +541,7 @@ def patch_placed_records(data, area, section_key="spawn_points"):
     return changed, False
 
 
-def patch_area(data, area):
+def patch_area(data, area, index=None):
     """Rewrite the formation area for one area. Returns (changed, error)."""
     formations = area.get("formations", [])
     area_start_hex = area.get("formation_area_start")
@@ -630,7 +646,7 @@ def patch_area(data, area):
 
     # Update the offset table in the script area BEFORE writing formations
     tbl_updated, tbl_msg = update_offset_table(
-        data, area, user_byte_sizes, filler_sources)
+        data, area, user_byte_sizes, filler_sources, index)
     if tbl_updated:
         print("    offset table: {}".format(tbl_msg))
     elif tbl_msg not in ("sizes unchanged", "missing offsets"):
@@ -699,7 +715,7 @@ def load_monster_stats():
     return result if result else None
 
 
-def patch_monster_overrides(data, area, monster_db):
+def patch_monster_overrides(data, area, monster_db, index=None):
     """Apply per-slot monster overrides (elite, stats, name, Type-07, L, visual swap).
 
     Reads 'monster_overrides' from the area JSON. Each entry (per slot) can be:
@@ -720,6 +736,9 @@ def patch_monster_overrides(data, area, monster_db):
     Elite multipliers (applied from monster_db original stats):
       HP x2, magic x2, armor x2, dmg x1.5
 
+    Structure offsets come from one AreaLayout (tools/area_layout.py) per
+    area; index is the BLAZE.ALL index its assignment scan goes through.
+
     Returns (changed_count, error_flag).
     """
     overrides = area.get("monster_overrides")
@@ -734,8 +753,8 @@ def patch_monster_overrides(data, area, monster_db):
     if not group_offset_hex or not monsters:
         return 0, False
 
-    group_offset = int(group_offset_hex, 16)
-    num_monsters = len(monsters)
+    layout = AreaLayout(data, area, index)
+    num_monsters = layout.num_monsters
 
     # Parse floor key for monster_db lookup
     parts = area_name.split(" - ")
@@ -755,7 +774,7 @@ def patch_monster_overrides(data, area, monster_db):
             return changed, True
 
         slot_name = monsters[slot_idx]
-        stat_offset = group_offset + slot_idx * 96
+        stat_offset = layout.stat_entry(slot_idx)
         changes = []
 
         # --- Full monster swap from monster_stats ---
@@ -783,8 +802,7 @@ def patch_monster_overrides(data, area, monster_db):
             # Write L value in assignment entry
             if "L" in floor_data:
                 new_L = floor_data["L"]
-                assign_off = _find_assign_entry_offset(
-                    data, group_offset, num_monsters, slot_idx)
+                assign_off = layout.assign_entry(slot_idx)
                 if assign_off is not None:
                     old_L = data[assign_off + 1]
                     if old_L != new_L:
@@ -793,8 +811,7 @@ def patch_monster_overrides(data, area, monster_db):
 
             # Write R value
             if "R" in floor_data:
-                assign_off = _find_assign_entry_offset(
-                    data, group_offset, num_monsters, slot_idx)
+                assign_off = layout.assign_entry(slot_idx)
                 if assign_off is not None:
                     new_R = floor_data["R"]
                     old_R = data[assign_off + 5]
@@ -813,7 +830,7 @@ def patch_monster_overrides(data, area, monster_db):
 
             # Write Type-07 VRAM offset and idx
             if "type07_vram" in floor_data:
-                _patch_type07(data, area, slot_idx,
+                _patch_type07(data, layout, slot_idx,
                               floor_data["type07_vram"],
                               floor_data.get("type07_idx"),
                               changes)
@@ -841,7 +858,7 @@ def patch_monster_overrides(data, area, monster_db):
                 abs_off = stat_offset + field_off
                 old_val = struct.unpack_from('<H', data, abs_off)[0]
                 if old_val != new_val:
-                    struct.pack_into('<H', data, abs_off, new_val)
+                    data[abs_off:abs_off + 2] = struct.pack('<H', new_val)
                     changes.append("{}:{}->{}(x{})".format(
                         json_key, old_val, new_val, mult))
 
@@ -849,7 +866,7 @@ def patch_monster_overrides(data, area, monster_db):
             abs_off = stat_offset + 0x26
             old_at = struct.unpack_from('<H', data, abs_off)[0]
             if old_at != 32768:
-                struct.pack_into('<H', data, abs_off, 32768)
+                data[abs_off:abs_off + 2] = struct.pack('<H', 32768)
                 changes.append("armor_type:{}->32768".format(old_at))
 
             # Prepend "E-" to the 16-byte name field
@@ -882,7 +899,7 @@ def patch_monster_overrides(data, area, monster_db):
                 old_val = struct.unpack_from('<H', data, abs_off)[0]
                 new_val = int(value) & 0xFFFF
                 if old_val != new_val:
-                    struct.pack_into('<H', data, abs_off, new_val)
+                    data[abs_off:abs_off + 2] = struct.pack('<H', new_val)
                     disp = field_name
                     for n, o in STAT_NAME_TO_OFFSET.items():
                         if o == field_off:
@@ -903,8 +920,7 @@ def patch_monster_overrides(data, area, monster_db):
         # --- L value override (standalone) ---
         override_L = override.get("L")
         if override_L is not None and not replace_with:
-            assign_off = _find_assign_entry_offset(
-                data, group_offset, num_monsters, slot_idx)
+            assign_off = layout.assign_entry(slot_idx)
             if assign_off is not None:
                 new_L = int(override_L)
                 old_L = data[assign_off + 1]
@@ -915,8 +931,7 @@ def patch_monster_overrides(data, area, monster_db):
         # --- Texture variant override (byte[2] of assignment entry) ---
         tex_variant = override.get("tex_variant")
         if tex_variant is not None and not replace_with:
-            assign_off = _find_assign_entry_offset(
-                data, group_offset, num_monsters, slot_idx)
+            assign_off = layout.assign_entry(slot_idx)
             if assign_off is not None:
                 new_tv = int(tex_variant)
                 old_tv = data[assign_off + 2]
@@ -933,37 +948,17 @@ def patch_monster_overrides(data, area, monster_db):
     return changed, False
 
 
-def _find_assign_entry_offset(data, group_offset, num_monsters, slot_idx):
-    """Find the absolute offset of a slot's assignment entry.
-
-    Searches backwards from group_offset for the block of entries
-    with 0x40 flag at byte[7].
-    """
-    search_start = group_offset - num_monsters * 8 - 128
-    candidates = []
-    for off in range(group_offset - 8, max(search_start, 0), -8):
-        if data[off + 7] == 0x40 and data[off + 3] == 0x00:
-            candidates.insert(0, off)
-        elif candidates:
-            break
-    if len(candidates) == num_monsters and slot_idx < num_monsters:
-        return candidates[slot_idx]
-    return None
-
-
-def _patch_type07(data, area, slot_idx, vram_hex, idx_val, changes):
+def _patch_type07(data, layout, slot_idx, vram_hex, idx_val, changes):
     """Patch a Type-07 entry's VRAM offset and idx for a given slot."""
-    type07_entries = area.get("type07_entries", [])
-    if slot_idx < len(type07_entries) and type07_entries[slot_idx]:
-        entry = type07_entries[slot_idx]
-        entry_off = int(entry["offset"], 16)
+    entry_off = layout.type07(slot_idx)
+    if entry_off is not None:
 
         # Patch VRAM offset (first 4 bytes)
         if vram_hex:
             new_vram = int(vram_hex, 16)
             old_vram = struct.unpack_from('<I', data, entry_off)[0]
             if old_vram != new_vram:
-                struct.pack_into('<I', data, entry_off, new_vram)
+                data[entry_off:entry_off + 4] = struct.pack('<I', new_vram)
                 changes.append("vram=0x{:04X}".format(new_vram))
 
         # Patch idx (byte 5)
@@ -974,12 +969,10 @@ def _patch_type07(data, area, slot_idx, vram_hex, idx_val, changes):
                 changes.append("idx={}".format(idx_val))
 
 
-def _patch_animation_table(data, area, slot_idx, anim_hex, changes):
+def _patch_animation_table(data, layout, slot_idx, anim_hex, changes):
     """Patch animation table entry (8 bytes) for a given slot."""
-    anim_table = area.get("animation_table", [])
-    if slot_idx < len(anim_table):
-        entry = anim_table[slot_idx]
-        entry_off = int(entry["offset"], 16)
+    entry_off = layout.animation_entry(slot_idx)
+    if entry_off is not None:
         try:
             new_bytes = bytes.fromhex(anim_hex)
             if len(new_bytes) != 8:
@@ -993,19 +986,17 @@ def _patch_animation_table(data, area, slot_idx, anim_hex, changes):
             print("    [ERROR] invalid animation_table hex: {}".format(e))
 
 
-def _patch_8byte_record(data, area, slot_idx, anim_off_hex, tex_ref_hex, changes):
+def _patch_8byte_record(data, layout, slot_idx, anim_off_hex, tex_ref_hex, changes):
     """Patch 8-byte record (anim_offset + texture_ref) for a given slot."""
-    records = area.get("records_8byte", [])
-    if slot_idx < len(records):
-        entry = records[slot_idx]
-        entry_off = int(entry["offset"], 16)
+    entry_off = layout.record_8byte(slot_idx)
+    if entry_off is not None:
 
         # Patch anim_offset (first 4 bytes)
         if anim_off_hex:
             new_anim_off = int(anim_off_hex, 16)
             old_anim_off = struct.unpack_from('<I', data, entry_off)[0]
             if old_anim_off != new_anim_off:
-                struct.pack_into('<I', data, entry_off, new_anim_off)
+                data[entry_off:entry_off + 4] = struct.pack('<I', new_anim_off)
                 changes.append("anim_off={}".format(anim_off_hex))
 
         # Patch texture_ref (next 4 bytes)
@@ -1013,7 +1004,7 @@ def _patch_8byte_record(data, area, slot_idx, anim_off_hex, tex_ref_hex, changes
             new_tex_ref = int(tex_ref_hex, 16)
             old_tex_ref = struct.unpack_from('<I', data, entry_off + 4)[0]
             if old_tex_ref != new_tex_ref:
-                struct.pack_into('<I', data, entry_off + 4, new_tex_ref)
+                data[entry_off + 4:entry_off + 8] = struct.pack('<I', new_tex_ref)
                 changes.append("tex_ref={}".format(tex_ref_hex))
 
 
@@ -1031,21 +1022,12 @@ def find_area_jsons():
     return results
 
 
-def main():
-    print("=" * 60)
-    print("  Formation & Spawn Point Patcher")
-    print("=" * 60)
-    print()
-
-    if not BLAZE_ALL.exists():
-        print("ERROR: {} not found!".format(BLAZE_ALL))
-        print("Run build_gameplay_patch.bat first to copy clean BLAZE.ALL")
-        return 1
-
-    print("Reading {}...".format(BLAZE_ALL))
-    data = bytearray(BLAZE_ALL.read_bytes())
-    print("  Size: {:,} bytes".format(len(data)))
+def patch_data(data):
+    """Build stage entry point: patch an already loaded BLAZE.ALL buffer.
 
+    Returns 0 on success, 1 if any area failed (data must then be discarded,
+    it may hold a partially patched area).
+    """
     # Load monster stats (for replace_with overrides)
     monster_db = load_monster_stats()
     if monster_db:
@@ -1060,6 +1042,10 @@ def main():
     print("Found {} area files".format(len(json_files)))
     print()
 
+    # Original formation sizes and assignment entries, resolved once per
+    # area (clean image of the build)
+    index = blaze_index.get(data)
+
     total_formation_changed = 0
     total_override_changed = 0
     total_sp_records_changed = 0
@@ -1102,12 +1088,14 @@ def main():
 
         area_name = area["name"]
         status_parts = []
+        source = json_file.relative_to(FORMATIONS_DIR).as_posix()
 
         # Patch monster overrides (stats, name, Type-07, full swap)
         # Must run BEFORE formation patching since it may update slot_types
         if has_overrides:
-            ov_changed, ov_error = patch_monster_overrides(
-                data, area, monster_db)
+            with tagged(data, source + ":monster_overrides"):
+                ov_changed, ov_error = patch_monster_overrides(
+                    data, area, monster_db, index)
             if ov_error:
                 total_errors += 1
                 status_parts.append("overrides:ERROR")
@@ -1123,7 +1111,8 @@ def main():
             num_f = len(formations)
             orig_count = area.get("formation_count", num_f)
 
-            f_changed, f_error = patch_area(data, area)
+            with tagged(data, source + ":formations"):
+                f_changed, f_error = patch_area(data, area, index)
 
             if f_error:
                 total_errors += 1
@@ -1153,8 +1142,9 @@ def main():
 
         # Patch spawn points (in-place per-record)
         if has_spawn_points:
-            sp_changed, sp_error = patch_placed_records(
-                data, area, "spawn_points")
+            with tagged(data, source + ":spawn_points"):
+                sp_changed, sp_error = patch_placed_records(
+                    data, area, "spawn_points")
 
             if sp_error:
                 total_errors += 1
@@ -1172,8 +1162,9 @@ def main():
 
         # Patch zone spawns (in-place per-record)
         if has_zone_spawns:
-            zs_changed, zs_error = patch_placed_records(
-                data, area, "zone_spawns")
+            with tagged(data, source + ":zone_spawns"):
+                zs_changed, zs_error = patch_placed_records(
+                    data, area, "zone_spawns")
 
             if zs_error:
                 total_errors += 1
@@ -1202,6 +1193,7 @@ def main():
                     print("    {}".format(part))
 
     print()
+    index.save()
 
     # Write back
     if total_errors > 0:
@@ -1214,7 +1206,6 @@ def main():
     total_changed = (total_formation_changed + total_sp_areas_changed
                       + total_override_changed)
     if total_changed > 0:
-        BLAZE_ALL.write_bytes(data)
         print("=" * 60)
         parts = []
         if total_override_changed > 0:
@@ -1228,7 +1219,6 @@ def main():
                 total_sp_records_changed, total_sp_areas_changed))
         print("  {}".format(", ".join(parts)))
         print("  ({} areas total)".format(total_areas))
-        print("  BLAZE.ALL saved")
         print("=" * 60)
     else:
         print("=" * 60)
@@ -1238,5 +1228,32 @@ def main():
     return 0
 
 
+def main():
+    print("=" * 60)
+    print("  Formation & Spawn Point Patcher")
+    print("=" * 60)
+    print()
+
+    if not BLAZE_ALL.exists():
+        print("ERROR: {} not found!".format(BLAZE_ALL))
+        print("Run build_gameplay_patch.bat first to copy clean BLAZE.ALL")
+        return 1
+
+    print("Reading {}...".format(BLAZE_ALL))
+    data = bytearray(BLAZE_ALL.read_bytes())
+    original = bytes(data)
+    print("  Size: {:,} bytes".format(len(data)))
+
+    rc = patch_data(data)
+    if rc:
+        return rc
+
+    if data != original:
+        BLAZE_ALL.write_bytes(data)
+        print("  BLAZE.ALL saved")
+
+    return 0
+
+
 if __name__ == '__main__':
     exit(main())
@@ -19,6 +19,7 @@ Usage: py -3 Data/formations/extract_monster_db.py
 
 import json
 import struct
+import sys
 from pathlib import Path
 
 SCRIPT_DIR = Path(__file__).parent
@@ -36,6 +37,11 @@ MONSTER_STATS_DIR = SCRIPT_DIR.parent.parent.parent / "monster_stats"
 SPAWN_GROUPS_DIR = (PROJECT_ROOT / "WIP" / "level_design" / "spawns"
                     / "data" / "spawn_groups")
 
+sys.path.insert(0, str(PROJECT_ROOT / "tools"))
+
+import blaze_index
+from area_layout import find_assignment_block
+
 # 96-byte stat field names (offset from start of 96-byte entry)
 STAT_FIELDS = {
     0x10: "exp",
@@ -65,22 +71,9 @@ def find_assignment_entries(data, group_offset, num_monsters):
     Looks for 8-byte entries with flag byte 0x40 at position 7 (R entries).
     Returns list of dicts with L, R values per slot, or None on failure.
     """
-    # Search backwards for the block of n_mon entries with 0x40 flags
-    # Allow up to 128 bytes of structural data between entries and group
-    search_start = group_offset - num_monsters * 8 - 128
-    search_end = group_offset
-
-    # Find all 8-byte entries with 0x40 at byte[7]
-    candidates = []
-    for off in range(search_end - 8, search_start, -8):
-        if off < 0:
-            break
-        if data[off + 7] == 0x40 and data[off + 3] == 0x00:
-            candidates.insert(0, off)
-        elif candidates:
-            break  # Stop at first non-matching entry after finding some
-
-    if len(candidates) != num_monsters:
+    # Same scan as the patcher's AreaLayout (tools/area_layout.py)
+    candidates = find_assignment_block(data, group_offset, num_monsters)
+    if candidates is None:
         return None
 
     entries = []
@@ -295,6 +288,7 @@ def main():
     blaze_data = bytearray(BLAZE_ALL.read_bytes())
     print("  Size: {:,} bytes".format(len(blaze_data)))
     print()
+    index = blaze_index.get(blaze_data)
 
     # Load spawn groups for reference
     spawn_groups = load_all_spawn_groups()
@@ -339,16 +333,16 @@ def main():
             current_level = level_name
 
         # 1. Extract assignment entries (L/R)
-        assign_entries = find_assignment_entries(
-            blaze_data, group_offset, num_monsters)
+        assign_entries = index.call(
+            find_assignment_entries, group_offset, num_monsters)
 
         # 2. Extract animation tables and 8-byte records
-        anim_table, records_8byte = find_animation_tables(
-            blaze_data, group_offset, num_monsters)
+        anim_table, records_8byte = index.call(
+            find_animation_tables, group_offset, num_monsters)
 
         # 3. Extract Type-07 entries
-        type07 = find_type07_entries(
-            blaze_data, script_start, num_monsters)
+        type07 = index.call(
+            find_type07_entries, script_start, num_monsters)
 
         # 4. Extract slot_types from formation suffixes
         slot_types = extract_slot_types(blaze_data, area)
@@ -447,6 +441,8 @@ def main():
             ", ".join(monsters),
             assign_str, anim_str, rec8_str, type07_str, st_str))
 
+    index.save()
+
     # Second pass: add available_monsters to each area JSON
     print()
     print("Adding available_monsters to area JSONs...")
@@ -3,16 +3,25 @@ patch_items_in_bin.py
 Patch les descriptions d'items directement dans BLAZE.ALL
 
 Usage: py -3 patch_items_in_bin.py
+       py -3 patch_items_in_bin.py --regen-offsets   Recalcule all_offsets
+                                                     (tools/item_locator.py)
 """
 
 import json
 import struct
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "tools"))
+
+import item_locator
+from patch_journal import tagged
+
 SCRIPT_DIR = Path(__file__).parent
 ITEMS_JSON = SCRIPT_DIR / "all_items_clean.json"
 OUTPUT_DIR = SCRIPT_DIR.parent.parent / "output"
 BLAZE_ALL = OUTPUT_DIR / "BLAZE.ALL"
+CLEAN_BLAZE_ALL = SCRIPT_DIR.parent.parent / "Blaze  Blade - Eternal Quest (Europe)" / "extract" / "BLAZE.ALL"
 
 ITEM_ENTRY_SIZE = 128
 
@@ -116,9 +125,8 @@ def patch_item_description(data, offset, item_name, new_description, offset_type
 
     # Zero-fill remaining space (up to 63 chars from desc_offset)
     max_end = desc_offset + max_length
-    if max_end <= len(data):
-        for i in range(end_offset + 1, max_end):
-            data[i] = 0
+    if max_end <= len(data) and end_offset + 1 < max_end:
+        data[end_offset + 1:max_end] = bytes(max_end - end_offset - 1)
 
     return True
 
@@ -145,23 +153,11 @@ def find_blaze_all_offset_in_bin(bin_path, blaze_all_path):
         return None
 
 
-def patch_blaze_all(items):
-    """Patch output/BLAZE.ALL"""
-    print("=" * 70)
-    print("  Patch de output/BLAZE.ALL")
-    print("=" * 70)
-    print()
-
-    if not BLAZE_ALL.exists():
-        print(f"ERREUR: {BLAZE_ALL} n'existe pas!")
-        return None
-
-    print(f"Chargement de {BLAZE_ALL.name}...")
-    blaze_data = bytearray(BLAZE_ALL.read_bytes())
-    print(f"  {len(blaze_data):,} bytes")
+def patch_items(blaze_data, items):
+    """Patch les descriptions de tous les items dans un buffer BLAZE.ALL
 
-    # Patcher
-    print("\nPatch des items...")
+    Returns (patched_items, patched_occurrences).
+    """
     patched_items = 0
     patched_occurrences = 0
 
@@ -180,23 +176,46 @@ def patch_blaze_all(items):
                 all_offsets = [f"0x{offset:08X}"]
 
         item_patched = False
-        for offset_hex in all_offsets:
-            try:
-                offset = int(offset_hex, 16)
-                if offset > 0:
-                    # Detect what type of data is at this offset
-                    offset_type = detect_offset_type(blaze_data, offset, item_name)
-                    if offset_type is None:
-                        continue
-                    if patch_item_description(blaze_data, offset, item_name, new_desc, offset_type):
-                        patched_occurrences += 1
-                        item_patched = True
-            except (ValueError, TypeError):
-                continue
+        with tagged(blaze_data, item_name):
+            for offset_hex in all_offsets:
+                try:
+                    offset = int(offset_hex, 16)
+                    if offset > 0:
+                        # Detect what type of data is at this offset
+                        offset_type = detect_offset_type(blaze_data, offset, item_name)
+                        if offset_type is None:
+                            continue
+                        if patch_item_description(blaze_data, offset, item_name, new_desc, offset_type):
+                            patched_occurrences += 1
+                            item_patched = True
+                except (ValueError, TypeError):
+                    continue
 
         if item_patched:
             patched_items += 1
 
+    return patched_items, patched_occurrences
+
+
+def patch_blaze_all(items):
+    """Patch output/BLAZE.ALL"""
+    print("=" * 70)
+    print("  Patch de output/BLAZE.ALL")
+    print("=" * 70)
+    print()
+
+    if not BLAZE_ALL.exists():
+        print(f"ERREUR: {BLAZE_ALL} n'existe pas!")
+        return None
+
+    print(f"Chargement de {BLAZE_ALL.name}...")
+    blaze_data = bytearray(BLAZE_ALL.read_bytes())
+    print(f"  {len(blaze_data):,} bytes")
+
+    # Patcher
+    print("\nPatch des items...")
+    patched_items, patched_occurrences = patch_items(blaze_data, items)
+
     print(f"  Items patches: {patched_items}")
     print(f"  Occurrences patchees: {patched_occurrences}")
 
@@ -207,6 +226,92 @@ def patch_blaze_all(items):
     return blaze_data
 
 
+def load_items():
+    """Charge la liste des items depuis all_items_clean.json"""
+    print(f"Chargement de {ITEMS_JSON.name}...")
+    with open(ITEMS_JSON, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    items = data['items']
+    print(f"  {len(items)} items")
+    print()
+    return items
+
+
+def patch_data(data):
+    """Point d'entree du build: patche un buffer BLAZE.ALL deja charge
+
+    Returns 0 (succes).
+    """
+    items = load_items()
+
+    print("Patch des items...")
+    patched_items, patched_occurrences = patch_items(data, items)
+    print(f"  Items patches: {patched_items}")
+    print(f"  Occurrences patchees: {patched_occurrences}")
+
+    # Ligne parsable pour le batch script
+    items_with_desc = sum(1 for item in items if item.get('new_description'))
+    print(f"PATCHED_COUNT={items_with_desc}")
+    return 0
+
+
+def regen_offsets(items, blaze_data):
+    """Recalcule all_offsets de chaque item avec tools/item_locator.py
+
+    Entrees d'items (nom a +0x00, layout 128 bytes) + textes "Nom/Description".
+    Returns le nombre d'items dont la liste a change.
+    """
+    table = item_locator.locate_items(blaze_data, [item.get('name', '') for item in items])
+    changed = 0
+    for item in items:
+        located = table.get(item.get('name', ''))
+        if located is None:
+            continue
+        offsets = [f"0x{offset:08X}" for offset in item_locator.all_offsets(located)]
+        if offsets == item.get('all_offsets', []):
+            continue
+        old = set(item.get('all_offsets', []))
+        added = [o for o in offsets if o not in old]
+        removed = [o for o in item.get('all_offsets', []) if o not in set(offsets)]
+        print(f"  {item['name']}: +{len(added)} -{len(removed)} ({len(offsets)} offsets)")
+        item['all_offsets'] = offsets
+        item['occurrences_count'] = len(offsets)
+        changed += 1
+    return changed
+
+
+def regen_offsets_main():
+    """--regen-offsets: recalcule all_offsets depuis le BLAZE.ALL clean"""
+    print("=" * 70)
+    print("  Regeneration des all_offsets")
+    print("=" * 70)
+    print()
+
+    if not CLEAN_BLAZE_ALL.exists():
+        print(f"ERREUR: {CLEAN_BLAZE_ALL} n'existe pas!")
+        return 1
+
+    with open(ITEMS_JSON, 'r', encoding='utf-8') as f:
+        items_data = json.load(f)
+    items = items_data['items']
+
+    print(f"Chargement de {CLEAN_BLAZE_ALL.name} (clean)...")
+    blaze_data = CLEAN_BLAZE_ALL.read_bytes()
+    print(f"  {len(blaze_data):,} bytes")
+    print()
+
+    changed = regen_offsets(items, blaze_data)
+    print()
+    print(f"  Items modifies: {changed}/{len(items)}")
+
+    if changed:
+        with open(ITEMS_JSON, 'w', encoding='utf-8') as f:
+            json.dump(items_data, f, indent=2, ensure_ascii=False)
+        print(f"\n[OK] {ITEMS_JSON.name} mis a jour")
+    return 0
+
+
 def patch_bin_file(items, blaze_data):
     """Patch output/patched.bin"""
     print()
@@ -265,19 +370,16 @@ def patch_bin_file(items, blaze_data):
 
 
 def main():
+    if '--regen-offsets' in sys.argv[1:]:
+        return regen_offsets_main()
+
     print("=" * 70)
     print("  Patch Items - BLAZE.ALL")
     print("=" * 70)
     print()
 
     # Charger items
-    print(f"Chargement de {ITEMS_JSON.name}...")
-    with open(ITEMS_JSON, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    items = data['items']
-    print(f"  {len(items)} items")
-    print()
+    items = load_items()
 
     # Patcher BLAZE.ALL
     blaze_data = patch_blaze_all(items)
@@ -8,10 +8,17 @@ Usage: py -3 patch_monster_stats.py
 
 import json
 import struct
+import sys
 from pathlib import Path
 
 # Configuration
 SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR.parent.parent.parent / "tools"))
+
+import blaze_index
+from name_scan import find_names
+from patch_journal import tagged
+
 MONSTER_STATS_DIR = SCRIPT_DIR.parent
 BLAZE_ALL = MONSTER_STATS_DIR.parent.parent / "output" / "BLAZE.ALL"
 JSON_DIR = MONSTER_STATS_DIR
@@ -86,47 +93,11 @@ def patch_stats(data: bytearray, name_offset: int, stats: dict, name: str) -> bo
 
 def find_all_occurrences(data: bytes, name: str) -> list:
     """Find all offsets where monster name appears"""
-    search = name.encode('ascii')
-    offsets = []
-    pos = 0
-    while True:
-        pos = data.find(search, pos)
-        if pos == -1:
-            break
-
-        # Check if substring of larger name
-        if pos > 0:
-            prev_char = data[pos-1]
-            if (0x41 <= prev_char <= 0x5A) or (0x61 <= prev_char <= 0x7A) or prev_char == 0x2D:
-                pos += 1
-                continue
+    return find_names(data, [name])[name]
 
-        # Verify proper monster entry
-        entry = data[pos:pos+16]
-        if b'\x00' in entry:
-            actual_name = entry.split(b'\x00')[0].decode('ascii', errors='ignore')
-            if actual_name == name:
-                offsets.append(pos)
-        pos += 1
-    return offsets
-
-
-def main():
-    print("=" * 60)
-    print("  Monster Stats BLAZE.ALL Patcher")
-    print("=" * 60)
-    print()
-
-    # Read BLAZE.ALL
-    if not BLAZE_ALL.exists():
-        print(f"ERROR: {BLAZE_ALL} not found!")
-        return
-
-    print(f"Reading {BLAZE_ALL}...")
-    blaze_data = bytearray(BLAZE_ALL.read_bytes())
-    print(f"  Size: {len(blaze_data)} bytes")
-    print()
 
+def patch_data(blaze_data):
+    """Build stage entry point: patch an already loaded BLAZE.ALL buffer."""
     # Process JSON files
     json_files = [f for f in JSON_DIR.glob("**/*.json") if not f.name.startswith('_')]
     print(f"Processing {len(json_files)} monster files...")
@@ -134,24 +105,36 @@ def main():
 
     total_patched = 0
 
+    monsters = []
     for json_file in sorted(json_files):
         try:
             with open(json_file, 'r', encoding='utf-8') as f:
-                monster = json.load(f)
+                monsters.append((json_file, json.load(f)))
+        except Exception as e:
+            print(f"  ERROR: {json_file.name}: {e}")
+
+    # All names looked up at once in the BLAZE.ALL index: {name: [offsets]}
+    blaze = blaze_index.get(blaze_data)
+    index = blaze.monster_entries(sorted({monster.get('name', json_file.stem)
+                                          for json_file, monster in monsters}))
+    blaze.save()
 
+    for json_file, monster in monsters:
+        try:
             name = monster.get('name', json_file.stem)
             stats = monster.get('stats', {})
 
-            # Find ALL occurrences
-            offsets = find_all_occurrences(bytes(blaze_data), name)
+            # ALL occurrences
+            offsets = index[name]
 
             if not offsets:
                 print(f"  WARNING: {name} - not found")
                 continue
 
             # Patch at ALL locations
-            for offset in offsets:
-                patch_stats(blaze_data, offset, stats, name)
+            with tagged(blaze_data, json_file.relative_to(JSON_DIR).as_posix()):
+                for offset in offsets:
+                    patch_stats(blaze_data, offset, stats, name)
 
             total_patched += len(offsets)
             print(f"  {name}: patched {len(offsets)} occurrence{'s' if len(offsets) > 1 else ''}")
@@ -162,6 +145,26 @@ def main():
     print()
     print(f"Patched {total_patched} total monster entries in BLAZE.ALL")
     print()
+    return 0
+
+
+def main():
+    print("=" * 60)
+    print("  Monster Stats BLAZE.ALL Patcher")
+    print("=" * 60)
+    print()
+
+    # Read BLAZE.ALL
+    if not BLAZE_ALL.exists():
+        print(f"ERROR: {BLAZE_ALL} not found!")
+        return
+
+    print(f"Reading {BLAZE_ALL}...")
+    blaze_data = bytearray(BLAZE_ALL.read_bytes())
+    print(f"  Size: {len(blaze_data)} bytes")
+    print()
+
+    patch_data(blaze_data)
 
     # Write output
     print(f"Writing {BLAZE_ALL}...")
@@ -22,6 +22,10 @@ import sys
 from pathlib import Path
 
 SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR.parent.parent / "tools"))
+
+from patch_journal import tagged
+
 CONFIG_FILE = SCRIPT_DIR / "spell_config.json"
 BLAZE_ALL = SCRIPT_DIR.parent.parent / "output" / "BLAZE.ALL"
 
@@ -64,13 +68,14 @@ def read_spell_name(data, offset):
     return ''.join(chr(b) if 32 <= b < 127 else '' for b in raw).strip()
 
 
-def main():
-    print("  Spell Definition Patcher (BLAZE.ALL 0x908E68)")
-    print("  " + "-" * 50)
+def patch_data(data):
+    """Build stage entry point: patch an already loaded BLAZE.ALL buffer.
 
+    Returns 0 on success (including skips), 1 on a config error.
+    """
     if not CONFIG_FILE.exists():
         print("  [SKIP] Config not found: {}".format(CONFIG_FILE.name))
-        return
+        return 0
 
     with open(CONFIG_FILE, "r", encoding="utf-8") as f:
         config = json.load(f)
@@ -78,18 +83,13 @@ def main():
     section = config.get("spell_definition_overrides", {})
     if not section.get("enabled", False):
         print("  [SKIP] spell_definition_overrides not enabled")
-        return
+        return 0
 
     overrides = section.get("overrides", [])
     if not overrides:
         print("  [SKIP] No overrides defined")
-        return
+        return 0
 
-    if not BLAZE_ALL.exists():
-        print("  [ERROR] BLAZE.ALL not found: {}".format(BLAZE_ALL))
-        sys.exit(1)
-
-    data = bytearray(BLAZE_ALL.read_bytes())
     patched = 0
 
     for ovr in overrides:
@@ -104,11 +104,11 @@ def main():
         entry_off = compute_entry_offset(list_idx, spell_idx)
         if entry_off is None:
             print("  [ERROR] Invalid list={} index={}".format(list_idx, spell_idx))
-            sys.exit(1)
+            return 1
 
         if entry_off + ENTRY_SIZE > len(data):
             print("  [ERROR] Offset 0x{:X} out of range".format(entry_off))
-            sys.exit(1)
+            return 1
 
         # Verify spell name matches expected
         actual_name = read_spell_name(data, entry_off)
@@ -118,27 +118,30 @@ def main():
 
         # Apply field overrides
         changes = []
-        for field_name, new_val in fields.items():
-            if field_name not in FIELD_MAP:
-                print("  [ERROR] Unknown field '{}' (valid: {})".format(
-                    field_name, ", ".join(sorted(FIELD_MAP.keys()))))
-                sys.exit(1)
-
-            field_off, field_size = FIELD_MAP[field_name]
-            abs_off = entry_off + field_off
-
-            if field_size == 1:
-                old_val = data[abs_off]
-                new_byte = int(new_val) & 0xFF
-                if old_val != new_byte:
-                    data[abs_off] = new_byte
-                    changes.append("{}:{}->{}".format(field_name, old_val, new_byte))
-            elif field_size == 2:
-                old_val = struct.unpack_from('<H', data, abs_off)[0]
-                new_word = int(new_val) & 0xFFFF
-                if old_val != new_word:
-                    struct.pack_into('<H', data, abs_off, new_word)
-                    changes.append("{}:{}->{}".format(field_name, old_val, new_word))
+        source = "{}: list[{}][{}] {}".format(
+            CONFIG_FILE.name, list_idx, spell_idx, expected_name)
+        with tagged(data, source):
+            for field_name, new_val in fields.items():
+                if field_name not in FIELD_MAP:
+                    print("  [ERROR] Unknown field '{}' (valid: {})".format(
+                        field_name, ", ".join(sorted(FIELD_MAP.keys()))))
+                    return 1
+
+                field_off, field_size = FIELD_MAP[field_name]
+                abs_off = entry_off + field_off
+
+                if field_size == 1:
+                    old_val = data[abs_off]
+                    new_byte = int(new_val) & 0xFF
+                    if old_val != new_byte:
+                        data[abs_off] = new_byte
+                        changes.append("{}:{}->{}".format(field_name, old_val, new_byte))
+                elif field_size == 2:
+                    old_val = struct.unpack_from('<H', data, abs_off)[0]
+                    new_word = int(new_val) & 0xFFFF
+                    if old_val != new_word:
+                        data[abs_off:abs_off + 2] = struct.pack('<H', new_word)
+                        changes.append("{}:{}->{}".format(field_name, old_val, new_word))
 
         if changes:
             print("  [PATCH] list[{}][{}] '{}' at 0x{:X}: {}".format(
@@ -150,10 +153,28 @@ def main():
                 list_idx, spell_idx, actual_name or expected_name))
 
     if patched > 0:
-        BLAZE_ALL.write_bytes(data)
         print("  [OK] {} spell definition(s) patched in BLAZE.ALL".format(patched))
     else:
         print("  [SKIP] No spell definition changes applied")
+    return 0
+
+
+def main():
+    print("  Spell Definition Patcher (BLAZE.ALL 0x908E68)")
+    print("  " + "-" * 50)
+
+    if not BLAZE_ALL.exists():
+        print("  [ERROR] BLAZE.ALL not found: {}".format(BLAZE_ALL))
+        sys.exit(1)
+
+    data = bytearray(BLAZE_ALL.read_bytes())
+    original = bytes(data)
+
+    if patch_data(data):
+        sys.exit(1)
+
+    if data != original:
+        BLAZE_ALL.write_bytes(data)
 
 
 if __name__ == "__main__":
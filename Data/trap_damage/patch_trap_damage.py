@@ -7,6 +7,14 @@ Four passes:
 Pass 1 - Direct callers: Find `jal 0x80024F90` where $a1 is an immediate.
   Catches: static traps (2%, 3%, 5%, 10%, 20%) that call damage function directly.
   15 sites across 7+ overlay regions.
+  The overlay range is scanned as a uint32 NumPy array (overlay_words()).
+
+Pass 1b - Propagated callers (config "propagate_a1", off by default): the
+  same calls, with $a1 resolved by constant/copy propagation over the
+  caller's CFG (tools/const_prop.py): register copies, delay slots, stack
+  spills, values set in an earlier block. Patches the addiu/ori that defines
+  the value when pass 1's 10-word look-back misses it. Needs in-game checks
+  before being enabled.
 
 Pass 2 - DISABLED (was GPE entity init, but entity+0x14 is a STATE MACHINE
   variable, not damage%. See RESEARCH.md.)
@@ -18,6 +26,7 @@ Pass 3 - Entity init data: Patch known halfword offsets in entity configuration
 
 Pass 4 - Falling rocks (NEW 2026-02-13): Pattern-based search for hardcoded
   damage% in overlay code. Pattern: `addiu a1, zero, 10` + `addu a2, zero, zero`.
+  One pass over the aligned overlay words for all values (ROCK_VALUES).
   21 sites across all dungeons. Found via in-game debugging with DuckStation.
   See Data/trap_damage/FALLING_ROCK_SOLUTION.md for full details.
 
@@ -32,7 +41,16 @@ import json
 import sys
 from pathlib import Path
 
+import numpy as np
+
 SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR.parent.parent / "tools"))
+
+from const_prop import call_arguments
+from mips_search import (addiu, addu, classify, insn, jal, ori, search,
+                         search_words, word, words_view)
+from patch_journal import tagged
+
 CONFIG_FILE = SCRIPT_DIR / "trap_damage_config.json"
 BLAZE_ALL = SCRIPT_DIR.parent.parent / "output" / "BLAZE.ALL"
 
@@ -44,6 +62,10 @@ DAMAGE_FUNC_JAL = (0x03 << 26) | ((DAMAGE_FUNC_RAM >> 2) & 0x3FFFFFF)
 OVERLAY_START = 0x00900000
 OVERLAY_END   = 0x02D00000
 
+# Pass 4 pattern: addiu a1, zero, X + addu a2, zero, zero
+ROCK_PATTERN = [addiu(rt=5, rs=0, imm='imm'), addu(rd=6, rs=0, rt=0)]
+ROCK_VALUES = range(1, 51)          # damage% kept (higher = false positives)
+
 # Known entity init data offsets containing damage% halfwords.
 # Format: (blaze_offset, description)
 # These are halfwords in entity configuration data blocks that precede
@@ -59,72 +81,112 @@ ENTITY_INIT_OFFSETS = [
 ]
 
 
-def find_immediate_callers(data):
-    """Pass 1: jal 0x80024F90 callers where $a1 is set via immediate."""
-    callers = []
-    end = min(OVERLAY_END, len(data) - 4)
+def overlay_words(data, start=OVERLAY_START):
+    """uint32 view of data from `start` to the end of the image."""
+    return words_view(data, start)
 
-    for i in range(OVERLAY_START, end, 4):
-        word = struct.unpack_from('<I', data, i)[0]
-        if word != DAMAGE_FUNC_JAL:
-            continue
 
-        a1_info = None
-
-        for j in range(1, 11):
-            off = i - j * 4
-            if off < OVERLAY_START:
-                break
-            w = struct.unpack_from('<I', data, off)[0]
-            op = (w >> 26) & 0x3F
-            rs = (w >> 21) & 0x1F
-            rt = (w >> 16) & 0x1F
-            imm = w & 0xFFFF
-            imms = imm if imm < 0x8000 else imm - 0x10000
-
-            if op == 0x09 and rs == 0 and rt == 5:
-                a1_info = (imms, off, 'addiu')
-                break
-            elif op == 0x0D and rs == 0 and rt == 5:
-                a1_info = (imm, off, 'ori')
-                break
-            elif (w >> 26) == 0x03 or w == 0x03E00008:
-                break
-            elif ((op == 0x09 or op == 0x0D) and rt == 5 and rs != 0):
-                break
-            elif op == 0x00 and ((w >> 11) & 0x1F) == 5:
-                break
-
-        if a1_info is None:
-            ds_off = i + 4
-            if ds_off + 4 <= len(data):
-                w = struct.unpack_from('<I', data, ds_off)[0]
-                op = (w >> 26) & 0x3F
-                rs = (w >> 21) & 0x1F
-                rt = (w >> 16) & 0x1F
-                imm = w & 0xFFFF
-                imms = imm if imm < 0x8000 else imm - 0x10000
-                if op == 0x09 and rs == 0 and rt == 5:
-                    a1_info = (imms, ds_off, 'addiu')
-                elif op == 0x0D and rs == 0 and rt == 5:
-                    a1_info = (imm, ds_off, 'ori')
-
-        if a1_info is None:
-            continue
+# Backward $a1 search of pass 1, first matching rule wins:
+# 1 = addiu a1, zero, imm / 2 = ori a1, zero, imm / 3 = stop the search
+# (jal, jr ra, other write of $a1)
+A1_RULES = [
+    (addiu(rt=5, rs=0), 1),
+    (ori(rt=5, rs=0), 2),
+    (jal(), 3),
+    (word(0x03E00008), 3),                  # jr ra
+    (addiu(rt=5), 3),
+    (ori(rt=5), 3),
+    (insn(op=0x00, rd=5), 3),
+]
+
+
+def find_immediate_callers(data, jal_target=DAMAGE_FUNC_RAM, words=None):
+    """Pass 1: jal <jal_target> callers where $a1 is set via immediate.
+
+    The overlay range is scanned as a uint32 array (tools/mips_search.py):
+    one comparison finds every jal, then the 10 words before each one (and
+    its delay slot) are classified at once with A1_RULES. `words` can be an
+    overlay_words() view shared by several passes.
+    """
+    if words is None:
+        words = overlay_words(data)
+    end = min(OVERLAY_END, len(data) - 4)
+    count = max(0, (end - OVERLAY_START + 3) // 4)
+
+    hits, _, _ = search_words(words[:count], [jal(jal_target)])
+    if hits.size == 0:
+        return []
+
+    # Backward window: up to 10 words, not before OVERLAY_START
+    window = hits[:, None] - np.arange(1, 11)
+    codes = classify(words[np.maximum(window, 0)], A1_RULES)
+    codes[window < 0] = 3
+    first = np.argmax(codes != 0, axis=1)
+    rows = np.arange(hits.size)
+    found = codes[rows, first]
+    param = np.where(found != 0, window[rows, first], -1)
+    found[found == 3] = 0
+
+    # Delay slot, when nothing was found before the jal
+    slot = hits + 1
+    in_range = slot < words.size
+    slot_codes = np.zeros(hits.shape, dtype=np.int32)
+    slot_codes[in_range] = classify(words[slot[in_range]], A1_RULES)
+    use_slot = (found == 0) & ((slot_codes == 1) | (slot_codes == 2))
+    found[use_slot] = slot_codes[use_slot]
+    param[use_slot] = slot[use_slot]
 
-        value, param_off, param_type = a1_info
+    callers = []
+    for kind, idx in zip(found.tolist(), param.tolist()):
+        if kind == 0:
+            continue
+        imm = int(words[idx]) & 0xFFFF
+        if kind == 1:
+            value = imm if imm < 0x8000 else imm - 0x10000
+        else:
+            value = imm
         if value < 1 or value > 99:
             continue
-
         callers.append({
             'param_value': value,
-            'param_offset': param_off,
-            'param_type': param_type,
+            'param_offset': OVERLAY_START + idx * 4,
+            'param_type': 'addiu' if kind == 1 else 'ori',
         })
 
     return callers
 
 
+def find_propagated_callers(data, known=(), jal_target=DAMAGE_FUNC_RAM):
+    """Pass 1b: jal <jal_target> callers whose $a1 resolves by propagation.
+
+    Every constant $a1 value at a call that comes from exactly one
+    `addiu/ori rX, zero, N` (N = the value) is a site, unless its offset is
+    in `known` (pass 1 sites). Several calls can share one site.
+    """
+    end = min(OVERLAY_END, len(data))
+    sites = {}
+    for call in call_arguments(data, jal_target, OVERLAY_START, end, regs=(5,)):
+        for value, origins in call.args[5] or ():
+            if not isinstance(value, int) or value < 1 or value > 99:
+                continue
+            sources = []
+            for off in origins:
+                w = struct.unpack_from('<I', data, off)[0]
+                op = w >> 26
+                if op in (0x09, 0x0D) and (w >> 21) & 0x1F == 0 and w & 0xFFFF == value:
+                    sources.append((off, 'addiu' if op == 0x09 else 'ori'))
+            if len(sources) != 1 or sources[0][0] in known:
+                continue
+            off, kind = sources[0]
+            sites.setdefault(off, {
+                'param_value': value,
+                'param_offset': off,
+                'param_type': kind,
+                'call_offset': call.offset,
+            })
+    return sorted(sites.values(), key=lambda c: c['param_offset'])
+
+
 def find_entity_init_data(data, value_map):
     """Pass 3: Check known entity init data offsets for patchable values."""
     results = []
@@ -179,7 +241,8 @@ def apply_patches_pass1(data, entries, value_map):
         else:
             new_word = (0x0D << 26) | (0 << 21) | (target_rt << 16) | (new_val & 0xFFFF)
 
-        struct.pack_into('<I', data, param_off, new_word)
+        with tagged(data, f"values[{old_val}]: jal 0x{param_off:08X}"):
+            data[param_off:param_off + 4] = struct.pack('<I', new_word)
         print(f"  [JAL] 0x{param_off:08X}: {old_val}% -> {new_val}%")
         patched += 1
 
@@ -203,14 +266,15 @@ def apply_patches_pass3(data, entries, value_map):
         new_val = max(1, min(99, new_val))
         param_off = c['param_offset']
 
-        struct.pack_into('<H', data, param_off, new_val)
+        with tagged(data, f"values[{old_val}]: entity {desc}"):
+            data[param_off:param_off + 2] = struct.pack('<H', new_val)
         print(f"  [ENT] 0x{param_off:08X}: {old_val}% -> {new_val}% ({desc})")
         patched += 1
 
     return patched, skipped
 
 
-def find_falling_rocks(data):
+def find_falling_rocks(data, words=None, values=ROCK_VALUES):
     """
     Pass 4: Find trap damage via code pattern.
 
@@ -218,30 +282,31 @@ def find_falling_rocks(data):
         addiu a1, zero, X      # XX 00 05 24  (X = damage%)
         addu a2, zero, zero    # 21 30 00 00
 
-    Searches for reasonable damage% values (1-50).
-    Values >50% are likely false positives (random code matching pattern).
+    One pass over the aligned overlay words finds the pattern for any
+    immediate; hits are then bucketed by value and only `values` are kept
+    (1-50: values >50% are likely false positives, random code matching
+    the pattern), so widening the window costs nothing.
     Returns list of {'offset': blaze_offset, 'damage': damage_percent}
     """
-    results = []
-
-    # Search for reasonable trap damage% values (1-50)
-    # Values >50% are almost certainly false positives
-    for dmg_val in range(1, 51):
-        pattern = bytes([dmg_val, 0x00, 0x05, 0x24, 0x21, 0x30, 0x00, 0x00])
-        offset = 0
+    if words is None:
+        words = overlay_words(data)
+    end = min(OVERLAY_END, len(data) - 4)
+    count = min(max(0, (end - OVERLAY_START + 3) // 4), words.size - 1)
+    if count <= 0:
+        return []
 
-        while True:
-            pos = data.find(pattern, offset)
-            if pos == -1:
-                break
+    by_value = {}
+    for match in search(data, ROCK_PATTERN, OVERLAY_START, words=words[:count + 1]):
+        by_value.setdefault(match.fields['imm'], []).append(match.offset)
 
+    results = []
+    for dmg_val in values:
+        for offset in by_value.get(dmg_val, []):
             results.append({
-                'offset': pos,
+                'offset': offset,
                 'damage': dmg_val,
             })
 
-            offset = pos + 1
-
     # Sort by offset for cleaner output
     results.sort(key=lambda x: x['offset'])
 
@@ -265,27 +330,29 @@ def apply_patches_pass4(data, entries, value_map):
         new_val = max(1, min(99, new_val))
 
         # Patch first byte (damage% immediate value)
-        data[offset] = new_val
+        with tagged(data, f"values[{old_val}]: rock 0x{offset:08X}"):
+            data[offset] = new_val
         print(f"  [ROCK] 0x{offset:08X}: {old_val}% -> {new_val}%")
         patched += 1
 
     return patched, skipped
 
 
-def main():
-    print("  Trap Damage Patcher v6 (jal + entity + falling rocks)")
-    print("  " + "-" * 50)
+def patch_data(data):
+    """Build stage entry point: patch an already loaded BLAZE.ALL buffer.
 
+    Returns 0 (disabled or missing config is a skip, not an error).
+    """
     if not CONFIG_FILE.exists():
         print(f"  [SKIP] Config not found: {CONFIG_FILE.name}")
-        return
+        return 0
 
     config = json.loads(CONFIG_FILE.read_text(encoding="utf-8"))
     overlay_cfg = config.get("overlay_patches", {})
 
     if not overlay_cfg.get("enabled", False):
         print("  [SKIP] Overlay patches disabled in config")
-        return
+        return 0
 
     value_map = {}
     for k, v in overlay_cfg.get("values", {}).items():
@@ -293,19 +360,17 @@ def main():
 
     if not value_map:
         print("  [SKIP] No values defined in overlay_patches.values")
-        return
+        return 0
 
     print(f"  Damage function: 0x{DAMAGE_FUNC_RAM:08X}")
     print(f"  Value map: {', '.join(f'{k}%->{v}%' for k, v in sorted(value_map.items()))}")
 
-    if not BLAZE_ALL.exists():
-        print(f"  [ERROR] BLAZE.ALL not found: {BLAZE_ALL}")
-        sys.exit(1)
-
-    data = bytearray(BLAZE_ALL.read_bytes())
+    # One uint32 view of the overlay code, shared by pass 1 and pass 4
+    # (a live view: pass 4 sees the immediates patched by pass 1)
+    words = overlay_words(data)
 
     # Pass 1: jal callers with immediate $a1
-    jal_callers = find_immediate_callers(data)
+    jal_callers = find_immediate_callers(data, words=words)
     print(f"\n  Pass 1: {len(jal_callers)} jal callers with immediate $a1")
 
     by_value = {}
@@ -317,6 +382,18 @@ def main():
         status = f"-> {new_v}%" if new_v is not None else "(skip)"
         print(f"    {by_value[v]:>3}x {v}% {status}")
 
+    # Pass 1b: same calls, $a1 resolved by constant propagation
+    if overlay_cfg.get("propagate_a1", False):
+        known = {c['param_offset'] for c in jal_callers}
+        propagated = find_propagated_callers(data, known)
+        print(f"\n  Pass 1b: {len(propagated)} more jal callers via propagation")
+        for c in propagated:
+            print(f"    0x{c['param_offset']:08X} {c['param_type']} {c['param_value']}% "
+                  f"(jal 0x{c['call_offset']:08X})")
+        jal_callers = jal_callers + propagated
+    else:
+        print(f"\n  Pass 1b: DISABLED (propagate_a1)")
+
     p1, s1 = apply_patches_pass1(data, jal_callers, value_map)
 
     # Pass 2: DISABLED — entity+0x14 is a state machine variable, NOT damage%.
@@ -329,7 +406,7 @@ def main():
     p3, s3 = apply_patches_pass3(data, entity_inits, value_map)
 
     # Pass 4: Falling rock code patterns (NEW 2026-02-13)
-    falling_rocks = find_falling_rocks(data)
+    falling_rocks = find_falling_rocks(data, words=words)
     print(f"\n  Pass 4: {len(falling_rocks)} falling rock sites")
 
     by_value_rocks = {}
@@ -346,11 +423,26 @@ def main():
     total_patched = p1 + p3 + p4
     total_skipped = s1 + s3 + s4
 
-    if total_patched > 0:
-        BLAZE_ALL.write_bytes(data)
-
     print(f"\n  Total: {total_patched} patched ({p1} jal + {p3} entity + {p4} rocks), "
           f"{total_skipped} unchanged")
+    return 0
+
+
+def main():
+    print("  Trap Damage Patcher v6 (jal + entity + falling rocks)")
+    print("  " + "-" * 50)
+
+    if not BLAZE_ALL.exists():
+        print(f"  [ERROR] BLAZE.ALL not found: {BLAZE_ALL}")
+        sys.exit(1)
+
+    data = bytearray(BLAZE_ALL.read_bytes())
+    original = bytes(data)
+
+    patch_data(data)
+
+    if data != original:
+        BLAZE_ALL.write_bytes(data)
 
 
 if __name__ == "__main__":
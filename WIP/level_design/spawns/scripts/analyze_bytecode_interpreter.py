@@ -18,6 +18,8 @@ import struct
 import sys
 from pathlib import Path
 
+import numpy as np
+
 # ===========================================================================
 # Configuration
 # ===========================================================================
@@ -27,14 +29,6 @@ PROJECT_ROOT = SCRIPT_DIR.parent.parent.parent.parent
 
 BIN_PATH = PROJECT_ROOT / "Blaze  Blade - Eternal Quest (Europe)" / "Blaze & Blade - Eternal Quest (Europe).bin"
 
-# BIN format: RAW sectors
-SECTOR_RAW = 2352       # bytes per raw sector
-SECTOR_HDR = 24         # header before user data
-SECTOR_USER = 2048      # user data per sector
-
-# SLES_008.45 starts at LBA 295081 in the BIN
-SLES_LBA = 295081
-
 # PS1 EXE loads at RAM 0x80010000
 # File has a 0x800-byte PS-X EXE header, but for the BIN copy we read
 # starting from the sector that contains the file.  The first 0x800 bytes
@@ -64,13 +58,10 @@ SLES_LBA = 295081
 
 EXE_LOAD_ADDR = 0x80010000
 
-# MIPS register names
-REGS = [
-    '$zero', '$at', '$v0', '$v1', '$a0', '$a1', '$a2', '$a3',
-    '$t0',   '$t1', '$t2', '$t3', '$t4', '$t5', '$t6', '$t7',
-    '$s0',   '$s1', '$s2', '$s3', '$s4', '$s5', '$s6', '$s7',
-    '$t8',   '$t9', '$k0', '$k1', '$gp', '$sp', '$fp', '$ra',
-]
+sys.path.insert(0, str(PROJECT_ROOT / "tools"))
+from func_table import cached_functions_of
+from disc_file import open_file
+from mips_disasm import REG as REGS, decode, disasm
 
 # Key RAM addresses to analyze
 INTERPRETER_ADDR   = 0x8001A03C
@@ -85,37 +76,13 @@ INIT_A788          = 0x8002A788
 # BIN reading utilities
 # ===========================================================================
 
-def read_file_from_bin(bin_data, lba, file_offset, length):
-    """Read `length` bytes from a file stored at `lba` in the BIN.
+def read_file_bytes(exe, file_offset, length):
+    """`length` bytes of SLES_008.45 at `file_offset`, zero-padded past the end.
 
-    The file's byte at `file_offset` is found in:
-      sector = lba + (file_offset // SECTOR_USER)
-      offset within sector = SECTOR_HDR + (file_offset % SECTOR_USER)
-      absolute BIN offset = sector * SECTOR_RAW + offset_in_sector
+    exe is the file inside the BIN (tools/disc_file.py): no sector math here.
     """
-    result = bytearray()
-    remaining = length
-    cur_file_off = file_offset
-
-    while remaining > 0:
-        sector_idx = cur_file_off // SECTOR_USER
-        offset_in_sector = cur_file_off % SECTOR_USER
-        bytes_in_this_sector = min(remaining, SECTOR_USER - offset_in_sector)
-
-        abs_sector = lba + sector_idx
-        bin_offset = abs_sector * SECTOR_RAW + SECTOR_HDR + offset_in_sector
-
-        if bin_offset + bytes_in_this_sector > len(bin_data):
-            # Pad with zeros if we run past the end
-            result.extend(bin_data[bin_offset:])
-            result.extend(b'\x00' * (bytes_in_this_sector - (len(bin_data) - bin_offset)))
-        else:
-            result.extend(bin_data[bin_offset:bin_offset + bytes_in_this_sector])
-
-        cur_file_off += bytes_in_this_sector
-        remaining -= bytes_in_this_sector
-
-    return bytes(result)
+    data = exe[file_offset:file_offset + length]
+    return data + b'\x00' * (length - len(data))
 
 
 def ram_to_file_offset(ram_addr):
@@ -123,10 +90,10 @@ def ram_to_file_offset(ram_addr):
     return ram_addr - EXE_LOAD_ADDR
 
 
-def read_exe_bytes(bin_data, ram_addr, length):
+def read_exe_bytes(exe, ram_addr, length):
     """Read `length` bytes from the EXE at the given RAM address."""
     file_off = ram_to_file_offset(ram_addr)
-    return read_file_from_bin(bin_data, SLES_LBA, file_off, length)
+    return read_file_bytes(exe, file_off, length)
 
 
 def read_u32(buf, offset):
@@ -140,126 +107,20 @@ def read_u32(buf, offset):
 # MIPS disassembler
 # ===========================================================================
 
-def disasm(word, addr):
-    """Disassemble a single MIPS R3000 instruction."""
-    opcode = (word >> 26) & 0x3F
-    rs = (word >> 21) & 0x1F
-    rt = (word >> 16) & 0x1F
-    rd = (word >> 11) & 0x1F
-    shamt = (word >> 6) & 0x1F
-    funct = word & 0x3F
-    imm = word & 0xFFFF
-    simm = imm if imm < 0x8000 else imm - 0x10000
-    target = (word & 0x03FFFFFF) << 2 | (addr & 0xF0000000)
-
-    if opcode == 0:  # SPECIAL
-        if funct == 0x00:
-            if word == 0:
-                return "nop"
-            return "sll     %s,%s,%d" % (REGS[rd], REGS[rt], shamt)
-        if funct == 0x02: return "srl     %s,%s,%d" % (REGS[rd], REGS[rt], shamt)
-        if funct == 0x03: return "sra     %s,%s,%d" % (REGS[rd], REGS[rt], shamt)
-        if funct == 0x04: return "sllv    %s,%s,%s" % (REGS[rd], REGS[rt], REGS[rs])
-        if funct == 0x06: return "srlv    %s,%s,%s" % (REGS[rd], REGS[rt], REGS[rs])
-        if funct == 0x08: return "jr      %s" % REGS[rs]
-        if funct == 0x09:
-            if rd == 31:
-                return "jalr    %s" % REGS[rs]
-            return "jalr    %s,%s" % (REGS[rd], REGS[rs])
-        if funct == 0x0C: return "syscall"
-        if funct == 0x0D: return "break"
-        if funct == 0x10: return "mfhi    %s" % REGS[rd]
-        if funct == 0x11: return "mthi    %s" % REGS[rs]
-        if funct == 0x12: return "mflo    %s" % REGS[rd]
-        if funct == 0x13: return "mtlo    %s" % REGS[rs]
-        if funct == 0x18: return "mult    %s,%s" % (REGS[rs], REGS[rt])
-        if funct == 0x19: return "multu   %s,%s" % (REGS[rs], REGS[rt])
-        if funct == 0x1A: return "div     %s,%s" % (REGS[rs], REGS[rt])
-        if funct == 0x1B: return "divu    %s,%s" % (REGS[rs], REGS[rt])
-        if funct == 0x20: return "add     %s,%s,%s" % (REGS[rd], REGS[rs], REGS[rt])
-        if funct == 0x21: return "addu    %s,%s,%s" % (REGS[rd], REGS[rs], REGS[rt])
-        if funct == 0x22: return "sub     %s,%s,%s" % (REGS[rd], REGS[rs], REGS[rt])
-        if funct == 0x23: return "subu    %s,%s,%s" % (REGS[rd], REGS[rs], REGS[rt])
-        if funct == 0x24: return "and     %s,%s,%s" % (REGS[rd], REGS[rs], REGS[rt])
-        if funct == 0x25: return "or      %s,%s,%s" % (REGS[rd], REGS[rs], REGS[rt])
-        if funct == 0x26: return "xor     %s,%s,%s" % (REGS[rd], REGS[rs], REGS[rt])
-        if funct == 0x27: return "nor     %s,%s,%s" % (REGS[rd], REGS[rs], REGS[rt])
-        if funct == 0x2A: return "slt     %s,%s,%s" % (REGS[rd], REGS[rs], REGS[rt])
-        if funct == 0x2B: return "sltu    %s,%s,%s" % (REGS[rd], REGS[rs], REGS[rt])
-        return "SPECIAL.%02X %s,%s,%s" % (funct, REGS[rd], REGS[rs], REGS[rt])
-
-    elif opcode == 1:  # REGIMM
-        t = addr + 4 + (simm << 2)
-        if rt == 0x00: return "bltz    %s,0x%08X" % (REGS[rs], t)
-        if rt == 0x01: return "bgez    %s,0x%08X" % (REGS[rs], t)
-        if rt == 0x10: return "bltzal  %s,0x%08X" % (REGS[rs], t)
-        if rt == 0x11: return "bgezal  %s,0x%08X" % (REGS[rs], t)
-        return "REGIMM.%02X %s" % (rt, REGS[rs])
-
-    elif opcode == 0x02: return "j       0x%08X" % target
-    elif opcode == 0x03: return "jal     0x%08X" % target
-    elif opcode == 0x04:
-        t = addr + 4 + (simm << 2)
-        return "beq     %s,%s,0x%08X" % (REGS[rs], REGS[rt], t)
-    elif opcode == 0x05:
-        t = addr + 4 + (simm << 2)
-        return "bne     %s,%s,0x%08X" % (REGS[rs], REGS[rt], t)
-    elif opcode == 0x06:
-        t = addr + 4 + (simm << 2)
-        return "blez    %s,0x%08X" % (REGS[rs], t)
-    elif opcode == 0x07:
-        t = addr + 4 + (simm << 2)
-        return "bgtz    %s,0x%08X" % (REGS[rs], t)
-    elif opcode == 0x08: return "addi    %s,%s,%d" % (REGS[rt], REGS[rs], simm)
-    elif opcode == 0x09: return "addiu   %s,%s,%d" % (REGS[rt], REGS[rs], simm)
-    elif opcode == 0x0A: return "slti    %s,%s,%d" % (REGS[rt], REGS[rs], simm)
-    elif opcode == 0x0B: return "sltiu   %s,%s,%d" % (REGS[rt], REGS[rs], simm)
-    elif opcode == 0x0C: return "andi    %s,%s,0x%04X" % (REGS[rt], REGS[rs], imm)
-    elif opcode == 0x0D: return "ori     %s,%s,0x%04X" % (REGS[rt], REGS[rs], imm)
-    elif opcode == 0x0E: return "xori    %s,%s,0x%04X" % (REGS[rt], REGS[rs], imm)
-    elif opcode == 0x0F: return "lui     %s,0x%04X" % (REGS[rt], imm)
-    elif opcode == 0x20: return "lb      %s,%d(%s)" % (REGS[rt], simm, REGS[rs])
-    elif opcode == 0x21: return "lh      %s,%d(%s)" % (REGS[rt], simm, REGS[rs])
-    elif opcode == 0x23: return "lw      %s,%d(%s)" % (REGS[rt], simm, REGS[rs])
-    elif opcode == 0x24: return "lbu     %s,%d(%s)" % (REGS[rt], simm, REGS[rs])
-    elif opcode == 0x25: return "lhu     %s,%d(%s)" % (REGS[rt], simm, REGS[rs])
-    elif opcode == 0x28: return "sb      %s,%d(%s)" % (REGS[rt], simm, REGS[rs])
-    elif opcode == 0x29: return "sh      %s,%d(%s)" % (REGS[rt], simm, REGS[rs])
-    elif opcode == 0x2B: return "sw      %s,%d(%s)" % (REGS[rt], simm, REGS[rs])
-    elif opcode == 0x31: return "lwc1    $f%d,%d(%s)" % (rt, simm, REGS[rs])
-    elif opcode == 0x32: return "lwc2    $%d,%d(%s)" % (rt, simm, REGS[rs])
-    elif opcode == 0x39: return "swc1    $f%d,%d(%s)" % (rt, simm, REGS[rs])
-    elif opcode == 0x3A: return "swc2    $%d,%d(%s)" % (rt, simm, REGS[rs])
-
-    return "op%02X    0x%08X" % (opcode, word)
-
-
-def disasm_range(bin_data, ram_start, count):
+def disasm_range(exe, ram_start, count):
     """Disassemble `count` instructions starting at `ram_start`."""
-    raw = read_exe_bytes(bin_data, ram_start, count * 4)
-    lines = []
-    for i in range(count):
-        addr = ram_start + i * 4
-        word = read_u32(raw, i * 4)
-        asm = disasm(word, addr)
-        lines.append((addr, word, asm))
-    return lines
-
-
-def find_function_start(bin_data, addr, max_search=0x2000):
-    """Find function prologue (addiu $sp,$sp,-N) searching backwards."""
-    for search_addr in range(addr, max(addr - max_search, EXE_LOAD_ADDR), -4):
-        raw = read_exe_bytes(bin_data, search_addr, 4)
-        word = read_u32(raw, 0)
-        opcode = (word >> 26) & 0x3F
-        rs = (word >> 21) & 0x1F
-        rt = (word >> 16) & 0x1F
-        simm = (word & 0xFFFF)
-        if simm >= 0x8000:
-            simm -= 0x10000
-        if opcode == 0x09 and rs == 29 and rt == 29 and simm < 0:
-            return search_addr
-    return None
+    raw = read_exe_bytes(exe, ram_start, count * 4)
+    return decode(np.frombuffer(raw, dtype='<u4'), ram_start).lines()
+
+
+def find_function_start(exe, addr, max_search=0x2000):
+    """Find function prologue (addiu $sp,$sp,-N) at or before addr.
+
+    The prologues of the whole EXE are indexed once (tools/func_table.py),
+    each call is a binary search.
+    """
+    functions = cached_functions_of(exe, EXE_LOAD_ADDR)
+    return functions.prologue_before(addr, max_search, lower=EXE_LOAD_ADDR)
 
 
 # ===========================================================================
@@ -267,35 +128,20 @@ def find_function_start(bin_data, addr, max_search=0x2000):
 # ===========================================================================
 
 def resolve_lui_pair(lines, idx):
-    """Given a lui instruction at lines[idx], search forward for the matching
-    addiu/ori that completes the 32-bit constant load.
+    """Given a lui instruction at lines[idx], find the addiu/ori (or load/
+    store) that completes the 32-bit constant (tools/mips_disasm.py).
     Returns (full_address, partner_idx) or (None, None)."""
-    addr_i, word_i, asm_i = lines[idx]
-    opcode_i = (word_i >> 26) & 0x3F
-    if opcode_i != 0x0F:  # not lui
-        return None, None
-    rt_lui = (word_i >> 16) & 0x1F
-    hi = (word_i & 0xFFFF) << 16
-
-    for j in range(idx + 1, min(idx + 10, len(lines))):
-        addr_j, word_j, asm_j = lines[j]
-        opcode_j = (word_j >> 26) & 0x3F
-        rs_j = (word_j >> 21) & 0x1F
-        rt_j = (word_j >> 16) & 0x1F
-        imm_j = word_j & 0xFFFF
-
-        if rs_j != rt_lui:
-            continue
+    global _lui_pairs
+    if _lui_pairs[0] is not lines:
+        words = np.array([word for _, word, _ in lines], dtype=np.uint32)
+        _lui_pairs = (lines, decode(words, lines[0][0]).lui_pairs())
+    for partner, (full, lui_idx) in sorted(_lui_pairs[1].items()):
+        if lui_idx == idx:
+            return full, partner
+    return None, None
 
-        if opcode_j == 0x09:  # addiu (sign-extended)
-            simm_j = imm_j if imm_j < 0x8000 else imm_j - 0x10000
-            full = (hi + simm_j) & 0xFFFFFFFF
-            return full, j
-        elif opcode_j == 0x0D:  # ori (zero-extended)
-            full = hi | imm_j
-            return full, j
 
-    return None, None
+_lui_pairs = (None, {})
 
 
 def annotate_line(addr, word, asm, known_addrs=None):
@@ -337,14 +183,14 @@ def annotate_line(addr, word, asm, known_addrs=None):
 # Section 1: Bytecode interpreter at 0x8001A03C
 # ===========================================================================
 
-def section1_interpreter(bin_data):
+def section1_interpreter(exe):
     print()
     print("=" * 90)
     print("  SECTION 1: Bytecode Interpreter at 0x%08X" % INTERPRETER_ADDR)
     print("=" * 90)
 
     # First, find the function start
-    func_start = find_function_start(bin_data, INTERPRETER_ADDR)
+    func_start = find_function_start(exe, INTERPRETER_ADDR)
     if func_start:
         print("  Function prologue found at: 0x%08X" % func_start)
     else:
@@ -355,7 +201,7 @@ def section1_interpreter(bin_data):
     # interpreter core (512 instructions = 2KB should cover it)
     num_instrs = 512
     start_addr = func_start
-    lines = disasm_range(bin_data, start_addr, num_instrs)
+    lines = disasm_range(exe, start_addr, num_instrs)
 
     print("  Disassembling %d instructions from 0x%08X to 0x%08X" %
           (num_instrs, start_addr, start_addr + num_instrs * 4))
@@ -558,7 +404,7 @@ def section1_interpreter(bin_data):
 # Section 2: Opcode dispatch table at 0x8003BDE0
 # ===========================================================================
 
-def section2_opcode_table(bin_data):
+def section2_opcode_table(exe):
     print()
     print("=" * 90)
     print("  SECTION 2: Opcode Dispatch Table at 0x%08X (%d entries)" %
@@ -566,7 +412,7 @@ def section2_opcode_table(bin_data):
     print("=" * 90)
 
     # Read the table: 63 uint32 function pointers
-    raw = read_exe_bytes(bin_data, OPCODE_TABLE_ADDR, OPCODE_TABLE_COUNT * 4)
+    raw = read_exe_bytes(exe, OPCODE_TABLE_ADDR, OPCODE_TABLE_COUNT * 4)
 
     handlers = []
     for i in range(OPCODE_TABLE_COUNT):
@@ -627,13 +473,13 @@ def section2_opcode_table(bin_data):
 # Section 3: Opcode 0x18 handler at 0x8001C218
 # ===========================================================================
 
-def section3_opcode18(bin_data):
+def section3_opcode18(exe):
     print()
     print("=" * 90)
     print("  SECTION 3: Opcode 0x18 Handler at 0x%08X" % OPCODE_18_HANDLER)
     print("=" * 90)
 
-    func_start = find_function_start(bin_data, OPCODE_18_HANDLER)
+    func_start = find_function_start(exe, OPCODE_18_HANDLER)
     if func_start:
         print("  Function starts at: 0x%08X" % func_start)
         start = func_start
@@ -641,7 +487,7 @@ def section3_opcode18(bin_data):
         start = OPCODE_18_HANDLER - 0x20
         print("  WARNING: No prologue found, starting at 0x%08X" % start)
 
-    lines = disasm_range(bin_data, start, 80)
+    lines = disasm_range(exe, start, 80)
 
     print()
     for addr, word, asm in lines:
@@ -668,8 +514,8 @@ def section3_opcode18(bin_data):
     # Also disassemble the add-to-list subroutine
     print()
     print("  --- Subroutine: add_to_list_if_not_present at 0x8001C16C ---")
-    sub_start = find_function_start(bin_data, 0x8001C16C) or 0x8001C16C
-    lines = disasm_range(bin_data, sub_start, 60)
+    sub_start = find_function_start(exe, 0x8001C16C) or 0x8001C16C
+    lines = disasm_range(exe, sub_start, 60)
     for addr, word, asm in lines:
         print("    0x%08X: [%08X] %s" % (addr, word, asm))
         op = (word >> 26) & 0x3F
@@ -681,8 +527,8 @@ def section3_opcode18(bin_data):
     # Also disassemble the remove-from-list subroutine
     print()
     print("  --- Subroutine: remove_from_list at 0x8001C260 ---")
-    sub_start = find_function_start(bin_data, 0x8001C260) or 0x8001C260
-    lines = disasm_range(bin_data, sub_start, 60)
+    sub_start = find_function_start(exe, 0x8001C260) or 0x8001C260
+    lines = disasm_range(exe, sub_start, 60)
     for addr, word, asm in lines:
         print("    0x%08X: [%08X] %s" % (addr, word, asm))
         op = (word >> 26) & 0x3F
@@ -695,7 +541,7 @@ def section3_opcode18(bin_data):
 # Section 4: Init functions (type -> spell index mapping)
 # ===========================================================================
 
-def section4_init_functions(bin_data):
+def section4_init_functions(exe):
     print()
     print("=" * 90)
     print("  SECTION 4: Init Functions (monster type -> spell index mapping)")
@@ -706,7 +552,7 @@ def section4_init_functions(bin_data):
         print()
         print("  --- %s ---" % label)
 
-        func_start = find_function_start(bin_data, addr)
+        func_start = find_function_start(exe, addr)
         if func_start:
             print("  Function starts at: 0x%08X" % func_start)
             start = func_start
@@ -715,7 +561,7 @@ def section4_init_functions(bin_data):
             print("  WARNING: No prologue found, starting at 0x%08X" % start)
 
         # Disassemble 128 instructions to cover the full init function
-        lines = disasm_range(bin_data, start, 128)
+        lines = disasm_range(exe, start, 128)
 
         for i, (a, word, asm) in enumerate(lines):
             notes = []
@@ -761,7 +607,7 @@ def section4_init_functions(bin_data):
 # Section 5: Focused analysis around interpreter entry
 # ===========================================================================
 
-def section5_interpreter_focused(bin_data):
+def section5_interpreter_focused(exe):
     """Analyze just 256 bytes around 0x8001A03C with detailed annotation."""
     print()
     print("=" * 90)
@@ -770,7 +616,7 @@ def section5_interpreter_focused(bin_data):
 
     # Read a wider region for context
     start = INTERPRETER_ADDR - 64
-    lines = disasm_range(bin_data, start, 128)
+    lines = disasm_range(exe, start, 128)
 
     print()
     print("  Register tracking through the interpreter loop:")
@@ -861,7 +707,7 @@ def section5_interpreter_focused(bin_data):
 # Section 6: Search for NULL-handling patterns in the interpreter
 # ===========================================================================
 
-def section6_null_handling(bin_data):
+def section6_null_handling(exe):
     """Specifically search the interpreter region for patterns that handle
     NULL root table entries."""
     print()
@@ -876,7 +722,7 @@ def section6_null_handling(bin_data):
     # Scan a wide range around the interpreter
     scan_start = INTERPRETER_ADDR - 0x200
     scan_end = INTERPRETER_ADDR + 0x400
-    lines = disasm_range(bin_data, scan_start, (scan_end - scan_start) // 4)
+    lines = disasm_range(exe, scan_start, (scan_end - scan_start) // 4)
 
     print()
     print("  Searching 0x%08X - 0x%08X for lw + beq/bne $zero patterns..." %
@@ -955,7 +801,7 @@ def section6_null_handling(bin_data):
 # Section 7: Search for bytecode offset resolution (0x1000-0x4FF0 range)
 # ===========================================================================
 
-def section7_offset_resolution(bin_data):
+def section7_offset_resolution(exe):
     """Search for how bytecode offsets in the 0x1000-0x4FF0 range are resolved
     to actual RAM addresses. Look for add/addu with a base pointer."""
     print()
@@ -974,7 +820,7 @@ def section7_offset_resolution(bin_data):
     # base address calculations
     scan_start = INTERPRETER_ADDR - 0x100
     scan_end = INTERPRETER_ADDR + 0x600
-    lines = disasm_range(bin_data, scan_start, (scan_end - scan_start) // 4)
+    lines = disasm_range(exe, scan_start, (scan_end - scan_start) // 4)
 
     print()
     print("  Looking for base+offset address calculations in interpreter...")
@@ -1029,7 +875,7 @@ def section7_offset_resolution(bin_data):
 # Section 8: Disassemble specific opcode handlers
 # ===========================================================================
 
-def section8_opcode_handlers(bin_data, handlers):
+def section8_opcode_handlers(exe, handlers):
     """Disassemble a few interesting opcode handlers beyond 0x18."""
     print()
     print("=" * 90)
@@ -1049,9 +895,9 @@ def section8_opcode_handlers(bin_data, handlers):
         print()
         print("  --- Opcode 0x%02X: handler at 0x%08X ---" % (opc, handler_addr))
 
-        func_start = find_function_start(bin_data, handler_addr)
+        func_start = find_function_start(exe, handler_addr)
         start = func_start if func_start else handler_addr
-        lines = disasm_range(bin_data, start, 40)
+        lines = disasm_range(exe, start, 40)
 
         for addr, word, asm in lines:
             marker = ""
@@ -1131,23 +977,20 @@ def main():
     print("=" * 90)
     print()
     print("  BIN file: %s" % BIN_PATH)
-    print("  SLES LBA: %d" % SLES_LBA)
-    print()
 
     if not BIN_PATH.exists():
         print("[ERROR] BIN file not found: %s" % BIN_PATH)
         print("  Expected at: %s" % BIN_PATH.resolve())
         return 1
 
-    print("  Loading BIN file...")
-    bin_data = BIN_PATH.read_bytes()
-    print("  BIN size: %s bytes (%d sectors)" %
-          (format(len(bin_data), ','), len(bin_data) // SECTOR_RAW))
+    exe = open_file(BIN_PATH, "SLES_008.45")
+    print("  SLES LBA: %d" % exe.lbas[0])
+    print("  SLES size: %s bytes" % format(len(exe), ','))
     print()
 
     # Quick verify: read the first 16 bytes of the EXE
     # PS-X EXE header starts with "PS-X EXE" ASCII
-    exe_header = read_file_from_bin(bin_data, SLES_LBA, 0, 16)
+    exe_header = read_file_bytes(exe, 0, 16)
     header_str = exe_header[:8].decode('ascii', errors='replace')
     print("  EXE header magic: '%s'" % header_str)
     if header_str.startswith("PS-X EXE"):
@@ -1160,7 +1003,7 @@ def main():
     # Offset 0x10: initial PC
     # Offset 0x18: destination address in RAM
     # Offset 0x1C: file size
-    header_full = read_file_from_bin(bin_data, SLES_LBA, 0, 0x30)
+    header_full = read_file_bytes(exe, 0, 0x30)
     initial_pc = read_u32(header_full, 0x10)
     dest_addr = read_u32(header_full, 0x18)
     file_size = read_u32(header_full, 0x1C)
@@ -1193,8 +1036,8 @@ def main():
     #
     # Let's just verify by checking known code at 0x8001A03C:
     print("  Verifying RAM mapping...")
-    test_bytes_method1 = read_file_from_bin(bin_data, SLES_LBA, 0xA03C, 4)
-    test_bytes_method2 = read_file_from_bin(bin_data, SLES_LBA, 0xA83C, 4)
+    test_bytes_method1 = read_file_bytes(exe, 0xA03C, 4)
+    test_bytes_method2 = read_file_bytes(exe, 0xA83C, 4)
     w1 = read_u32(test_bytes_method1, 0)
     w2 = read_u32(test_bytes_method2, 0)
 
@@ -1229,7 +1072,7 @@ def main():
 
     # Also try to check the opcode table to validate
     print("  Validating opcode table at 0x%08X..." % OPCODE_TABLE_ADDR)
-    table_sample = read_exe_bytes(bin_data, OPCODE_TABLE_ADDR, 16)
+    table_sample = read_exe_bytes(exe, OPCODE_TABLE_ADDR, 16)
     for i in range(4):
         ptr = read_u32(table_sample, i * 4)
         print("    opcode_table[%d] = 0x%08X%s" % (
@@ -1239,15 +1082,16 @@ def main():
     print()
 
     # Run all analysis sections
-    section1_interpreter(bin_data)
-    handlers = section2_opcode_table(bin_data)
-    section3_opcode18(bin_data)
-    section4_init_functions(bin_data)
-    section5_interpreter_focused(bin_data)
-    section6_null_handling(bin_data)
-    section7_offset_resolution(bin_data)
-    section8_opcode_handlers(bin_data, handlers)
+    section1_interpreter(exe)
+    handlers = section2_opcode_table(exe)
+    section3_opcode18(exe)
+    section4_init_functions(exe)
+    section5_interpreter_focused(exe)
+    section6_null_handling(exe)
+    section7_offset_resolution(exe)
+    section8_opcode_handlers(exe, handlers)
     section9_summary()
+    exe.close()
 
     print()
     print("=" * 90)
@@ -14,11 +14,13 @@ Strategy:
 6. Highlight unknown differences that could control AI/ability selection
 """
 
-import gzip
 import struct
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent.parent / "tools"))
+import savestate
+
 # ---------------------------------------------------------------
 # Paths
 # ---------------------------------------------------------------
@@ -193,8 +195,7 @@ def dump_assignment_entries(blaze):
 
 def main():
     print("Loading savestate...")
-    raw = gzip.open(str(SAVESTATE), 'rb').read()
-    ram = bytearray(raw[0x1BA : 0x1BA + RAM_SIZE])
+    ram = savestate.load(SAVESTATE).ram
     blaze = bytearray(Path(BLAZE_ALL).read_bytes())
     exe = bytearray(Path(EXE_PATH).read_bytes())
 
@@ -5,10 +5,13 @@ The 96-byte stat entries are at 0x800E27E4. Look at what surrounds them
 to find the FULL area data block and any additional structures.
 """
 
-import gzip
 import struct
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent.parent / "tools"))
+import savestate
+
 SAVESTATE = Path(r"D:\VieuxJeux\BAB\ePSXe2018\sstates\combat\SLES_008.45.000")
 BLAZE_ALL = Path(r"D:\projets\Bab_Gameplay_Patch\Blaze  Blade - Eternal Quest (Europe)\extract\BLAZE.ALL")
 
@@ -17,8 +20,7 @@ RAM_SIZE = 0x200000
 
 
 def main():
-    raw = gzip.open(str(SAVESTATE), 'rb').read()
-    ram = bytearray(raw[0x1BA : 0x1BA + RAM_SIZE])
+    ram = savestate.load(SAVESTATE).ram
     blaze = bytearray(Path(BLAZE_ALL).read_bytes())
 
     def ri(addr): return addr - RAM_BASE
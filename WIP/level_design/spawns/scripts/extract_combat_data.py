@@ -57,11 +57,13 @@ Verified dispatch loop at 0x80024E58-0x80024EF8:
   addiu s5, s5, 48                        ; stride
 """
 
-import gzip
 import struct
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent.parent / "tools"))
+import savestate
+
 # ---------------------------------------------------------------
 # Paths
 # ---------------------------------------------------------------
@@ -74,7 +76,6 @@ EXE_PATH  = Path(r"D:\projets\Bab_Gameplay_Patch\Blaze  Blade - Eternal Quest (E
 # ---------------------------------------------------------------
 RAM_BASE         = 0x80000000
 RAM_SIZE         = 0x200000       # 2 MB
-SAVESTATE_RAM_OFF = 0x1BA
 
 GAME_STATE_PTR   = 0x8005490C
 PTR_ARRAY_OFF    = 0x9C
@@ -168,11 +169,9 @@ def extract_ram():
     print("  STEP 1: Extract RAM from ePSXe savestate")
     print("=" * 95)
 
-    raw = gzip.open(str(SAVESTATE), 'rb').read()
-    print(f"  Decompressed savestate: {len(raw):,} bytes")
-
-    ram = raw[SAVESTATE_RAM_OFF : SAVESTATE_RAM_OFF + RAM_SIZE]
-    print(f"  RAM extracted: {len(ram):,} bytes (from offset 0x{SAVESTATE_RAM_OFF:X})")
+    state = savestate.load(SAVESTATE)
+    ram = state.ram
+    print(f"  RAM extracted: {len(ram):,} bytes ({state.format} savestate)")
 
     if len(ram) < RAM_SIZE:
         print(f"  WARNING: Expected {RAM_SIZE} bytes, got {len(ram)}")
@@ -186,7 +185,7 @@ def extract_ram():
     print(f"  EXE text verification (0x80010000): {'MATCH' if match else 'MISMATCH'}")
     print(f"    First 8 bytes: {bytes(ram_text).hex()}")
 
-    return bytearray(ram), exe_data
+    return ram, exe_data
 
 
 # ===================================================================
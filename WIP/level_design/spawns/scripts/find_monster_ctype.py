@@ -22,10 +22,13 @@ Strategy:
 4. Also check what's at the battle slot table and entity management region.
 """
 
-import gzip
 import struct
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent.parent / "tools"))
+import savestate
+
 SAVESTATE = Path(r"D:\VieuxJeux\BAB\ePSXe2018\sstates\combat\SLES_008.45.000")
 BLAZE_ALL = Path(r"D:\projets\Bab_Gameplay_Patch\Blaze  Blade - Eternal Quest (Europe)\extract\BLAZE.ALL")
 EXE_PATH  = Path(r"D:\projets\Bab_Gameplay_Patch\Blaze  Blade - Eternal Quest (Europe)\extract\SLES_008.45")
@@ -78,8 +81,7 @@ def decode_name_field(data16):
 
 
 def main():
-    raw = gzip.open(str(SAVESTATE), 'rb').read()
-    ram = bytearray(raw[0x1BA : 0x1BA + RAM_SIZE])
+    ram = savestate.load(SAVESTATE).ram
     blaze = bytearray(Path(BLAZE_ALL).read_bytes())
     exe = bytearray(Path(EXE_PATH).read_bytes())
 
@@ -17,11 +17,17 @@ This script searches for:
 7. Battle turn management code (iteration over 0x800BB93C)
 """
 
-import gzip
 import struct
 import sys
 from pathlib import Path
 
+# Racine projet: scripts/ -> spawns/ -> level_design/ -> WIP/ -> racine
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent.parent / "tools"))
+from func_table import cached_functions_of
+from mips_disasm import REG as REGS, disasm, disasm_range
+from mips_search import insn, jal, search
+import savestate
+
 # ---------------------------------------------------------------
 # Paths
 # ---------------------------------------------------------------
@@ -34,7 +40,6 @@ EXE_PATH  = Path(r"D:\projets\Bab_Gameplay_Patch\Blaze  Blade - Eternal Quest (E
 # ---------------------------------------------------------------
 RAM_BASE         = 0x80000000
 RAM_SIZE         = 0x200000       # 2 MB
-SAVESTATE_RAM_OFF = 0x1BA
 
 EXE_LOAD_ADDR    = 0x80010000
 EXE_HEADER_SIZE  = 0x800
@@ -52,12 +57,6 @@ PLAYER_ENTITIES  = 0x80054698
 MONSTER_ENTITIES = 0x800B9268
 BATTLE_TABLE     = 0x800BB93C     # 12 entries, stride 0x9C
 
-# MIPS register names
-REGS = ['$zero','$at','$v0','$v1','$a0','$a1','$a2','$a3',
-        '$t0','$t1','$t2','$t3','$t4','$t5','$t6','$t7',
-        '$s0','$s1','$s2','$s3','$s4','$s5','$s6','$s7',
-        '$t8','$t9','$k0','$k1','$gp','$sp','$fp','$ra']
-
 
 def ram_idx(addr):
     return addr - RAM_BASE
@@ -81,166 +80,38 @@ def read_u8_ram(ram, addr):
     return ram[idx]
 
 
-def disasm(word, addr):
-    """Disassemble a single MIPS instruction."""
-    opcode = (word >> 26) & 0x3F
-    rs = (word >> 21) & 0x1F
-    rt = (word >> 16) & 0x1F
-    rd = (word >> 11) & 0x1F
-    shamt = (word >> 6) & 0x1F
-    funct = word & 0x3F
-    imm = word & 0xFFFF
-    simm = imm if imm < 0x8000 else imm - 0x10000
-    target = (word & 0x03FFFFFF) << 2 | (addr & 0xF0000000)
-
-    if opcode == 0:  # SPECIAL
-        if funct == 0x00:
-            if word == 0: return "nop"
-            return f"sll     {REGS[rd]},{REGS[rt]},{shamt}"
-        if funct == 0x02: return f"srl     {REGS[rd]},{REGS[rt]},{shamt}"
-        if funct == 0x03: return f"sra     {REGS[rd]},{REGS[rt]},{shamt}"
-        if funct == 0x04: return f"sllv    {REGS[rd]},{REGS[rt]},{REGS[rs]}"
-        if funct == 0x06: return f"srlv    {REGS[rd]},{REGS[rt]},{REGS[rs]}"
-        if funct == 0x08: return f"jr      {REGS[rs]}"
-        if funct == 0x09: return f"jalr    {REGS[rd]},{REGS[rs]}"
-        if funct == 0x0C: return f"syscall"
-        if funct == 0x0D: return f"break"
-        if funct == 0x10: return f"mfhi    {REGS[rd]}"
-        if funct == 0x11: return f"mthi    {REGS[rs]}"
-        if funct == 0x12: return f"mflo    {REGS[rd]}"
-        if funct == 0x13: return f"mtlo    {REGS[rs]}"
-        if funct == 0x18: return f"mult    {REGS[rs]},{REGS[rt]}"
-        if funct == 0x19: return f"multu   {REGS[rs]},{REGS[rt]}"
-        if funct == 0x1A: return f"div     {REGS[rs]},{REGS[rt]}"
-        if funct == 0x1B: return f"divu    {REGS[rs]},{REGS[rt]}"
-        if funct == 0x20: return f"add     {REGS[rd]},{REGS[rs]},{REGS[rt]}"
-        if funct == 0x21: return f"addu    {REGS[rd]},{REGS[rs]},{REGS[rt]}"
-        if funct == 0x22: return f"sub     {REGS[rd]},{REGS[rs]},{REGS[rt]}"
-        if funct == 0x23: return f"subu    {REGS[rd]},{REGS[rs]},{REGS[rt]}"
-        if funct == 0x24: return f"and     {REGS[rd]},{REGS[rs]},{REGS[rt]}"
-        if funct == 0x25: return f"or      {REGS[rd]},{REGS[rs]},{REGS[rt]}"
-        if funct == 0x26: return f"xor     {REGS[rd]},{REGS[rs]},{REGS[rt]}"
-        if funct == 0x27: return f"nor     {REGS[rd]},{REGS[rs]},{REGS[rt]}"
-        if funct == 0x2A: return f"slt     {REGS[rd]},{REGS[rs]},{REGS[rt]}"
-        if funct == 0x2B: return f"sltu    {REGS[rd]},{REGS[rs]},{REGS[rt]}"
-        return f"SPECIAL.{funct:02X} {REGS[rd]},{REGS[rs]},{REGS[rt]}"
-    elif opcode == 1:  # REGIMM
-        if rt == 0x00:
-            t = addr + 4 + (simm << 2)
-            return f"bltz    {REGS[rs]},0x{t:08X}"
-        if rt == 0x01:
-            t = addr + 4 + (simm << 2)
-            return f"bgez    {REGS[rs]},0x{t:08X}"
-        if rt == 0x10:
-            t = addr + 4 + (simm << 2)
-            return f"bltzal  {REGS[rs]},0x{t:08X}"
-        if rt == 0x11:
-            t = addr + 4 + (simm << 2)
-            return f"bgezal  {REGS[rs]},0x{t:08X}"
-        return f"REGIMM.{rt:02X}"
-    elif opcode == 0x02: return f"j       0x{target:08X}"
-    elif opcode == 0x03: return f"jal     0x{target:08X}"
-    elif opcode == 0x04:
-        t = addr + 4 + (simm << 2)
-        return f"beq     {REGS[rs]},{REGS[rt]},0x{t:08X}"
-    elif opcode == 0x05:
-        t = addr + 4 + (simm << 2)
-        return f"bne     {REGS[rs]},{REGS[rt]},0x{t:08X}"
-    elif opcode == 0x06:
-        t = addr + 4 + (simm << 2)
-        return f"blez    {REGS[rs]},0x{t:08X}"
-    elif opcode == 0x07:
-        t = addr + 4 + (simm << 2)
-        return f"bgtz    {REGS[rs]},0x{t:08X}"
-    elif opcode == 0x08: return f"addi    {REGS[rt]},{REGS[rs]},{simm}"
-    elif opcode == 0x09: return f"addiu   {REGS[rt]},{REGS[rs]},{simm}"
-    elif opcode == 0x0A: return f"slti    {REGS[rt]},{REGS[rs]},{simm}"
-    elif opcode == 0x0B: return f"sltiu   {REGS[rt]},{REGS[rs]},{simm}"
-    elif opcode == 0x0C: return f"andi    {REGS[rt]},{REGS[rs]},0x{imm:04X}"
-    elif opcode == 0x0D: return f"ori     {REGS[rt]},{REGS[rs]},0x{imm:04X}"
-    elif opcode == 0x0E: return f"xori    {REGS[rt]},{REGS[rs]},0x{imm:04X}"
-    elif opcode == 0x0F: return f"lui     {REGS[rt]},0x{imm:04X}"
-    elif opcode == 0x20: return f"lb      {REGS[rt]},{simm}({REGS[rs]})"
-    elif opcode == 0x21: return f"lh      {REGS[rt]},{simm}({REGS[rs]})"
-    elif opcode == 0x23: return f"lw      {REGS[rt]},{simm}({REGS[rs]})"
-    elif opcode == 0x24: return f"lbu     {REGS[rt]},{simm}({REGS[rs]})"
-    elif opcode == 0x25: return f"lhu     {REGS[rt]},{simm}({REGS[rs]})"
-    elif opcode == 0x28: return f"sb      {REGS[rt]},{simm}({REGS[rs]})"
-    elif opcode == 0x29: return f"sh      {REGS[rt]},{simm}({REGS[rs]})"
-    elif opcode == 0x2B: return f"sw      {REGS[rt]},{simm}({REGS[rs]})"
-    elif opcode == 0x31: return f"lwc1    $f{rt},{simm}({REGS[rs]})"
-    elif opcode == 0x39: return f"swc1    $f{rt},{simm}({REGS[rs]})"
-    elif opcode == 0x32: return f"lwc2    ${rt},{simm}({REGS[rs]})"
-    elif opcode == 0x3A: return f"swc2    ${rt},{simm}({REGS[rs]})"
-    return f"op{opcode:02X}    0x{word:08X}"
-
-
-def disasm_range(data, base_addr, start_addr, count, data_offset=0):
-    """Disassemble `count` instructions starting at `start_addr`.
-    data: byte buffer, base_addr: RAM address of data[data_offset].
-    """
-    lines = []
-    for i in range(count):
-        addr = start_addr + i * 4
-        idx = (addr - base_addr) + data_offset
-        if idx < 0 or idx + 4 > len(data):
-            lines.append((addr, 0, "??? (out of range)"))
-            continue
-        word = struct.unpack_from('<I', data, idx)[0]
-        asm = disasm(word, addr)
-        lines.append((addr, word, asm))
-    return lines
+def find_function_start(data, addr, base_addr=EXE_LOAD_ADDR, data_offset=EXE_HEADER_SIZE):
+    """Find the function prologue (addiu $sp, $sp, -N) at or before addr, within
+    0x2000 bytes. The prologues of `data` are indexed once (tools/func_table.py)."""
+    functions = cached_functions_of(data, base_addr, data_offset)
+    return functions.prologue_before(addr, 0x2000, lower=base_addr)
 
 
-def find_function_start(data, addr, base_addr=EXE_LOAD_ADDR, data_offset=EXE_HEADER_SIZE):
-    """Find the function prologue (addiu $sp, $sp, -N) searching backwards from addr."""
-    for search_addr in range(addr, max(addr - 0x2000, base_addr), -4):
-        idx = (search_addr - base_addr) + data_offset
-        if idx < 0 or idx + 4 > len(data):
-            continue
-        word = struct.unpack_from('<I', data, idx)[0]
-        opcode = (word >> 26) & 0x3F
-        rs = (word >> 21) & 0x1F
-        rt = (word >> 16) & 0x1F
-        imm = word & 0xFFFF
-        simm = imm if imm < 0x8000 else imm - 0x10000
-        if opcode == 0x09 and rs == 29 and rt == 29 and simm < 0:
-            return search_addr
-    return None
+def _search_range(data, query, search_start, search_end, base_addr, data_offset):
+    """mips_search over the addresses search_start..search_end of data."""
+    start = search_start - base_addr + data_offset
+    end = search_end - base_addr + data_offset
+    if start < 0:
+        start %= 4                      # first word-aligned index inside data
+    if end <= start:
+        return []
+    end = start + ((end - start + 3) // 4) * 4
+    return search(data, query, start, min(end, len(data)))
 
 
 def find_jal_callers(data, target_addr, search_start, search_end, base_addr=EXE_LOAD_ADDR, data_offset=EXE_HEADER_SIZE):
     """Find all JAL instructions that call target_addr."""
-    callers = []
-    jal_opcode = 0x03
-    target_field = (target_addr & 0x0FFFFFFF) >> 2
-    expected_word = (jal_opcode << 26) | target_field
-
-    for addr in range(search_start, search_end, 4):
-        idx = (addr - base_addr) + data_offset
-        if idx < 0 or idx + 4 > len(data):
-            continue
-        word = struct.unpack_from('<I', data, idx)[0]
-        if word == expected_word:
-            callers.append(addr)
-    return callers
+    matches = _search_range(data, [jal(target_addr)], search_start, search_end,
+                            base_addr, data_offset)
+    return [m.offset - data_offset + base_addr for m in matches]
 
 
 def find_jalr_sites(data, search_start, search_end, base_addr=EXE_LOAD_ADDR, data_offset=EXE_HEADER_SIZE):
     """Find all jalr instructions in the given range."""
-    sites = []
-    for addr in range(search_start, search_end, 4):
-        idx = (addr - base_addr) + data_offset
-        if idx < 0 or idx + 4 > len(data):
-            continue
-        word = struct.unpack_from('<I', data, idx)[0]
-        opcode = (word >> 26) & 0x3F
-        funct = word & 0x3F
-        if opcode == 0 and funct == 0x09:
-            rs = (word >> 21) & 0x1F
-            rd = (word >> 11) & 0x1F
-            sites.append((addr, rs, rd))
-    return sites
+    matches = _search_range(data, [insn(op=0, funct=0x09, rs='rs', rd='rd')],
+                            search_start, search_end, base_addr, data_offset)
+    return [(m.offset - data_offset + base_addr, m.fields['rs'], m.fields['rd'])
+            for m in matches]
 
 
 # ===================================================================
@@ -1359,13 +1230,13 @@ def main():
     print()
 
     # Load EXE
-    exe = bytearray(Path(EXE_PATH).read_bytes())
+    exe = Path(EXE_PATH).read_bytes()
     print(f"  EXE loaded: {len(exe):,} bytes")
 
-    # Load RAM from savestate
-    raw = gzip.open(str(SAVESTATE), 'rb').read()
-    ram = bytearray(raw[SAVESTATE_RAM_OFF : SAVESTATE_RAM_OFF + RAM_SIZE])
-    print(f"  RAM extracted: {len(ram):,} bytes")
+    # Load RAM from savestate (tools/savestate.py caches the decompressed RAM)
+    state = savestate.load(SAVESTATE)
+    ram = state.ram
+    print(f"  RAM extracted: {len(ram):,} bytes ({state.format})")
 
     # Verify EXE/RAM match
     exe_check = exe[EXE_HEADER_SIZE:EXE_HEADER_SIZE+8]
@@ -13,6 +13,7 @@ Output: Patched BLAZE.ALL
 
 import struct
 import json
+import sys
 from pathlib import Path
 
 SCRIPT_DIR = Path(__file__).parent  # spawns/scripts/
@@ -20,6 +21,11 @@ LEVEL_DESIGN_DIR = SCRIPT_DIR.parent.parent  # level_design/
 PROJECT_ROOT = LEVEL_DESIGN_DIR.parent.parent  # Racine projet
 SPAWN_DIR = SCRIPT_DIR.parent / "data" / "spawn_groups"  # spawns/data/spawn_groups/
 
+sys.path.insert(0, str(PROJECT_ROOT / "tools"))
+
+import blaze_index
+from patch_journal import tagged
+
 BLAZE_ALL = PROJECT_ROOT / "output" / "BLAZE.ALL"
 if not BLAZE_ALL.exists():
     BLAZE_ALL = PROJECT_ROOT / "Blaze  Blade - Eternal Quest (Europe)" / "extract" / "BLAZE.ALL"
@@ -66,42 +72,47 @@ def read_name_at(data, offset):
 
 def build_monster_lookup(data):
     """Build a lookup: monster_name -> 96-byte entry (first occurrence found).
-    Used to copy stats when replacing a monster with a different one."""
-    lookup = {}
-    for name in sorted(MONSTER_NAMES):
-        name_bytes = name.encode('ascii')
-        pos = 0
-        while True:
-            pos = data.find(name_bytes, pos)
-            if pos == -1:
-                break
-            # Validate: name field must be exactly this name + null padding
-            field = data[pos:pos + 16]
-            null_idx = field.find(b'\x00')
-            if null_idx == len(name_bytes):
-                all_zero = all(field[i] == 0 for i in range(null_idx, 16))
-                if all_zero and name not in lookup:
-                    lookup[name] = bytes(data[pos:pos + 96])
-            pos += 1
-    return lookup
-
-
-def main():
-    print("=" * 70)
-    print("  SPAWN GROUP PATCHER")
-    print("=" * 70)
-    print()
+    Used to copy stats when replacing a monster with a different one.
 
-    # Load BLAZE.ALL
-    print(f"Loading {BLAZE_ALL}...")
-    data = bytearray(BLAZE_ALL.read_bytes())
-    print(f"  Size: {len(data):,} bytes")
-    print()
+    Occurrences (name field = exactly this name + null padding) of all the
+    names come from one pass of the BLAZE.ALL index (name_scan.find_fields);
+    the 96 bytes are read from data as it is now.
 
+    Returns (lookup, occurrences): occurrences = {monster_name: [offsets]},
+    every entry that still holds the name field, in image order."""
+    index = blaze_index.get(data)
+    fields = index.name_fields(sorted(MONSTER_NAMES))
+    index.save()
+    lookup = {}
+    occurrences = {}
+    for name, offsets in fields.items():
+        field = name.encode('ascii').ljust(16, b'\x00')
+        # Still a name field after the earlier stages (stats written
+        # next to a longer name can fill the padding of its suffix)
+        found = [pos for pos in offsets if data[pos:pos + 16] == field]
+        if found:
+            occurrences[name] = found
+            lookup[name] = bytes(data[found[0]:found[0] + 96])
+    return lookup, occurrences
+
+
+def patch_data(data):
+    """Build stage entry point: patch an already loaded BLAZE.ALL buffer.
+
+    Rejected slots are listed as errors but do not fail the stage,
+    same as the standalone run.
+    """
+    apply_spawn_files(data)
+    return 0
+
+
+def apply_spawn_files(data):
+    """Apply every spawn group JSON to data. Returns (changed, checked)."""
     # Build monster stats lookup from BLAZE.ALL
     print("Building monster stats lookup...")
-    lookup = build_monster_lookup(data)
-    print(f"  Found entries for {len(lookup)} monsters")
+    lookup, occurrences = build_monster_lookup(data)
+    print(f"  Found entries for {len(lookup)} monsters "
+          f"({sum(len(v) for v in occurrences.values())} occurrences)")
     print()
 
     # Load spawn files
@@ -109,7 +120,7 @@ def main():
     files = sorted(SPAWN_DIR.glob('*.json'))
     if not files:
         print(f"[ERROR] No JSON files in {SPAWN_DIR}/")
-        return
+        return 0, 0
 
     print(f"  Found {len(files)} level files")
     print()
@@ -155,7 +166,8 @@ def main():
 
                 # Copy full 96-byte entry
                 entry = lookup[new_name]
-                data[offset:offset + 96] = entry
+                with tagged(data, f"{filepath.name}: {group_name} slot {i}"):
+                    data[offset:offset + 96] = entry
 
                 print(f"  [{level_name}] {group_name} slot {i}: {current_name} -> {new_name}")
                 total_changed += 1
@@ -171,14 +183,6 @@ def main():
             print(f"  [ERROR] {err}")
         print()
 
-    # Save
-    if total_changed > 0:
-        print(f"Saving {total_changed} changes...")
-        BLAZE_ALL.write_bytes(data)
-        print(f"[SAVED]  {BLAZE_ALL}")
-    else:
-        print("No changes detected.")
-
     # Summary
     print()
     print("=" * 70)
@@ -187,6 +191,31 @@ def main():
     print(f"Errors:           {len(errors)}")
     print("=" * 70)
 
+    return total_changed, total_checked
+
+
+def main():
+    print("=" * 70)
+    print("  SPAWN GROUP PATCHER")
+    print("=" * 70)
+    print()
+
+    # Load BLAZE.ALL
+    print(f"Loading {BLAZE_ALL}...")
+    data = bytearray(BLAZE_ALL.read_bytes())
+    print(f"  Size: {len(data):,} bytes")
+    print()
+
+    total_changed, _ = apply_spawn_files(data)
+
+    # Save
+    if total_changed > 0:
+        print(f"Saving {total_changed} changes...")
+        BLAZE_ALL.write_bytes(data)
+        print(f"[SAVED]  {BLAZE_ALL}")
+    else:
+        print("No changes detected.")
+
 
 if __name__ == '__main__':
     main()
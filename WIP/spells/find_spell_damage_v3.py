@@ -29,85 +29,14 @@ EXE_PATH = os.path.join(PROJECT_DIR,
 with open(EXE_PATH, 'rb') as f:
     exe_data = f.read()
 
-REG_NAMES = [
-    "$zero","$at","$v0","$v1","$a0","$a1","$a2","$a3",
-    "$t0","$t1","$t2","$t3","$t4","$t5","$t6","$t7",
-    "$s0","$s1","$s2","$s3","$s4","$s5","$s6","$s7",
-    "$t8","$t9","$k0","$k1","$gp","$sp","$fp","$ra"
-]
+sys.path.insert(0, os.path.join(PROJECT_DIR, "tools"))
+from mips_disasm import REG as REG_NAMES, decode_range, disasm as disasm_one
 
 def sign_extend_16(val):
     if val & 0x8000:
         return val - 0x10000
     return val
 
-def disasm_one(word, addr):
-    op = (word >> 26) & 0x3F
-    rs = (word >> 21) & 0x1F
-    rt = (word >> 16) & 0x1F
-    rd = (word >> 11) & 0x1F
-    shamt = (word >> 6) & 0x1F
-    funct = word & 0x3F
-    imm = word & 0xFFFF
-    imms = sign_extend_16(imm)
-    target = (word & 0x3FFFFFF) << 2
-    if word == 0: return "nop"
-    if op == 0:
-        if funct == 0x20: return "add %s, %s, %s" % (REG_NAMES[rd], REG_NAMES[rs], REG_NAMES[rt])
-        if funct == 0x21: return "addu %s, %s, %s" % (REG_NAMES[rd], REG_NAMES[rs], REG_NAMES[rt])
-        if funct == 0x22: return "sub %s, %s, %s" % (REG_NAMES[rd], REG_NAMES[rs], REG_NAMES[rt])
-        if funct == 0x23: return "subu %s, %s, %s" % (REG_NAMES[rd], REG_NAMES[rs], REG_NAMES[rt])
-        if funct == 0x24: return "and %s, %s, %s" % (REG_NAMES[rd], REG_NAMES[rs], REG_NAMES[rt])
-        if funct == 0x25: return "or %s, %s, %s" % (REG_NAMES[rd], REG_NAMES[rs], REG_NAMES[rt])
-        if funct == 0x26: return "xor %s, %s, %s" % (REG_NAMES[rd], REG_NAMES[rs], REG_NAMES[rt])
-        if funct == 0x27: return "nor %s, %s, %s" % (REG_NAMES[rd], REG_NAMES[rs], REG_NAMES[rt])
-        if funct == 0x2A: return "slt %s, %s, %s" % (REG_NAMES[rd], REG_NAMES[rs], REG_NAMES[rt])
-        if funct == 0x2B: return "sltu %s, %s, %s" % (REG_NAMES[rd], REG_NAMES[rs], REG_NAMES[rt])
-        if funct == 0x00: return "sll %s, %s, %d" % (REG_NAMES[rd], REG_NAMES[rt], shamt)
-        if funct == 0x02: return "srl %s, %s, %d" % (REG_NAMES[rd], REG_NAMES[rt], shamt)
-        if funct == 0x03: return "sra %s, %s, %d" % (REG_NAMES[rd], REG_NAMES[rt], shamt)
-        if funct == 0x04: return "sllv %s, %s, %s" % (REG_NAMES[rd], REG_NAMES[rt], REG_NAMES[rs])
-        if funct == 0x06: return "srlv %s, %s, %s" % (REG_NAMES[rd], REG_NAMES[rt], REG_NAMES[rs])
-        if funct == 0x07: return "srav %s, %s, %s" % (REG_NAMES[rd], REG_NAMES[rt], REG_NAMES[rs])
-        if funct == 0x08: return "jr %s" % REG_NAMES[rs]
-        if funct == 0x09: return "jalr %s, %s" % (REG_NAMES[rd], REG_NAMES[rs])
-        if funct == 0x10: return "mfhi %s" % REG_NAMES[rd]
-        if funct == 0x11: return "mthi %s" % REG_NAMES[rs]
-        if funct == 0x12: return "mflo %s" % REG_NAMES[rd]
-        if funct == 0x13: return "mtlo %s" % REG_NAMES[rs]
-        if funct == 0x18: return "mult %s, %s" % (REG_NAMES[rs], REG_NAMES[rt])
-        if funct == 0x19: return "multu %s, %s" % (REG_NAMES[rs], REG_NAMES[rt])
-        if funct == 0x1A: return "div %s, %s" % (REG_NAMES[rs], REG_NAMES[rt])
-        if funct == 0x1B: return "divu %s, %s" % (REG_NAMES[rs], REG_NAMES[rt])
-        return "R-type funct=0x%02X" % funct
-    if op == 0x02: return "j 0x%08X" % ((addr & 0xF0000000) | target)
-    if op == 0x03: return "jal 0x%08X" % ((addr & 0xF0000000) | target)
-    if op == 0x04: return "beq %s, %s, 0x%08X" % (REG_NAMES[rs], REG_NAMES[rt], addr + 4 + (imms << 2))
-    if op == 0x05: return "bne %s, %s, 0x%08X" % (REG_NAMES[rs], REG_NAMES[rt], addr + 4 + (imms << 2))
-    if op == 0x06: return "blez %s, 0x%08X" % (REG_NAMES[rs], addr + 4 + (imms << 2))
-    if op == 0x07: return "bgtz %s, 0x%08X" % (REG_NAMES[rs], addr + 4 + (imms << 2))
-    if op == 0x01:
-        if rt == 0: return "bltz %s, 0x%08X" % (REG_NAMES[rs], addr + 4 + (imms << 2))
-        if rt == 1: return "bgez %s, 0x%08X" % (REG_NAMES[rs], addr + 4 + (imms << 2))
-        return "REGIMM rt=%d" % rt
-    if op == 0x08: return "addi %s, %s, %d" % (REG_NAMES[rt], REG_NAMES[rs], imms)
-    if op == 0x09: return "addiu %s, %s, %d" % (REG_NAMES[rt], REG_NAMES[rs], imms)
-    if op == 0x0A: return "slti %s, %s, %d" % (REG_NAMES[rt], REG_NAMES[rs], imms)
-    if op == 0x0B: return "sltiu %s, %s, %d" % (REG_NAMES[rt], REG_NAMES[rs], imms)
-    if op == 0x0C: return "andi %s, %s, 0x%04X" % (REG_NAMES[rt], REG_NAMES[rs], imm)
-    if op == 0x0D: return "ori %s, %s, 0x%04X" % (REG_NAMES[rt], REG_NAMES[rs], imm)
-    if op == 0x0E: return "xori %s, %s, 0x%04X" % (REG_NAMES[rt], REG_NAMES[rs], imm)
-    if op == 0x0F: return "lui %s, 0x%04X" % (REG_NAMES[rt], imm)
-    if op == 0x20: return "lb %s, %d(%s)" % (REG_NAMES[rt], imms, REG_NAMES[rs])
-    if op == 0x21: return "lh %s, %d(%s)" % (REG_NAMES[rt], imms, REG_NAMES[rs])
-    if op == 0x23: return "lw %s, %d(%s)" % (REG_NAMES[rt], imms, REG_NAMES[rs])
-    if op == 0x24: return "lbu %s, %d(%s)" % (REG_NAMES[rt], imms, REG_NAMES[rs])
-    if op == 0x25: return "lhu %s, %d(%s)" % (REG_NAMES[rt], imms, REG_NAMES[rs])
-    if op == 0x28: return "sb %s, %d(%s)" % (REG_NAMES[rt], imms, REG_NAMES[rs])
-    if op == 0x29: return "sh %s, %d(%s)" % (REG_NAMES[rt], imms, REG_NAMES[rs])
-    if op == 0x2B: return "sw %s, %d(%s)" % (REG_NAMES[rt], imms, REG_NAMES[rs])
-    return "??? op=0x%02X (0x%08X)" % (op, word)
-
 def ram_to_file(ram_addr):
     return (ram_addr - 0x80010000) + 0x800
 
@@ -121,12 +50,8 @@ def disasm_range(ram_start, ram_end, label=""):
         print("\n" + "=" * 70)
         print("  %s" % label)
         print("=" * 70)
-    for addr in range(ram_start, ram_end, 4):
-        foff = ram_to_file(addr)
-        w = read_word(foff)
-        if w is None:
-            continue
-        asm = disasm_one(w, addr)
+    decoded = decode_range(exe_data, 0x80010000, ram_start, ram_end, 0x800)
+    for addr, w, asm in decoded.lines(valid_only=True):
         print("  0x%08X: %08X  %s" % (addr, w, asm))
 
 
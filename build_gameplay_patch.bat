@@ -8,6 +8,9 @@ REM Optional patches (set to 1 to enable)
 REM ========================================================================
 set PATCH_LOOT_TIMER=1
 set TEST_SPELL_FREEZE=0
+REM BUILD_BIN=0 : skip the 700 MB patched BIN, only export the patch files
+set BUILD_BIN=1
+set EXPORT_PATCH=1
 
 REM ========================================================================
 REM Initialize logging
@@ -37,15 +40,14 @@ echo Build started: %date% %time%
 echo.
 echo Ce script va:
 echo   1. Copier BLAZE.ALL clean depuis extract vers work
-echo   2. Patcher les prix Fate Coin Shop dans BLAZE.ALL
-echo   3. Patcher les descriptions d'items dans BLAZE.ALL
-echo   4. Patcher les prix d'enchere - base a 0 - dans BLAZE.ALL
-echo   5. Patcher les stats des monstres dans BLAZE.ALL
-echo   6. Patcher les spawns de monstres dans BLAZE.ALL
-echo   7. Patcher le timer de disparition des coffres dans BLAZE.ALL (optionnel, desactive)
-echo   8. Creer le BIN patche a partir du BIN clean original
-echo   9. Injecter BLAZE.ALL dans le BIN (2 emplacements)
-echo  10. Mettre a jour la documentation
+echo   2. Patcher BLAZE.ALL en un seul passage - build_gameplay_patch.py :
+echo        prix Fate Coin Shop, descriptions d'items, prix d'enchere,
+echo        stats des monstres, spawns, formations, timer des coffres
+echo        - optionnel -, sorts, degats des pieges
+echo   3. Creer le BIN patche a partir du BIN clean original
+echo   4. Injecter BLAZE.ALL dans le BIN (2 emplacements)
+echo   5. Exporter le patch PPF3 + .bbpatch - secteurs modifies seulement
+echo   6. Mettre a jour la documentation
 echo.
 echo ========================================================================
 echo.
@@ -57,7 +59,7 @@ type "%LOGFILE%"
 REM ========================================================================
 REM Step 1: Copy clean BLAZE.ALL from extract to work
 REM ========================================================================
-call :log "[1/12] Copying clean BLAZE.ALL from extract to work..."
+call :log "[1/6] Copying clean BLAZE.ALL from extract to work..."
 call :log ""
 
 set CLEAN_BLAZE=%~dp0Blaze  Blade - Eternal Quest (Europe)\extract\BLAZE.ALL
@@ -80,220 +82,110 @@ call :log "[OK] Clean BLAZE.ALL copied to work folder"
 call :log ""
 
 REM ========================================================================
-REM Step 2: Patch Fate Coin Shop prices
+REM Step 2: Run all BLAZE.ALL patch stages in one process
+REM   (fate coin shop, items, auction prices, monster stats, spawn groups,
+REM    formations, loot timer, spell table, trap damage)
+REM   BLAZE.ALL is read once and written once by build_gameplay_patch.py
 REM ========================================================================
-call :log "[2/12] Patching Fate Coin Shop prices..."
+call :log "[2/6] Patching BLAZE.ALL (all stages, single pass)..."
 call :log ""
 
-py -3 Data\fate_coin_shop\patch_fate_coin_shop.py >> "%LOGFILE%" 2>&1
-if errorlevel 1 (
-    call :log ""
-    call :log "[ERROR] Fate Coin Shop patch failed!"
-    goto :error
-)
+set STAGE_ARGS=
+if not "%PATCH_LOOT_TIMER%"=="1" set STAGE_ARGS=--skip loot_timer
 
-call :log ""
-call :log "[OK] Fate Coin Shop prices patched"
-call :log ""
+py -3 build_gameplay_patch.py %STAGE_ARGS% > "%TEMP%\blaze_build_output.txt" 2>&1
+set STAGES_ERRORLEVEL=%errorlevel%
+type "%TEMP%\blaze_build_output.txt" >> "%LOGFILE%"
 
-REM ========================================================================
-REM Step 3: Patch Items descriptions
-REM ========================================================================
-call :log "[3/12] Patching Items descriptions in BLAZE.ALL..."
-call :log ""
-
-cd Data\items
-py -3 patch_items_in_bin.py > "%TEMP%\items_patch_output.txt" 2>&1
-set ITEMS_ERRORLEVEL=%errorlevel%
-type "%TEMP%\items_patch_output.txt" >> "%LOGFILE%"
-cd ..\..
-
-if %ITEMS_ERRORLEVEL% neq 0 (
+if %STAGES_ERRORLEVEL% neq 0 (
     call :log ""
-    call :log "[ERROR] Items patch failed!"
+    call :log "[ERROR] BLAZE.ALL patch stages failed!"
     goto :error
 )
 
 REM Extract patched count from output
 set ITEMS_PATCHED=0
-for /f "tokens=2 delims==" %%a in ('findstr "PATCHED_COUNT=" "%TEMP%\items_patch_output.txt"') do set ITEMS_PATCHED=%%a
+for /f "tokens=2 delims==" %%a in ('findstr "PATCHED_COUNT=" "%TEMP%\blaze_build_output.txt"') do set ITEMS_PATCHED=%%a
 
 call :log ""
-call :log "[OK] Items descriptions patched (%ITEMS_PATCHED% items)"
-call :log ""
-
-REM ========================================================================
-REM Step 4: Patch auction base prices to 0
-REM ========================================================================
-call :log "[4/12] Patching auction base prices (set to 0)..."
-call :log ""
-
-py -3 Data\auction_prices\patch_auction_base_prices.py >> "%LOGFILE%" 2>&1
-if errorlevel 1 (
-    call :log ""
-    call :log "[ERROR] Auction base prices patch failed!"
-    goto :error
-)
-
-call :log ""
-call :log "[OK] Auction base prices set to 0"
-call :log ""
-
-REM ========================================================================
-REM Step 5: Patch monster stats in BLAZE.ALL
-REM ========================================================================
-call :log "[5/12] Patching monster stats in BLAZE.ALL..."
+call :log "[OK] BLAZE.ALL patched (%ITEMS_PATCHED% items)"
 call :log ""
 
-py -3 Data\monster_stats\scripts\patch_monster_stats.py >> "%LOGFILE%" 2>&1
-if errorlevel 1 (
+if not "%BUILD_BIN%"=="1" (
+    call :log "[3/6] [4/6] Patched BIN skipped - BUILD_BIN=0"
     call :log ""
-    call :log "[ERROR] Monster stats patch failed!"
-    goto :error
+    goto :export_patch
 )
 
-call :log ""
-call :log "[OK] Monster stats patched in BLAZE.ALL"
-call :log ""
-
 REM ========================================================================
-REM Step 6: Patch monster spawn groups in BLAZE.ALL
+REM Step 3: Create fresh patched BIN from clean original
 REM ========================================================================
-call :log "[6/12] Patching monster spawn groups in BLAZE.ALL..."
+call :log "[3/6] Creating fresh patched BIN from clean original..."
 call :log ""
 
-py -3 WIP\level_design\spawns\scripts\patch_spawn_groups.py >> "%LOGFILE%" 2>&1
-if errorlevel 1 (
-    call :log ""
-    call :log "[ERROR] Monster spawn groups patch failed!"
-    goto :error
-)
-
-call :log ""
-call :log "[OK] Monster spawn groups patched in BLAZE.ALL"
-call :log ""
-
-REM ========================================================================
-REM Step 6b: Patch formation templates in BLAZE.ALL
-REM ========================================================================
-call :log "[6b/12] Patching formation templates in BLAZE.ALL..."
-call :log ""
+set CLEAN_BIN=%~dp0Blaze  Blade - Eternal Quest (Europe)\Blaze ^& Blade - Eternal Quest (Europe).bin
+set PATCHED_BIN=%~dp0output\Blaze ^& Blade - Patched.bin
 
-py -3 Data\formations\Scripts\patch_formations.py >> "%LOGFILE%" 2>&1
-if errorlevel 1 (
-    call :log ""
-    call :log "[ERROR] Formation templates patch failed!"
+if not exist "%CLEAN_BIN%" (
+    call :log "[ERROR] Clean BIN not found: %CLEAN_BIN%"
     goto :error
 )
 
-call :log ""
-call :log "[OK] Formation templates patched in BLAZE.ALL"
-call :log ""
-
-REM ========================================================================
-REM Step 7: Patch chest despawn timer in BLAZE.ALL overlay code (OPTIONAL)
-REM ========================================================================
-if "%PATCH_LOOT_TIMER%"=="1" (
-    call :log "[7/12] Patching chest despawn timer in overlay code..."
-    call :log ""
-
-    py -3 Data\LootTimer\patch_loot_timer.py >> "%LOGFILE%" 2>&1
-    if errorlevel 1 (
-        call :log ""
-        call :log "[ERROR] Loot timer overlay patch failed!"
-        goto :error
-    )
-
-    call :log ""
-    call :log "[OK] Chest despawn timer patched in overlay code"
-    call :log ""
-) else (
-    call :log "[7/10] Chest despawn timer patch SKIPPED (set PATCH_LOOT_TIMER=1 to enable)"
-    call :log ""
-)
-
-REM ========================================================================
-REM Step 8: Patch spell table entries in BLAZE.ALL
-REM ========================================================================
-call :log "[8/12] Patching spell table entries in BLAZE.ALL..."
-call :log ""
+copy /Y "%CLEAN_BIN%" "%PATCHED_BIN%" >> "%LOGFILE%" 2>&1
 
-py -3 Data\spells\patch_spell_table.py >> "%LOGFILE%" 2>&1
-if errorlevel 1 (
+if not exist "%PATCHED_BIN%" (
     call :log ""
-    call :log "[ERROR] Spell table patch failed!"
+    call :log "[ERROR] Failed to copy clean BIN!"
     goto :error
 )
 
 call :log ""
-call :log "[OK] Spell table entries processed"
+call :log "[OK] Fresh patched BIN created from clean original"
 call :log ""
 
 REM ========================================================================
-REM Step 9: Patch trap/environmental damage in BLAZE.ALL
+REM Step 4: Inject BLAZE.ALL into BIN (2 locations)
 REM ========================================================================
-call :log "[9/12] Patching trap damage in BLAZE.ALL..."
+call :log "[4/6] Injecting BLAZE.ALL into BIN (2 locations)..."
 call :log ""
 
-py -3 Data\trap_damage\patch_trap_damage.py >> "%LOGFILE%" 2>&1
+py -3 patch_blaze_all.py --journal "output\BLAZE.ALL.journal.json" >> "%LOGFILE%" 2>&1
 if errorlevel 1 (
     call :log ""
-    call :log "[ERROR] Trap damage patch failed!"
+    call :log "[ERROR] BLAZE.ALL injection failed!"
     goto :error
 )
 
 call :log ""
-call :log "[OK] Trap damage processed"
+call :log "[OK] BLAZE.ALL injected into BIN"
 call :log ""
 
 REM ========================================================================
-REM Step 10: Create fresh patched BIN from clean original
+REM Step 5: Export patch files (PPF3 + native .bbpatch) from the dirty
+REM         sectors, reading only those sectors from the clean BIN
 REM ========================================================================
-call :log "[10/12] Creating fresh patched BIN from clean original..."
-call :log ""
+:export_patch
+if not "%EXPORT_PATCH%"=="1" goto :update_docs
 
-set CLEAN_BIN=%~dp0Blaze  Blade - Eternal Quest (Europe)\Blaze ^& Blade - Eternal Quest (Europe).bin
-set PATCHED_BIN=%~dp0output\Blaze ^& Blade - Patched.bin
-
-if not exist "%CLEAN_BIN%" (
-    call :log "[ERROR] Clean BIN not found: %CLEAN_BIN%"
-    goto :error
-)
-
-copy /Y "%CLEAN_BIN%" "%PATCHED_BIN%" >> "%LOGFILE%" 2>&1
-
-if not exist "%PATCHED_BIN%" (
-    call :log ""
-    call :log "[ERROR] Failed to copy clean BIN!"
-    goto :error
-)
-
-call :log ""
-call :log "[OK] Fresh patched BIN created from clean original"
-call :log ""
-
-REM ========================================================================
-REM Step 11: Inject BLAZE.ALL into BIN (2 locations)
-REM ========================================================================
-call :log "[11/12] Injecting BLAZE.ALL into BIN (2 locations)..."
+call :log "[5/6] Exporting patch files..."
 call :log ""
 
-py -3 patch_blaze_all.py >> "%LOGFILE%" 2>&1
+py -3 export_patch.py --journal "output\BLAZE.ALL.journal.json" >> "%LOGFILE%" 2>&1
 if errorlevel 1 (
     call :log ""
-    call :log "[ERROR] BLAZE.ALL injection failed!"
+    call :log "[ERROR] Patch export failed!"
     goto :error
 )
 
 call :log ""
-call :log "[OK] BLAZE.ALL injected into BIN"
+call :log "[OK] output/BabGameplayPatch.ppf + .bbpatch exported"
 call :log ""
 
-
 REM ========================================================================
-REM Step 12: Update documentation
+REM Step 6: Update documentation
 REM ========================================================================
-call :log "[12/12] Updating documentation..."
+:update_docs
+call :log "[6/6] Updating documentation..."
 call :log ""
 
 py -3 -c "from pathlib import Path; from datetime import datetime; import sys; items_count = sys.argv[1]; readme = Path('README.md'); content = readme.read_text(encoding='utf-8'); patch_info = f'\n## Last Patch Build\n\n**Date:** {datetime.now().strftime(\"%%Y-%%m-%%d %%H:%%M:%%S\")}\n\n**Patches Applied:**\n- Fate Coin Shop prices adjusted\n- Items descriptions updated ({items_count} items)\n- Auction base prices set to 0\n- Monster stats balanced\n- BLAZE.ALL integrated\n\n**Source:** Blaze & Blade - Eternal Quest (Europe).bin\n**Output:** output/Blaze & Blade - Patched.bin\n\n'; import re; content = re.sub(r'## Last Patch Build.*?(?=##|\Z)', patch_info, content, flags=re.DOTALL) if '## Last Patch Build' in content else content + patch_info; readme.write_text(content, encoding='utf-8'); print('[OK] README.md updated')" %ITEMS_PATCHED% >> "%LOGFILE%" 2>&1
@@ -318,6 +210,7 @@ call :log ""
 call :log "Fichiers crees:"
 call :log "  - output/BLAZE.ALL (patched)"
 call :log "  - output/Blaze ^& Blade - Patched.bin (ready for game)"
+call :log "  - output/BabGameplayPatch.ppf + .bbpatch (patch vs clean BIN)"
 call :log ""
 call :log "Source:"
 call :log "  - Blaze ^& Blade - Eternal Quest (Europe).bin (clean original)"
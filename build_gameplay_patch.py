@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+build_gameplay_patch.py
+Runs every BLAZE.ALL patcher in a single process on one shared buffer.
+
+output/BLAZE.ALL is read once, each patcher's patch_data(data) runs as a
+build stage in the order below, and the image is written once at the end.
+If any stage fails nothing is written, so output/BLAZE.ALL never holds a
+half-patched image.
+
+Each patcher script still works standalone (py -3 <script>), this driver
+only replaces the per-step read/write of the 46 MB image.
+
+The buffer is a JournaledBuffer (tools/patch_journal.py): every write is
+recorded with its stage and config entry, and the journal is saved next to
+the image as output/BLAZE.ALL.journal.json (its "sectors" list feeds
+patch_blaze_all.py --journal).
+
+Structure lookups (monster/item entries, name fields) go through the index
+of the starting image (tools/blaze_index.py, output/blaze_index/), so the
+stages look offsets up instead of scanning the image again.
+
+Incremental builds: each stage gets a key hashing the image it starts from,
+its script, the shared tools/ modules, the config files it reads (`inputs`)
+and the keys of the earlier stages whose output it reads (`depends`). The
+stage's journal is cached in output/build_cache/<stage>.json; when the key is
+unchanged the cached journal is replayed instead of running the stage. A
+replay is also refused if the bytes it overwrites are not the ones recorded
+(the stage then simply reruns).
+
+Usage: py -3 build_gameplay_patch.py [--skip STAGE ...] [--only STAGE ...]
+                                     [--dry-run] [--no-cache] [--list]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib.util
+import json
+import sys
+import time
+import traceback
+from collections import namedtuple
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+BLAZE_ALL = SCRIPT_DIR / "output" / "BLAZE.ALL"
+JOURNAL = SCRIPT_DIR / "output" / "BLAZE.ALL.journal.json"
+CACHE_DIR = SCRIPT_DIR / "output" / "build_cache"
+CACHE_VERSION = 1
+
+sys.path.insert(0, str(SCRIPT_DIR / "tools"))
+
+import blaze_index
+from patch_journal import JournaledBuffer, PatchJournal, find_untracked
+
+Stage = namedtuple("Stage", ["name", "script", "description",
+                             "inputs", "depends"])
+
+# Build stages, in build order (same order as the old per-step .bat chain).
+# inputs:  glob patterns (repo-relative) of the config files the stage reads
+# depends: earlier stages that write bytes this stage reads from the image
+STAGES = [
+    Stage("fate_coin_shop", "Data/fate_coin_shop/patch_fate_coin_shop.py",
+          "Fate Coin Shop prices",
+          ["Data/fate_coin_shop/fate_coin_shop.json"], []),
+    Stage("items", "Data/items/patch_items_in_bin.py",
+          "Items descriptions",
+          ["Data/items/all_items_clean.json"], []),
+    Stage("auction_prices", "Data/auction_prices/patch_auction_base_prices.py",
+          "Auction base prices (set to 0)",
+          ["Data/items/all_items_clean.json"], ["items"]),
+    Stage("monster_stats", "Data/monster_stats/scripts/patch_monster_stats.py",
+          "Monster stats",
+          ["Data/monster_stats/**/*.json"], []),
+    Stage("spawn_groups", "WIP/level_design/spawns/scripts/patch_spawn_groups.py",
+          "Monster spawn groups",
+          ["WIP/level_design/spawns/data/spawn_groups/*.json"],
+          ["monster_stats"]),
+    Stage("formations", "Data/formations/Scripts/patch_formations.py",
+          "Formation templates & spawn points",
+          ["Data/formations/**/*.json", "Data/monster_stats/**/*.json"],
+          ["monster_stats", "spawn_groups"]),
+    Stage("loot_timer", "Data/LootTimer/patch_loot_timer.py",
+          "Chest despawn timer",
+          [], []),
+    Stage("spell_table", "Data/spells/patch_spell_table.py",
+          "Spell table entries",
+          ["Data/spells/spell_config.json"], []),
+    Stage("trap_damage", "Data/trap_damage/patch_trap_damage.py",
+          "Trap damage",
+          ["Data/trap_damage/trap_damage_config.json"], []),
+]
+
+
+class StageError(Exception):
+    """A build stage failed (non-zero return, SystemExit or exception)."""
+
+
+def load_stage_module(stage):
+    """Import a patcher script by path and return its module."""
+    path = SCRIPT_DIR / stage.script
+    spec = importlib.util.spec_from_file_location(
+        "stage_" + stage.name, str(path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not hasattr(module, "patch_data"):
+        raise StageError("{} has no patch_data(data)".format(stage.script))
+    return module
+
+
+def run_stage(stage, data):
+    """Run one stage on the shared buffer. Returns elapsed seconds."""
+    start = time.perf_counter()
+    module = load_stage_module(stage)
+    data.journal.stage = stage.name
+    data.journal.source = None
+    try:
+        rc = module.patch_data(data)
+    except SystemExit as e:
+        rc = e.code
+    elapsed = time.perf_counter() - start
+    if rc:
+        raise StageError("{} failed (code {})".format(stage.name, rc))
+    return elapsed
+
+
+class _Tee:
+    """stdout wrapper that keeps a copy of everything printed."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def getvalue(self):
+        return "".join(self.parts)
+
+
+def engine_digest():
+    """Hash of the driver and the shared tools/ modules."""
+    h = hashlib.sha1()
+    for path in [Path(__file__)] + sorted((SCRIPT_DIR / "tools").glob("*.py")):
+        h.update(path.name.encode("utf-8"))
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def stage_key(stage, base_sha1, engine_sha1, keys):
+    """Cache key of a stage: everything its output depends on."""
+    h = hashlib.sha1()
+    h.update("{}|{}|{}|{}".format(CACHE_VERSION, stage.name, base_sha1,
+                                  engine_sha1).encode("utf-8"))
+    h.update((SCRIPT_DIR / stage.script).read_bytes())
+    files = set()
+    for pattern in stage.inputs:
+        files.update(SCRIPT_DIR.glob(pattern))
+    for path in sorted(files):
+        h.update(path.relative_to(SCRIPT_DIR).as_posix().encode("utf-8"))
+        h.update(path.read_bytes())
+    for dep in stage.depends:
+        # A skipped dependency counts as "no output"
+        h.update("{}={}".format(dep, keys.get(dep, "skipped")).encode("utf-8"))
+    return h.hexdigest()
+
+
+def load_cached(stage, key):
+    """Cached {"journal", "output"} of a stage if its key matches, else None."""
+    path = CACHE_DIR / "{}.json".format(stage.name)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("key") != key:
+        return None
+    return cached
+
+
+def save_cached(stage, key, journal, output):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    entry = {
+        "key": key,
+        "output": output,
+        "journal": journal.to_dict(),
+    }
+    with open(CACHE_DIR / "{}.json".format(stage.name), "w",
+              encoding="utf-8") as f:
+        json.dump(entry, f)
+
+
+def replay_stage(stage, data, cached):
+    """Replay a cached stage journal. Returns elapsed seconds, or None if
+    the image under the stage changed and it must run instead."""
+    start = time.perf_counter()
+    journal = PatchJournal.from_dict(cached["journal"])
+    if not data.replay(journal):
+        print("  [CACHE] recorded bytes differ, running stage")
+        return None
+    print("  [CACHE] inputs unchanged, replayed {} range(s) - last output:".format(
+        len(journal)))
+    sys.stdout.write(cached.get("output", ""))
+    return time.perf_counter() - start
+
+
+def check_untracked(stage, data, original):
+    """Journal writes of the stage that bypassed JournaledBuffer."""
+    added = find_untracked(data.journal, original, data)
+    if added:
+        print("  [WARN] {}: {} write(s) not seen by the journal "
+              "(recorded as untracked)".format(stage.name, added))
+
+
+def select_stages(only, skip):
+    names = {s.name for s in STAGES}
+    for name in list(only or []) + list(skip or []):
+        if name not in names:
+            raise SystemExit("ERROR: unknown stage '{}' (valid: {})".format(
+                name, ", ".join(s.name for s in STAGES)))
+    stages = STAGES
+    if only:
+        stages = [s for s in stages if s.name in only]
+    if skip:
+        stages = [s for s in stages if s.name not in skip]
+    return stages
+
+
+def print_timings(timings, load_time, write_time):
+    print()
+    print("=" * 60)
+    print("  Stage timings")
+    print("=" * 60)
+    print("  {:<24} {:>9}".format("load BLAZE.ALL", "{:.3f}s".format(load_time)))
+    for name, elapsed in timings:
+        print("  {:<24} {:>9}".format(name, "{:.3f}s".format(elapsed)))
+    if write_time is not None:
+        print("  {:<24} {:>9}".format("write BLAZE.ALL",
+                                      "{:.3f}s".format(write_time)))
+    total = load_time + sum(t for _, t in timings) + (write_time or 0)
+    print("  " + "-" * 34)
+    print("  {:<24} {:>9}".format("total", "{:.3f}s".format(total)))
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Patch output/BLAZE.ALL with every build stage in one pass")
+    parser.add_argument("--skip", action="append", default=[],
+                        metavar="STAGE", help="Skip a stage (repeatable)")
+    parser.add_argument("--only", action="append", default=[],
+                        metavar="STAGE", help="Run only these stages (repeatable)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Run all stages but do not write BLAZE.ALL")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Run every stage (the cache is still refreshed)")
+    parser.add_argument("--list", action="store_true",
+                        help="List the build stages and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for stage in STAGES:
+            print("  {:<16} {:<55} {}".format(
+                stage.name, stage.script, stage.description))
+        return 0
+
+    stages = select_stages(args.only, args.skip)
+
+    if not BLAZE_ALL.exists():
+        print("[ERROR] {} not found".format(BLAZE_ALL))
+        print("Copy clean BLAZE.ALL from extract/ first")
+        return 1
+
+    print("=" * 60)
+    print("  Gameplay Patch Build ({} stages)".format(len(stages)))
+    print("=" * 60)
+
+    start = time.perf_counter()
+    data = JournaledBuffer(BLAZE_ALL.read_bytes())
+    original = bytes(data)
+    base_sha1 = hashlib.sha1(original).hexdigest()
+    engine_sha1 = engine_digest()
+    index = blaze_index.BlazeIndex(original, base_sha1)
+    blaze_index.activate(index)
+    load_time = time.perf_counter() - start
+    print("Loaded {} ({:,} bytes)".format(BLAZE_ALL, len(data)))
+
+    timings = []
+    keys = {}
+    for idx, stage in enumerate(stages, 1):
+        print()
+        print("[{}/{}] {} ({})".format(idx, len(stages), stage.description,
+                                       stage.name))
+        print("-" * 60)
+        try:
+            key = stage_key(stage, base_sha1, engine_sha1, keys)
+            keys[stage.name] = key
+            cached = None if args.no_cache else load_cached(stage, key)
+            elapsed = replay_stage(stage, data, cached) if cached else None
+            if elapsed is not None:
+                timings.append((stage.name + " (cached)", elapsed))
+                continue
+
+            first_range = len(data.journal)
+            tee = _Tee(sys.stdout)
+            with contextlib.redirect_stdout(tee):
+                elapsed = run_stage(stage, data)
+                check_untracked(stage, data, original)
+            timings.append((stage.name, elapsed))
+            stage_journal = PatchJournal()
+            stage_journal.ranges = data.journal.ranges[first_range:]
+            save_cached(stage, key, stage_journal, tee.getvalue())
+        except Exception as e:
+            if not isinstance(e, StageError):
+                traceback.print_exc()
+            print()
+            print("[ERROR] Stage {}: {}".format(stage.name, e))
+            print("BLAZE.ALL NOT written")
+            print_timings(timings, load_time, None)
+            return 1
+
+    index.save()
+    journal = data.journal
+    print()
+    print("Journal: {} range(s), {:,} bytes, {} sector(s)".format(
+        len(journal), journal.changed_bytes(), len(journal.sectors())))
+    for a, b in journal.conflicts():
+        print("  [WARN] 0x{:08X}: {} ({}) overwrites {} ({})".format(
+            max(a.offset, b.offset), b.stage, b.source, a.stage, a.source))
+
+    write_time = None
+    print()
+    if args.dry_run:
+        print("DRY RUN - BLAZE.ALL not written")
+    else:
+        start = time.perf_counter()
+        if data == original:
+            print("No changes - BLAZE.ALL not rewritten")
+        else:
+            BLAZE_ALL.write_bytes(data)
+            print("[OK] BLAZE.ALL written")
+        journal.save(JOURNAL, base=original, result=data)
+        write_time = time.perf_counter() - start
+        print("[OK] Journal written: {}".format(JOURNAL))
+
+    print_timings(timings, load_time, write_time)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+export_patch.py
+Exports the gameplay patch as a small patch file against the clean BIN
+
+Only the BLAZE.ALL sectors changed by the build are read from the clean BIN
+(both copies), their user data replaced and their EDC/ECC regenerated, so no
+700 MB patched BIN needs to exist. Two formats are written:
+
+  - output/BabGameplayPatch.ppf      PPF 3.0, for PPF-O-Matic / ApplyPPF /
+                                     most emulators' auto-patching
+  - output/BabGameplayPatch.bbpatch  native indexed format: a table of
+                                     (offset, length, old crc32, new crc32)
+                                     followed by the raw sector data, applied
+                                     with one seek+write per entry (--apply)
+
+Dirty sectors come from the build journal (output/BLAZE.ALL.journal.json)
+when it matches, otherwise from a comparison with the clean BLAZE.ALL.
+
+Usage: py -3 export_patch.py [--journal FILE] [--description TEXT]
+       py -3 export_patch.py --apply output/BabGameplayPatch.bbpatch <bin>
+"""
+
+import argparse
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+SCRIPT_DIR  = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR / "tools"))
+
+import disc_sector
+import patch_blaze_all
+from iso9660 import SECTOR_RAW, DiscImage
+from patch_blaze_all import CLEAN_BLAZE_ALL, USER_SIZE, locate_blaze_all, sector_chunk
+
+CLEAN_BIN   = SCRIPT_DIR / "Blaze  Blade - Eternal Quest (Europe)" / "Blaze & Blade - Eternal Quest (Europe).bin"
+JOURNAL     = SCRIPT_DIR / "output" / "BLAZE.ALL.journal.json"
+PPF_OUT     = SCRIPT_DIR / "output" / "BabGameplayPatch.ppf"
+NATIVE_OUT  = SCRIPT_DIR / "output" / "BabGameplayPatch.bbpatch"
+
+# PPF 3.0
+PPF_MAGIC = b"PPF30"
+PPF_METHOD = 2              # PPF 3.0
+PPF_DESC_SIZE = 50
+PPF_BLOCKCHECK_OFF = 0x9320 # BIN images: 1024 bytes checked before patching
+PPF_BLOCKCHECK_SIZE = 1024
+PPF_MAX_RECORD = 255
+PPF_RECORD_OVERHEAD = 9     # u64 offset + u8 length
+
+# Native format
+NATIVE_MAGIC = b"BBPATCH\x00"
+NATIVE_VERSION = 1
+NATIVE_HEADER = struct.Struct("<8sIIQ64s")   # magic, version, count, bin size, desc
+NATIVE_ENTRY = struct.Struct("<QIII")        # offset, length, old crc32, new crc32
+
+
+def build_sectors(data, sectors, clean_bin, lba_locations, user_off):
+    """Patched RAW sectors for the dirty BLAZE.ALL sectors, both copies.
+
+    Returns a sorted list of (lba, old_raw, new_raw), reading only those
+    sectors from the clean BIN.
+    """
+    targets = sorted((lba_start + i, i) for lba_start in lba_locations for i in sectors)
+    result = []
+    with open(clean_bin, 'rb') as f:
+        for lba, i in targets:
+            f.seek(lba * SECTOR_RAW)
+            old = f.read(SECTOR_RAW)
+            if len(old) != SECTOR_RAW:
+                raise SystemExit(f"ERROR: LBA {lba} past the end of {clean_bin}")
+            new = bytearray(old)
+            new[user_off:user_off + USER_SIZE] = sector_chunk(data, i)
+            result.append((lba, old, new))
+
+    # EDC/ECC for all of them in one batch
+    raw = bytearray(b"".join(new for _, _, new in result))
+    disc_sector.regenerate(disc_sector.as_sectors(raw))
+    return [(lba, old, bytes(raw[k * SECTOR_RAW:(k + 1) * SECTOR_RAW]))
+            for k, (lba, old, _) in enumerate(result)]
+
+
+def diff_runs(old, new, max_gap=PPF_RECORD_OVERHEAD):
+    """(start, end) runs where new differs from old.
+
+    Runs closer than max_gap bytes are merged (cheaper than a new record).
+    """
+    runs = []
+    n = len(new)
+    i = 0
+    while i < n:
+        if old[i] == new[i]:
+            i += 1
+            continue
+        j = i + 1
+        while j < n and old[j] != new[j]:
+            j += 1
+        if runs and i - runs[-1][1] <= max_gap:
+            runs[-1][1] = j
+        else:
+            runs.append([i, j])
+        i = j
+    return runs
+
+
+def write_ppf(path, patched, description, blockcheck):
+    """Write a PPF 3.0 patch (no undo data)."""
+    desc = description.encode("ascii", "replace")[:PPF_DESC_SIZE]
+    desc = desc.ljust(PPF_DESC_SIZE, b" ")
+    out = bytearray()
+    out += PPF_MAGIC
+    out += bytes([PPF_METHOD])
+    out += desc
+    out += bytes([0,                                  # image type: BIN
+                  1 if blockcheck else 0,             # block check
+                  0,                                  # undo data
+                  0])                                 # dummy
+    if blockcheck:
+        out += blockcheck
+
+    records = 0
+    for lba, old, new in patched:
+        base = lba * SECTOR_RAW
+        for start, end in diff_runs(old, new):
+            for pos in range(start, end, PPF_MAX_RECORD):
+                chunk = new[pos:min(end, pos + PPF_MAX_RECORD)]
+                out += struct.pack("<QB", base + pos, len(chunk))
+                out += chunk
+                records += 1
+    Path(path).write_bytes(out)
+    return records, len(out)
+
+
+def write_native(path, patched, description, bin_size):
+    """Write the native indexed patch: header, entry table, then data.
+
+    Consecutive sectors are merged into one entry.
+    """
+    entries = []   # [offset, old bytes, new bytes]
+    for lba, old, new in patched:
+        offset = lba * SECTOR_RAW
+        if entries and entries[-1][0] + len(entries[-1][2]) == offset:
+            entries[-1][1] += old
+            entries[-1][2] += new
+        else:
+            entries.append([offset, bytearray(old), bytearray(new)])
+
+    desc = description.encode("utf-8")[:64]
+    out = bytearray(NATIVE_HEADER.pack(NATIVE_MAGIC, NATIVE_VERSION,
+                                       len(entries), bin_size, desc))
+    for offset, old, new in entries:
+        out += NATIVE_ENTRY.pack(offset, len(new), zlib.crc32(old), zlib.crc32(new))
+    for _, _, new in entries:
+        out += new
+    Path(path).write_bytes(out)
+    return len(entries), len(out)
+
+
+def read_native(path):
+    """Parse a native patch. Returns (header dict, [(offset, old_crc, new_crc, data)])."""
+    blob = Path(path).read_bytes()
+    magic, version, count, bin_size, desc = NATIVE_HEADER.unpack_from(blob, 0)
+    if magic != NATIVE_MAGIC or version != NATIVE_VERSION:
+        raise SystemExit(f"ERROR: {path} is not a v{NATIVE_VERSION} .bbpatch file")
+    pos = NATIVE_HEADER.size
+    table = []
+    for _ in range(count):
+        table.append(NATIVE_ENTRY.unpack_from(blob, pos))
+        pos += NATIVE_ENTRY.size
+    entries = []
+    for offset, length, old_crc, new_crc in table:
+        entries.append((offset, old_crc, new_crc, blob[pos:pos + length]))
+        pos += length
+    header = {"bin_size": bin_size, "description": desc.rstrip(b"\x00").decode("utf-8")}
+    return header, entries
+
+
+def apply_native(patch_path, bin_path):
+    """Apply a native patch in place: check each entry's CRC, then write it."""
+    header, entries = read_native(patch_path)
+    print(f"Applying {patch_path} to {bin_path}")
+    print(f"  {header['description']}")
+
+    if Path(bin_path).stat().st_size != header["bin_size"]:
+        raise SystemExit(f"ERROR: BIN size differs from the patch target "
+                         f"({header['bin_size']} bytes)")
+
+    with open(bin_path, 'r+b') as f:
+        # Check everything before writing anything
+        todo = []
+        for offset, old_crc, new_crc, data in entries:
+            f.seek(offset)
+            crc = zlib.crc32(f.read(len(data)))
+            if crc == new_crc:
+                continue
+            if crc != old_crc:
+                raise SystemExit(f"ERROR: unexpected data at 0x{offset:X} "
+                                 f"(not the clean BIN?) - nothing written")
+            todo.append((offset, data))
+        for offset, data in todo:
+            f.seek(offset)
+            f.write(data)
+
+    print(f"  {len(todo)} entries written, {len(entries) - len(todo)} already applied")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the gameplay patch as PPF3 + native patch")
+    parser.add_argument("--journal", metavar="FILE", default=str(JOURNAL),
+                        help="Build journal listing dirty sectors")
+    parser.add_argument("--description", default="Blaze & Blade Gameplay Patch",
+                        help="Patch description (PPF: 50 chars max)")
+    parser.add_argument("--apply", nargs=2, metavar=("PATCH", "BIN"),
+                        help="Apply a .bbpatch file to a BIN in place")
+    args = parser.parse_args()
+
+    if args.apply:
+        return apply_native(*args.apply)
+
+    print("=" * 50)
+    print("  Gameplay Patch Export")
+    print("=" * 50)
+    print()
+
+    if not CLEAN_BIN.exists():
+        print(f"[ERROR] Clean BIN not found: {CLEAN_BIN}")
+        return 1
+    bin_size = CLEAN_BIN.stat().st_size
+    with DiscImage(CLEAN_BIN) as disc:
+        is_raw, user_off = disc.is_raw, disc.user_off
+    if not is_raw:
+        print(f"[ERROR] {CLEAN_BIN.name} is not a RAW (2352) image")
+        return 1
+
+    lba_locations, n_sectors = locate_blaze_all(CLEAN_BIN)
+    data = patch_blaze_all.load_blaze_all(n_sectors)
+
+    sectors = None
+    if Path(args.journal).exists():
+        print(f"\nReading journal {args.journal}...")
+        sectors = patch_blaze_all.load_journal_sectors(args.journal, data)
+    if sectors is None:
+        if not CLEAN_BLAZE_ALL.exists():
+            print(f"[ERROR] Clean BLAZE.ALL not found: {CLEAN_BLAZE_ALL}")
+            return 1
+        print(f"\nComparing with clean {CLEAN_BLAZE_ALL}...")
+        sectors = patch_blaze_all.find_dirty_sectors(data, CLEAN_BLAZE_ALL.read_bytes())
+    print(f"  Dirty sectors: {len(sectors)}/{n_sectors}")
+
+    print(f"\nReading {len(sectors) * len(lba_locations)} sectors from {CLEAN_BIN.name}...")
+    patched = build_sectors(data, sectors, CLEAN_BIN, lba_locations, user_off)
+
+    with open(CLEAN_BIN, 'rb') as f:
+        f.seek(PPF_BLOCKCHECK_OFF)
+        blockcheck = f.read(PPF_BLOCKCHECK_SIZE)
+
+    records, size = write_ppf(PPF_OUT, patched, args.description, blockcheck)
+    print(f"\n  {PPF_OUT.name}: {records} records, {size:,} bytes")
+    entries, size = write_native(NATIVE_OUT, patched, args.description, bin_size)
+    print(f"  {NATIVE_OUT.name}: {entries} entries, {size:,} bytes")
+
+    print()
+    print("=" * 50)
+    print("  Export complete!")
+    print("=" * 50)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
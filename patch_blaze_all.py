@@ -2,33 +2,92 @@
 patch_blaze_all.py
 Patches BLAZE.ALL into the game BIN file
 
-Usage: py -3 patch_blaze_all.py
+Two injection modes:
+  - dirty (default): compares output/BLAZE.ALL with the clean BLAZE.ALL
+    sector by sector and writes only the changed 2048-byte user areas into
+    the BIN, at both LBAs. The BIN must be a fresh copy of the clean BIN
+    (build step 3), since unchanged sectors are not touched.
+  - full (--full): rewrites every BLAZE.ALL sector at both LBAs, for a BIN
+    that may already hold an older patch.
+
+The LBAs and sector count of the two BLAZE.ALL copies are read from the
+BIN's ISO9660 directory (tools/iso9660.py), so other dumps of the game work.
+
+A dirty-sector list can also be given directly (--sectors FILE, a JSON list
+of BLAZE.ALL sector indices), or taken from the build journal written by
+build_gameplay_patch.py (--journal FILE), skipping the comparison with the
+clean image. The journal is only trusted if it was recorded on top of the
+clean BLAZE.ALL and matches the current output/BLAZE.ALL.
+
+On RAW (2352) images the EDC/ECC of every written sector is regenerated
+(tools/disc_sector.py), so the BIN passes strict emulators and real drives.
+
+Usage: py -3 patch_blaze_all.py [--full] [--sectors FILE] [--journal FILE]
 """
 
+import argparse
+import hashlib
+import json
+import sys
 from pathlib import Path
 
 # Configuration - Use script directory as base
 SCRIPT_DIR  = Path(__file__).parent
-BIN_IN      = SCRIPT_DIR / "output" / "Blaze & Blade - Patched.bin"
-BIN_OUT     = SCRIPT_DIR / "output" / "Blaze & Blade - Patched.bin"  # Overwrite in place
+sys.path.insert(0, str(SCRIPT_DIR / "tools"))
+
+import disc_file
+import iso9660
+
+BIN_OUT     = SCRIPT_DIR / "output" / "Blaze & Blade - Patched.bin"  # Patched in place
 BLAZE_ALL   = SCRIPT_DIR / "output" / "BLAZE.ALL"
+CLEAN_BLAZE_ALL = SCRIPT_DIR / "Blaze  Blade - Eternal Quest (Europe)" / "extract" / "BLAZE.ALL"
 
-# Two copies of BLAZE.ALL in the BIN
-LBA_LOCATIONS = [163167, 185765]  # LBAs where BLAZE.ALL starts
-SECTOR_RAW  = 2352        # RAW sector size
-USER_OFF    = 24          # MODE2/Form1 user data offset
 USER_SIZE   = 2048        # User data per sector
 
-# Number of sectors for BLAZE.ALL (46206976 / 2048 = 22566)
-ORIG_SECTORS = 22566
-
-def main():
-    print("=" * 50)
-    print("  BLAZE.ALL Patcher")
-    print("=" * 50)
-    print()
 
-    # Read modified BLAZE.ALL
+def locate_blaze_all(bin_path):
+    """(LBAs of the BLAZE.ALL copies, sectors per copy), from the BIN's
+    ISO9660 directory (two entries, 22566 sectors each on the EU disc)."""
+    try:
+        entries = iso9660.find_files(bin_path, "BLAZE.ALL")
+    except ValueError as e:
+        raise SystemExit(f"ERROR: {e}")
+    if not entries:
+        raise SystemExit(f"ERROR: BLAZE.ALL not found in {Path(bin_path).name}")
+    lbas = sorted(set(e.lba for e in entries))
+    return lbas, min(iso9660.sectors_of(e) for e in entries)
+
+
+def sector_chunk(data, i):
+    """User data of BLAZE.ALL sector i, zero-padded to USER_SIZE."""
+    src = i * USER_SIZE
+    chunk = data[src:src+USER_SIZE] if src < len(data) else b'\x00' * USER_SIZE
+    if len(chunk) < USER_SIZE:
+        chunk = chunk + b'\x00' * (USER_SIZE - len(chunk))
+    return chunk
+
+
+def find_dirty_sectors(data, clean):
+    """Return sorted indices of the sectors where data differs from clean."""
+    data_view = memoryview(data)
+    clean_view = memoryview(clean)
+    common = min(len(data), len(clean)) // USER_SIZE
+    dirty = []
+    for i in range(common):
+        src = i * USER_SIZE
+        if data_view[src:src+USER_SIZE] != clean_view[src:src+USER_SIZE]:
+            dirty.append(i)
+    # Sectors only present in one of the images (padding / truncation)
+    total = (max(len(data), len(clean)) + USER_SIZE - 1) // USER_SIZE
+    for i in range(common, total):
+        if sector_chunk(data, i) != sector_chunk(clean, i):
+            dirty.append(i)
+    return dirty
+
+
+def load_blaze_all(max_sectors=None):
+    """Read modified BLAZE.ALL and check its size (against the sectors
+    reserved for it on the disc, when known)."""
     print(f"Reading {BLAZE_ALL}...")
     data = BLAZE_ALL.read_bytes()
 
@@ -38,48 +97,115 @@ def main():
     n_sectors_new = len(data) // USER_SIZE
     print(f"  Size: {len(data)} bytes ({n_sectors_new} sectors)")
 
-    if n_sectors_new > ORIG_SECTORS:
-        raise SystemExit(f"ERROR: BLAZE.ALL is larger ({n_sectors_new}) than original ({ORIG_SECTORS})")
-
-    # Read BIN file
-    print(f"\nReading {BIN_IN}...")
-    bin_bytes = bytearray(BIN_IN.read_bytes())
-    bin_size = len(bin_bytes)
-    print(f"  Size: {bin_size} bytes")
-
-    # Verify format
-    is_raw = (bin_size % SECTOR_RAW == 0)
-    is_iso = (bin_size % USER_SIZE == 0) and not is_raw
+    if max_sectors is not None and n_sectors_new > max_sectors:
+        raise SystemExit(f"ERROR: BLAZE.ALL is larger ({n_sectors_new}) than original ({max_sectors})")
+    return data
+
+
+def inject_full(data, n_sectors, bin_path=BIN_OUT):
+    """Copy every BLAZE.ALL sector into both locations (BIN already patched)."""
+    print(f"\nRewriting all {n_sectors} sectors...")
+    return inject_sectors(data, range(n_sectors), bin_path)
+
+
+def inject_sectors(data, sectors, bin_path=BIN_OUT):
+    """Write only the given BLAZE.ALL sectors into the BIN, at both LBAs.
+
+    BLAZE.ALL is opened in the memory-mapped BIN (tools/disc_file.py) and each
+    2048-byte sector is written into both copies. On RAW images the EDC/ECC
+    of the written sectors is then regenerated; nothing else in the file is
+    read or rewritten.
+    Returns the number of sector writes.
+    """
+    print(f"\nOpening {bin_path}...")
+    with disc_file.open_file(bin_path, "BLAZE.ALL", writable=True) as blaze:
+        disc = blaze.disc
+        print(f"  Size: {disc.size} bytes")
+        print(f"  Format: {'RAW (2352)' if disc.is_raw else 'ISO (2048)'}")
+
+        for i in sectors:
+            if not 0 <= i < blaze.num_sectors:
+                raise SystemExit(f"ERROR: Sector {i} outside BLAZE.ALL (0-{blaze.num_sectors - 1})")
+            blaze.write(i * USER_SIZE, sector_chunk(data, i))
+        for loc_idx, lba_start in enumerate(blaze.lbas):
+            print(f"  Copy {loc_idx + 1}/{len(blaze.lbas)} at LBA {lba_start}: "
+                  f"{len(blaze.dirty_sectors)} sectors")
+
+        writes = len(blaze.dirty_lbas)
+        n = blaze.flush()
+        if n:
+            print(f"  EDC/ECC regenerated for {n} sectors")
+    return writes
+
+
+def load_sector_list(path):
+    """Load a JSON list of dirty BLAZE.ALL sector indices."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return sorted(set(int(i) for i in json.load(f)))
+
+
+def load_journal_sectors(path, data):
+    """Dirty sectors from a build journal, or None if it can't be trusted."""
+    with open(path, 'r', encoding='utf-8') as f:
+        journal = json.load(f)
+    if journal.get("result_sha1") != hashlib.sha1(data).hexdigest():
+        print(f"  Journal does not match {BLAZE_ALL.name} (stale), ignored")
+        return None
+    if not CLEAN_BLAZE_ALL.exists():
+        print(f"  Clean BLAZE.ALL not found, journal base can't be checked")
+        return None
+    if journal.get("base_sha1") != hashlib.sha1(CLEAN_BLAZE_ALL.read_bytes()).hexdigest():
+        print(f"  Journal was not recorded on the clean BLAZE.ALL, ignored")
+        return None
+    return sorted(set(int(i) for i in journal["sectors"]))
 
-    if not (is_raw or is_iso):
-        raise SystemExit("ERROR: Unknown BIN format (neither 2352 nor 2048 sector size)")
 
-    print(f"  Format: {'RAW (2352)' if is_raw else 'ISO (2048)'}")
-
-    # Inject BLAZE.ALL at both locations
-    for loc_idx, lba_start in enumerate(LBA_LOCATIONS):
-        print(f"\nPatching copy {loc_idx + 1}/{len(LBA_LOCATIONS)} at LBA {lba_start}...")
-
-        for i in range(ORIG_SECTORS):
-            src = i * USER_SIZE
-            chunk = data[src:src+USER_SIZE] if src < len(data) else b'\x00' * USER_SIZE
-
-            if len(chunk) < USER_SIZE:
-                chunk = chunk + b'\x00' * (USER_SIZE - len(chunk))
-
-            if is_raw:
-                dst = (lba_start + i) * SECTOR_RAW + USER_OFF
-            else:
-                dst = (lba_start + i) * USER_SIZE
-
-            if dst + USER_SIZE > bin_size:
-                raise SystemExit(f"ERROR: Write would exceed file bounds at sector {i}")
+def main():
+    parser = argparse.ArgumentParser(description="Inject BLAZE.ALL into the patched BIN")
+    parser.add_argument("--full", action="store_true",
+                        help="Rewrite all sectors at both LBAs (old behaviour)")
+    parser.add_argument("--sectors", metavar="FILE",
+                        help="JSON list of dirty sector indices (skip clean compare)")
+    parser.add_argument("--journal", metavar="FILE",
+                        help="Build journal (BLAZE.ALL.journal.json) listing dirty sectors")
+    args = parser.parse_args()
 
-            bin_bytes[dst:dst+USER_SIZE] = chunk
+    print("=" * 50)
+    print("  BLAZE.ALL Patcher")
+    print("=" * 50)
+    print()
 
-    # Write output
-    print(f"\nWriting {BIN_OUT}...")
-    BIN_OUT.write_bytes(bin_bytes)
+    if not BIN_OUT.exists():
+        raise SystemExit(f"ERROR: BIN not found: {BIN_OUT}")
+    lba_locations, n_sectors = locate_blaze_all(BIN_OUT)
+    print(f"BLAZE.ALL in {BIN_OUT.name}: LBA {', '.join(map(str, lba_locations))} "
+          f"({n_sectors} sectors)")
+
+    data = load_blaze_all(n_sectors)
+
+    if args.full:
+        inject_full(data, n_sectors)
+    else:
+        sectors = None
+        if args.sectors:
+            sectors = load_sector_list(args.sectors)
+            print(f"\nDirty sectors from {args.sectors}: {len(sectors)}")
+        elif args.journal and Path(args.journal).exists():
+            print(f"\nReading journal {args.journal}...")
+            sectors = load_journal_sectors(args.journal, data)
+            if sectors is not None:
+                print(f"  Dirty sectors: {len(sectors)}/{n_sectors}")
+        if sectors is None:
+            if not CLEAN_BLAZE_ALL.exists():
+                raise SystemExit(f"ERROR: Clean BLAZE.ALL not found: {CLEAN_BLAZE_ALL}\n"
+                                 f"       (use --full to rewrite every sector)")
+            print(f"\nComparing with clean {CLEAN_BLAZE_ALL}...")
+            clean = CLEAN_BLAZE_ALL.read_bytes()
+            sectors = find_dirty_sectors(data, clean)
+            print(f"  Dirty sectors: {len(sectors)}/{n_sectors}")
+
+        writes = inject_sectors(data, sectors)
+        print(f"\n  {writes} sector writes ({writes * USER_SIZE:,} bytes)")
 
     print()
     print("=" * 50)
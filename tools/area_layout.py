@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+area_layout.py
+Per-area structure offsets of a BLAZE.ALL spawn group, resolved once.
+
+Layout around an area's group_offset:
+
+  ... animation table, 8-byte records ...
+  group_offset - n*8    assignment entries, 8 bytes per slot:
+                        [L_slot, L, tex_variant, 0x00, R_slot, R, ?, 0x40]
+  group_offset          96-byte stat entries, one per slot
+  + n*96                script area (Type-07 entries, offset table...)
+
+find_assignment_block() is the backward scan for the assignment entries,
+shared by extract_monster_db.find_assignment_entries() (extraction) and
+AreaLayout (patching), so both use the same offsets.
+
+AreaLayout(data, area) holds one area JSON's offsets: the assignment block
+is scanned at most once (through the BLAZE.ALL index when one is given),
+and the hex offsets of type07_entries / animation_table / records_8byte
+are parsed once.
+
+    layout = AreaLayout(data, area, index)
+    layout.assign_entry(slot)      # offset of the slot's L/R entry, or None
+    layout.stat_entry(slot)        # offset of the slot's 96-byte entry
+    layout.type07(slot)            # offset of the slot's Type-07 entry, or None
+"""
+
+ASSIGN_ENTRY_SIZE = 8
+ASSIGN_SEARCH_SLACK = 128        # structural bytes allowed before group_offset
+STAT_ENTRY_SIZE = 96
+
+
+def find_assignment_block(data, group_offset, num_monsters):
+    """Offsets of the num_monsters assignment entries before group_offset.
+
+    Scans backwards in 8-byte steps for entries with 0x40 at byte[7] and
+    0x00 at byte[3], stopping at the first non-matching entry after a
+    match. Returns the offsets in slot order, or None when the block does
+    not have exactly num_monsters entries.
+    """
+    search_start = group_offset - num_monsters * ASSIGN_ENTRY_SIZE - ASSIGN_SEARCH_SLACK
+    candidates = []
+    for off in range(group_offset - ASSIGN_ENTRY_SIZE, search_start, -ASSIGN_ENTRY_SIZE):
+        if off < 0:
+            break
+        if data[off + 7] == 0x40 and data[off + 3] == 0x00:
+            candidates.append(off)
+        elif candidates:
+            break
+    if len(candidates) != num_monsters:
+        return None
+    return candidates[::-1]
+
+
+def _offsets(entries):
+    """[int offset or None] of a JSON list of {"offset": "0x..."} entries."""
+    return [int(e["offset"], 16) if e else None for e in entries or []]
+
+
+class AreaLayout:
+    """Structure offsets of one area JSON, resolved once and cached."""
+
+    def __init__(self, data, area, index=None):
+        self.data = data
+        self.index = index
+        self.group_offset = int(area["group_offset"], 16) if area.get("group_offset") else None
+        self.num_monsters = len(area.get("monsters", []))
+        self.script_start = (None if self.group_offset is None
+                             else self.group_offset + self.num_monsters * STAT_ENTRY_SIZE)
+        self.type07_offsets = _offsets(area.get("type07_entries"))
+        self.animation_offsets = _offsets(area.get("animation_table"))
+        self.record_8byte_offsets = _offsets(area.get("records_8byte"))
+        self._assign = False             # not scanned yet
+
+    @property
+    def assignment_offsets(self):
+        """Assignment entry offsets in slot order, or None."""
+        if self._assign is False:
+            if self.group_offset is None:
+                self._assign = None
+            elif self.index is not None:
+                self._assign = self.index.call(
+                    find_assignment_block, self.group_offset, self.num_monsters)
+            else:
+                self._assign = find_assignment_block(
+                    self.data, self.group_offset, self.num_monsters)
+        return self._assign
+
+    def assign_entry(self, slot):
+        offsets = self.assignment_offsets
+        if offsets is None or slot >= len(offsets):
+            return None
+        return offsets[slot]
+
+    def stat_entry(self, slot):
+        return self.group_offset + slot * STAT_ENTRY_SIZE
+
+    @staticmethod
+    def _slot(offsets, slot):
+        return offsets[slot] if slot < len(offsets) else None
+
+    def type07(self, slot):
+        return self._slot(self.type07_offsets, slot)
+
+    def animation_entry(self, slot):
+        return self._slot(self.animation_offsets, slot)
+
+    def record_8byte(self, slot):
+        return self._slot(self.record_8byte_offsets, slot)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+blaze_index.py
+Persistent structural index of a BLAZE.ALL image, shared by the patchers
+and extractors.
+
+Every tool used to rediscover the same structures by scanning the 46 MB
+image: monster 96-byte entries by name, item 128-byte entries, per-area
+formation/spawn records, assignment entries... The results only depend on
+the image, so they are stored once in a sidecar file keyed by the image's
+SHA-1:
+
+    output/blaze_index/<sha1>.pickle
+
+Sections:
+  - monster_entries(names)   {name: [offsets]}  name + 0x00 within 16 bytes
+                                                 (tools/name_scan.find_names)
+  - name_fields(names)       {name: [offsets]}  exact null-padded 16-byte
+                                                 fields (name_scan.find_fields)
+  - items(names)             {name: {"entries", "texts", "rejected"}}
+                                                 (tools/item_locator.py)
+  - call(func, *args)        func(image, *args) for per-area scans
+                             (extract_formations.scan_records,
+                              extract_monster_db.find_assignment_entries...)
+
+Name sections are filled per name, so a new name in a JSON only scans for
+that name. call() results are keyed by the source of the function's module
+and of tools/area_layout.py, so editing a scan function, a helper or a
+constant it uses invalidates its results. Any change to the tools/ modules
+the name sections use discards the whole file.
+
+Offsets are those of the image the index was built from. During a build,
+build_gameplay_patch.py activates the index of the clean image it starts
+from: stages only change stats/prices/text, never move a structure, so the
+offsets stay valid on the buffer being patched. Standalone runs index the
+image they load.
+
+Usage:
+  py -3 tools/blaze_index.py [BLAZE.ALL]   Build (or refresh) and summarize
+"""
+
+import copy
+import hashlib
+import json
+import os
+import pickle
+import sys
+from pathlib import Path
+
+import item_locator
+from name_scan import find_fields, find_names
+
+TOOLS_DIR = Path(__file__).parent
+PROJECT_ROOT = TOOLS_DIR.parent
+INDEX_DIR = PROJECT_ROOT / "output" / "blaze_index"
+CLEAN_BLAZE_ALL = PROJECT_ROOT / "Blaze  Blade - Eternal Quest (Europe)" / "extract" / "BLAZE.ALL"
+MONSTER_STATS_DIR = PROJECT_ROOT / "Data" / "monster_stats"
+ITEMS_JSON = PROJECT_ROOT / "Data" / "items" / "all_items_clean.json"
+
+INDEX_VERSION = 1
+MAX_SIDECARS = 4                 # older index files are deleted
+SCANNERS = ("blaze_index.py", "name_scan.py", "item_locator.py")
+CALL_SOURCES = ("area_layout.py",)   # shared by the call() scan functions
+
+_active = None
+
+
+def _scanners_digest():
+    h = hashlib.sha1()
+    for name in SCANNERS:
+        h.update((TOOLS_DIR / name).read_bytes())
+    return h.hexdigest()
+
+
+def _source_digest(func):
+    """Digest of the source file defining func plus CALL_SOURCES."""
+    h = hashlib.sha1(Path(func.__code__.co_filename).read_bytes())
+    for name in CALL_SOURCES:
+        h.update((TOOLS_DIR / name).read_bytes())
+    return h.hexdigest()[:16]
+
+
+class BlazeIndex:
+    """Index sections of one image, loaded from / saved to its sidecar."""
+
+    def __init__(self, data, sha1=None, index_dir=INDEX_DIR):
+        self.data = bytes(data)
+        self.sha1 = sha1 or hashlib.sha1(self.data).hexdigest()
+        self.path = Path(index_dir) / "{}.pickle".format(self.sha1)
+        self.sections = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "rb") as f:
+                saved = pickle.load(f)
+        except Exception:
+            return
+        if (saved.get("version") == INDEX_VERSION
+                and saved.get("sha1") == self.sha1
+                and saved.get("scanners") == _scanners_digest()):
+            self.sections = saved["sections"]
+
+    def save(self):
+        """Write the sidecar if anything was added. Keeps MAX_SIDECARS files."""
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump({"version": INDEX_VERSION, "sha1": self.sha1,
+                         "scanners": _scanners_digest(),
+                         "sections": self.sections}, f, protocol=4)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+        sidecars = sorted(self.path.parent.glob("*.pickle"),
+                          key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in sidecars[MAX_SIDECARS:]:
+            old.unlink()
+
+    def _per_name(self, section, names, scan):
+        table = self.sections.setdefault(section, {})
+        names = list(dict.fromkeys(names))
+        missing = [n for n in names if n not in table]
+        if missing:
+            table.update(scan(self.data, missing))
+            self.dirty = True
+            self.misses += len(missing)
+        self.hits += len(names) - len(missing)
+        return {n: table[n] for n in names}
+
+    def monster_entries(self, names):
+        """{name: [offsets]} - see name_scan.find_names()."""
+        return self._per_name("monster_entries", names, find_names)
+
+    def name_fields(self, names):
+        """{name: [offsets]} - see name_scan.find_fields()."""
+        return self._per_name("name_fields", names, find_fields)
+
+    def items(self, names):
+        """{name: located} - see item_locator.locate_items()."""
+        return self._per_name("items", [n for n in names if n],
+                              item_locator.locate_items)
+
+    def call(self, func, *args):
+        """func(image, *args), memoized. args must be hashable.
+
+        Returns a copy, so callers may modify the result.
+        """
+        section = "{}:{}:{}".format(Path(func.__code__.co_filename).stem,
+                                    func.__qualname__, _source_digest(func))
+        prefix = section.rsplit(":", 1)[0] + ":"
+        for stale in [k for k in self.sections if k.startswith(prefix) and k != section]:
+            del self.sections[stale]             # results of an older source
+            self.dirty = True
+        table = self.sections.setdefault(section, {})
+        if args in table:
+            self.hits += 1
+        else:
+            self.misses += 1
+            table[args] = func(self.data, *args)
+            self.dirty = True
+        return copy.deepcopy(table[args])
+
+
+def activate(index):
+    """Make `index` the one returned by get() (build driver)."""
+    global _active
+    _active = index
+
+
+def active():
+    return _active
+
+
+def get(data):
+    """Index for data: the active build index, else the index of data itself."""
+    if _active is not None:
+        return _active
+    return BlazeIndex(data)
+
+
+def monster_names():
+    """Monster names of the Data/monster_stats JSONs."""
+    names = set()
+    for json_file in MONSTER_STATS_DIR.glob("**/*.json"):
+        if json_file.name.startswith('_'):
+            continue
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                names.add(json.load(f).get('name', json_file.stem))
+        except (ValueError, OSError):
+            continue
+    return sorted(names)
+
+
+def item_names():
+    with open(ITEMS_JSON, 'r', encoding='utf-8') as f:
+        return [item.get('name', '') for item in json.load(f)['items']]
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else CLEAN_BLAZE_ALL
+    if not path.exists():
+        print("Usage: py -3 tools/blaze_index.py [BLAZE.ALL]")
+        print("[ERROR] {} not found".format(path))
+        return 1
+
+    print("=" * 60)
+    print("  BLAZE.ALL index: {}".format(path))
+    print("=" * 60)
+    index = BlazeIndex(path.read_bytes())
+    print("  SHA-1: {}".format(index.sha1))
+
+    monsters = index.monster_entries(monster_names())
+    fields = index.name_fields(monsters)
+    items = index.items(item_names())
+    index.save()
+
+    print("  Monsters:  {} names, {} entries ({} exact name fields)".format(
+        len(monsters), sum(len(v) for v in monsters.values()),
+        sum(len(v) for v in fields.values())))
+    print("  Items:     {} names, {} entries, {} texts".format(
+        len(items), sum(len(v["entries"]) for v in items.values()),
+        sum(len(v["texts"]) for v in items.values())))
+    calls = [s for s in index.sections if s.count(":") == 2]
+    for section in sorted(calls):
+        print("  {:<40} {} cached".format(section.rsplit(":", 1)[0],
+                                          len(index.sections[section])))
+    print("  Scanned now: {} names  Cached: {}".format(index.misses, index.hits))
+    print("  [OK] {}".format(index.path))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
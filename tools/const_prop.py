@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+"""
+const_prop.py
+Call argument resolution by constant/copy propagation (BLAZE.ALL overlays,
+SLES_008.45, RAM dumps).
+
+A backward look at the few words before a `jal` misses any argument that
+reaches the call through a register copy, a branch delay slot, a stack
+spill or a value set earlier in the function. For every function that calls
+a target, this module builds the basic-block CFG (tools/func_table.py gives
+the function bounds) and runs a forward propagation over the registers and
+the function's stack slots until a fixpoint. At each call site, $a0-$a3
+hold a small set of possible values, each with the offsets of the
+instructions that define it.
+
+Values:
+  10                       constant
+  $a1@entry+0x4            value of a register at function entry (+ constant)
+  [sp@entry+0x10]          word at the entry stack pointer (5th argument...)
+  s16(...)                 sll 16 / sra 16 of a non-constant value
+
+More than MAX_VALUES possible values, or anything else (loads, mult...),
+is unknown. Calls clobber $at, $v0-$t7, $t8-$t9 and $ra.
+
+Offsets are file offsets. base_addr is the RAM address of data[start];
+overlays in BLAZE.ALL have no known load address (base_addr=None): branches
+are PC-relative and still resolve, `j` targets do not and are treated as
+leaving the function, so a join only reached by such a `j` misses that path.
+
+    from const_prop import call_arguments
+    for site in call_arguments(blaze, 0x80024F90, 0x900000, 0x2D00000):
+        site.args[5]          # [(10, (0x0093A1F8,))] or None
+
+Usage:
+  py -3 tools/const_prop.py FILE TARGET [--start 0x900000] [--end 0x2D00000]
+                            [--base 0x80010000] [--regs a0,a1,a2,a3]
+"""
+
+import argparse
+import sys
+import time
+from collections import deque, namedtuple
+from pathlib import Path
+
+import numpy as np
+
+from func_table import build as build_functions
+from mips_disasm import BRANCH_OPS, LOAD_OPS, REG, decode
+from mips_search import REG_NUM, words_view
+
+MAX_VALUES = 4
+ARG_REGS = (4, 5, 6, 7)
+CALL_CLOBBER = tuple(range(1, 16)) + (24, 25, 31)
+MASK32 = 0xFFFFFFFF
+SP = 29
+STORES = (0x28, 0x29, 0x2A, 0x2B, 0x2E, 0x3A)     # sb sh swl sw swr swc2
+
+CallSite = namedtuple("CallSite", ["offset", "addr", "function", "args"])
+
+
+# -- values -------------------------------------------------------------------
+#
+# A register holds None (unknown) or a frozenset of (value, origins):
+# value is an int (constant) or a tuple ("reg", r, k) / ("stack", off) /
+# ("s16", value) / ("shl16", value); origins is a frozenset of word indices.
+
+
+def _one(value, origins):
+    return frozenset(((value, origins),))
+
+
+def _normalize(pairs):
+    """Merge duplicate values; None when unknown or too many values."""
+    merged = {}
+    for value, origins in pairs:
+        if value is None:
+            return None
+        merged[value] = merged.get(value, frozenset()) | origins
+    if len(merged) > MAX_VALUES:
+        return None
+    return frozenset(merged.items())
+
+
+def _unary(vals, i, f):
+    if vals is None:
+        return None
+    return _normalize([(f(v), o | {i}) for v, o in vals])
+
+
+def _binary(a, b, i, f):
+    if a is None or b is None:
+        return None
+    return _normalize([(f(va, vb), oa | ob | {i}) for va, oa in a for vb, ob in b])
+
+
+def _join(a, b):
+    if a is None or b is None:
+        return None
+    if a == b:
+        return a
+    return _normalize(list(a) + list(b))
+
+
+def _add(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return (a + b) & MASK32
+    if b == 0:
+        return a
+    if a == 0:
+        return b
+    if isinstance(b, int) and isinstance(a, tuple) and a[0] == "reg":
+        return ("reg", a[1], a[2] + (b if b < 0x80000000 else b - 0x100000000))
+    if isinstance(a, int) and isinstance(b, tuple) and b[0] == "reg":
+        return _add(b, a)
+    return None
+
+
+def _sub(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return (a - b) & MASK32
+    if b == 0:
+        return a
+    if isinstance(b, int):
+        return _add(a, (-b) & MASK32)
+    return None
+
+
+def _or(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return a | b
+    if b == 0:
+        return a
+    if a == 0:
+        return b
+    return None
+
+
+def _xor(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return a ^ b
+    return _or(a, b)
+
+
+def _ints(f):
+    def op(a, b):
+        if isinstance(a, int) and isinstance(b, int):
+            return f(a, b) & MASK32
+        return None
+    return op
+
+
+def _signed(v):
+    return v - 0x100000000 if v & 0x80000000 else v
+
+
+_R_OPS = {
+    0x04: _ints(lambda s, t: t << (s & 31)),                       # sllv
+    0x06: _ints(lambda s, t: t >> (s & 31)),                       # srlv
+    0x07: _ints(lambda s, t: _signed(t) >> (s & 31)),              # srav
+    0x20: _add, 0x21: _add,                                        # add, addu
+    0x22: _sub, 0x23: _sub,                                        # sub, subu
+    0x24: _ints(lambda s, t: s & t),                               # and
+    0x25: _or, 0x26: _xor,                                         # or, xor
+    0x27: _ints(lambda s, t: ~(s | t)),                            # nor
+    0x2A: _ints(lambda s, t: int(_signed(s) < _signed(t))),        # slt
+    0x2B: _ints(lambda s, t: int(s < t)),                          # sltu
+}
+
+
+def _shift(funct, shamt, v):
+    if isinstance(v, int):
+        if funct == 0x00:
+            return (v << shamt) & MASK32
+        if funct == 0x02:
+            return v >> shamt
+        return (_signed(v) >> shamt) & MASK32
+    if shamt == 0:
+        return v
+    if funct == 0x00 and shamt == 16:
+        return ("shl16", v)
+    if funct == 0x03 and shamt == 16 and v[0] == "shl16":
+        return ("s16", v[1])
+    return None
+
+
+def _stack_offset(vals):
+    """Offset from the entry $sp when vals is exactly $sp@entry+k."""
+    if vals is None or len(vals) != 1:
+        return None
+    (value, _), = vals
+    if isinstance(value, tuple) and value[0] == "reg" and value[1] == SP:
+        return value[2]
+    return None
+
+
+def format_value(value):
+    if isinstance(value, int):
+        return str(value) if value < 0x10000 else "0x{:08X}".format(value)
+    if value[0] == "reg":
+        text = "{}@entry".format(REG[value[1]])
+        if value[2]:
+            text += "{}0x{:X}".format("+" if value[2] > 0 else "-", abs(value[2]))
+        return text
+    if value[0] == "stack":
+        return "[sp@entry{}0x{:X}]".format("+" if value[1] >= 0 else "-", abs(value[1]))
+    if value[0] == "s16":
+        return "s16({})".format(format_value(value[1]))
+    return "({} << 16)".format(format_value(value[1]))
+
+
+# -- state --------------------------------------------------------------------
+
+
+def _entry_slot(off):
+    """Value of a stack slot never written in the function: the caller's
+    word for off >= 0 (5th argument...), unknown below the entry $sp."""
+    return _one(("stack", off), frozenset()) if off >= 0 else None
+
+
+class State:
+    """Register value sets + stack slots (offset from the entry $sp).
+
+    A slot written or clobbered on some path is in `stack` (None when
+    unknown); a missing slot was never written and holds _entry_slot().
+    """
+
+    __slots__ = ("regs", "stack")
+
+    def __init__(self, regs, stack):
+        self.regs = regs
+        self.stack = stack
+
+    @classmethod
+    def entry(cls):
+        regs = [_one(("reg", r, 0), frozenset()) for r in range(32)]
+        regs[0] = _one(0, frozenset())
+        return cls(regs, {})
+
+    def copy(self):
+        return State(list(self.regs), dict(self.stack))
+
+    def join(self, other):
+        regs = [_join(a, b) for a, b in zip(self.regs, other.regs)]
+        stack = {k: _join(self.slot(k), other.slot(k))
+                 for k in self.stack.keys() | other.stack.keys()}
+        return State(regs, stack)
+
+    def __eq__(self, other):
+        return self.regs == other.regs and self.stack == other.stack
+
+    def set(self, reg, vals):
+        if reg > 0:
+            self.regs[reg] = vals
+
+    def slot(self, off):
+        return self.stack[off] if off in self.stack else _entry_slot(off)
+
+
+# -- analysis -----------------------------------------------------------------
+
+
+class _Function:
+    """CFG of one function (word indices [start, end) of a Decoded)."""
+
+    def __init__(self, d, start, end, resolve_jumps):
+        self.d = d
+        self.start = start
+        self.end = end
+        n = end - start
+        op = d.op[start:end].tolist()
+        funct = d.funct[start:end].tolist()
+        targets = ((d.targets()[start:end] - d.base_addr) // 4).tolist()
+
+        # kind: 0 none, 1 branch, 2 j, 3 jr, 4 call
+        kind = [0] * n
+        leaders = {start}
+        for k in range(n):
+            o = op[k]
+            if o in BRANCH_OPS:
+                kind[k] = 1
+            elif o == 2:
+                kind[k] = 2
+            elif o == 3 or (o == 0 and funct[k] == 0x09):
+                kind[k] = 4
+                continue
+            elif o == 0 and funct[k] == 0x08:
+                kind[k] = 3
+            else:
+                continue
+            if start + k + 2 < end:
+                leaders.add(start + k + 2)
+            t = targets[k]
+            if (kind[k] == 1 or (kind[k] == 2 and resolve_jumps)) and start <= t < end:
+                leaders.add(t)
+        self.kind = kind
+        self.targets = targets
+
+        self.leaders = sorted(leaders)
+        self.block_of = {}
+        bounds = self.leaders + [end]
+        self.blocks = list(zip(bounds[:-1], bounds[1:]))
+        self.succ = []
+        for b, (s, e) in enumerate(self.blocks):
+            self.block_of[s] = b
+            self.succ.append(self._successors(s, e, resolve_jumps))
+
+    def _successors(self, s, e, resolve_jumps):
+        last = None
+        for i in (e - 2, e - 1):
+            if i >= s and self.kind[i - self.start] in (1, 2, 3):
+                last = i
+                break
+        if last is None:
+            return [e] if e < self.end else []
+        k = last - self.start
+        kind = self.kind[k]
+        out = []
+        t = self.targets[k]
+        d = self.d
+        if kind == 1 or (kind == 2 and resolve_jumps):
+            if self.start <= t < self.end:
+                out.append(t)
+        always = kind in (2, 3) or (
+            d.op[last] == 0x04 and d.rs[last] == 0 and d.rt[last] == 0)
+        if not always and e < self.end:
+            out.append(e)
+        return out
+
+    def relevant(self, wanted):
+        """Blocks from which a block of `wanted` can be reached."""
+        preds = [[] for _ in self.blocks]
+        for b, succ in enumerate(self.succ):
+            for t in succ:
+                preds[self.block_of[t]].append(b)
+        seen = set(wanted)
+        todo = list(wanted)
+        while todo:
+            for p in preds[todo.pop()]:
+                if p not in seen:
+                    seen.add(p)
+                    todo.append(p)
+        return seen
+
+    def block_index(self, i):
+        k = int(np.searchsorted(self.leaders, i, side="right")) - 1
+        return k
+
+
+def _step(d, i, state):
+    """Apply word i (not a control transfer) to state."""
+    op = d.op_l[i]
+    rs, rt = d.rs_l[i], d.rt_l[i]
+    regs = state.regs
+    if op == 0:
+        funct = d.funct_l[i]
+        rd = d.rd_l[i]
+        if rd == 0:
+            return
+        if funct in (0x00, 0x02, 0x03):
+            shamt = d.shamt_l[i]
+            state.set(rd, _unary(regs[rt], i, lambda v: _shift(funct, shamt, v)))
+        elif funct in _R_OPS:
+            state.set(rd, _binary(regs[rs], regs[rt], i, _R_OPS[funct]))
+        elif d.dest_l[i] > 0:
+            state.set(rd, None)
+        return
+    if op == 0x0F:                                              # lui
+        state.set(rt, _one((d.imm_l[i] << 16) & MASK32, frozenset((i,))))
+        return
+    if op in (0x08, 0x09):                                      # addi(u)
+        imm = d.simm_l[i] & MASK32
+        state.set(rt, _unary(regs[rs], i, lambda v: _add(v, imm)))
+        return
+    if op in (0x0A, 0x0B, 0x0C, 0x0D, 0x0E):                    # slti sltiu andi ori xori
+        imm, simm = d.imm_l[i], d.simm_l[i]
+        f = {
+            0x0A: _ints(lambda s, _: int(_signed(s) < simm)),
+            0x0B: _ints(lambda s, _: int(s < (simm & MASK32))),
+            0x0C: _ints(lambda s, _: s & imm),
+            0x0D: _or,
+            0x0E: _xor,
+        }[op]
+        state.set(rt, _unary(regs[rs], i, lambda v: f(v, imm)))
+        return
+    if op in LOAD_OPS or op in STORES:
+        off = _stack_offset(regs[rs])
+        if off is not None:
+            off += d.simm_l[i]
+        if op in STORES:
+            if off is not None:
+                for k in range(off - 3, off + 4):
+                    state.stack[k] = None
+                if op == 0x2B:                                      # sw
+                    state.stack[off] = _unary(regs[rt], i, lambda v: v)
+            return
+        vals = None
+        if off is not None and op == 0x23:                          # lw
+            vals = _unary(state.slot(off), i, lambda v: v)
+        state.set(rt, vals)
+        return
+    dest = d.dest_l[i]
+    if dest > 0:
+        state.set(dest, None)
+
+
+def _call(state):
+    for r in CALL_CLOBBER:
+        state.regs[r] = None
+    sp = _stack_offset(state.regs[SP])
+    if sp is not None:
+        for k in range(sp, sp + 16):
+            state.stack[k] = None
+
+
+def _run_block(f, s, e, state, calls=None, regs=ARG_REGS):
+    """Run block [s, e); record the argument registers at the calls in
+    `calls` (after the delay slot) into calls[i]."""
+    d = f.d
+    i = s
+    while i < e:
+        kind = f.kind[i - f.start]
+        if kind == 0:
+            _step(d, i, state)
+            i += 1
+            continue
+        if i + 1 < e:
+            _step(d, i + 1, state)              # delay slot
+        if kind == 4:
+            if calls is not None and i in calls:
+                calls[i] = {r: state.regs[r] for r in regs}
+            if d.dest_l[i] > 0:
+                state.set(d.dest_l[i], None)
+            _call(state)
+        elif d.dest_l[i] > 0:                   # bltzal, bgezal
+            state.set(d.dest_l[i], None)
+        i += 2
+
+
+def analyze_function(d, start, end, call_idx, regs=ARG_REGS, resolve_jumps=True):
+    """{call index: {reg: value set or None}} for the calls of one function."""
+    f = _Function(d, start, end, resolve_jumps)
+    wanted = {f.block_index(i) for i in call_idx}
+    relevant = f.relevant(wanted)
+
+    entry = f.block_of[start]
+    in_states = {entry: State.entry()}
+    todo = deque([entry])
+    queued = {entry}
+    while todo:
+        b = todo.popleft()
+        queued.discard(b)
+        s, e = f.blocks[b]
+        state = in_states[b].copy()
+        _run_block(f, s, e, state)
+        for t in f.succ[b]:
+            tb = f.block_of[t]
+            if tb not in relevant:
+                continue
+            old = in_states.get(tb)
+            new = state if old is None else old.join(state)
+            if old is None or not new == old:
+                in_states[tb] = new.copy()
+                if tb not in queued:
+                    queued.add(tb)
+                    todo.append(tb)
+
+    calls = {i: None for i in call_idx}
+    for b in sorted(wanted):
+        if b in in_states:
+            s, e = f.blocks[b]
+            _run_block(f, s, e, in_states[b].copy(), calls, regs)
+    return calls
+
+
+def _prepare(d):
+    """Python lists of the fields used per instruction (faster than NumPy
+    scalars in the propagation loop)."""
+    d.op_l = d.op.tolist()
+    d.rs_l = d.rs.tolist()
+    d.rt_l = d.rt.tolist()
+    d.rd_l = d.rd.tolist()
+    d.shamt_l = d.shamt.tolist()
+    d.funct_l = d.funct.tolist()
+    d.imm_l = d.imm.tolist()
+    d.simm_l = d.simm.tolist()
+    d.dest_l = d.dest().tolist()
+
+
+def call_arguments(data, target, start=0, end=None, base_addr=None,
+                   regs=ARG_REGS, functions=None):
+    """CallSite for every `jal target` in data[start:end].
+
+    base_addr: RAM address of data[start] (None: unknown overlay address).
+    functions: func_table.FunctionTable of the range in file offsets
+    (built when None). args = {reg: [(value, (origin offsets...))] or None}.
+    """
+    words = words_view(data, start, end)
+    end = start + 4 * words.size
+    jal_word = (0x03 << 26) | ((target >> 2) & 0x3FFFFFF)
+    call_idx = np.flatnonzero(words == np.uint32(jal_word))
+    if call_idx.size == 0:
+        return []
+
+    if functions is not None:
+        starts, ends = functions.starts, functions.ends
+    elif base_addr is None:
+        functions = build_functions(words, start, jal_targets=False)
+        starts, ends = functions.starts, functions.ends
+    else:
+        functions = build_functions(words, base_addr)
+        starts = functions.starts - base_addr + start
+        ends = functions.ends - base_addr + start
+    start_idx = (np.asarray(starts) - start) // 4
+    end_idx = (np.asarray(ends) - start) // 4
+
+    # Group the calls by function: the last start at or before the call,
+    # extended to the call's delay slot when the function ended earlier
+    k = np.searchsorted(start_idx, call_idx, side="right") - 1
+    groups = {}
+    for i, f in zip(call_idx.tolist(), k.tolist()):
+        fs = int(start_idx[f]) if f >= 0 else 0
+        groups.setdefault(f, [fs, fs, []])
+        group = groups[f]
+        group[1] = max(group[1], int(end_idx[f]) if f >= 0 else 0, i + 2)
+        group[2].append(i)
+
+    sites = []
+    for fs, fe, calls in groups.values():
+        fe = min(fe, words.size)
+        d = decode(words[fs:fe], (start if base_addr is None else base_addr) + 4 * fs)
+        _prepare(d)
+        result = analyze_function(d, 0, fe - fs, [i - fs for i in calls], regs,
+                                  base_addr is not None)
+        for i in calls:
+            state = result[i - fs]
+            args = {}
+            for r in regs:
+                vals = state[r] if state is not None else None
+                if vals is None:
+                    args[r] = None
+                    continue
+                args[r] = sorted(((v, tuple(sorted(start + 4 * (fs + o) for o in origins)))
+                                  for v, origins in vals),
+                                 key=lambda p: (1, str(p[0])) if isinstance(p[0], tuple)
+                                 else (0, p[0]))
+            offset = start + 4 * i
+            addr = None if base_addr is None else base_addr + 4 * i
+            sites.append(CallSite(offset, addr, (start + 4 * fs, start + 4 * fe), args))
+    sites.sort(key=lambda s: s.offset)
+    return sites
+
+
+def format_args(site, regs=ARG_REGS):
+    parts = []
+    for r in regs:
+        vals = site.args.get(r)
+        if vals is None:
+            parts.append("{}=?".format(REG[r]))
+            continue
+        parts.append("{}={}".format(REG[r], "|".join(
+            "{} [{}]".format(format_value(v), ",".join("0x{:08X}".format(o) for o in origins))
+            if origins else format_value(v)
+            for v, origins in vals)))
+    return "  ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve call arguments")
+    parser.add_argument("file", help="BLAZE.ALL, SLES_008.45 or RAM dump")
+    parser.add_argument("target", type=lambda v: int(v, 0), help="Called function (RAM)")
+    parser.add_argument("--start", type=lambda v: int(v, 0), default=0x900000)
+    parser.add_argument("--end", type=lambda v: int(v, 0), default=0x2D00000)
+    parser.add_argument("--base", type=lambda v: int(v, 0), default=None,
+                        help="RAM address of --start (default: unknown, overlays)")
+    parser.add_argument("--regs", default="a0,a1,a2,a3")
+    args = parser.parse_args()
+
+    regs = tuple(REG_NUM[r.strip().lstrip("$")] for r in args.regs.split(","))
+    data = Path(args.file).read_bytes()
+
+    print("=" * 70)
+    print("  Call arguments of 0x{:08X} in {}".format(args.target, args.file))
+    print("=" * 70)
+    t0 = time.time()
+    sites = call_arguments(data, args.target, args.start, min(args.end, len(data)),
+                           args.base, regs)
+    elapsed = time.time() - t0
+
+    for site in sites:
+        where = "0x{:08X}".format(site.offset)
+        if site.addr is not None:
+            where += " (0x{:08X})".format(site.addr)
+        print("  {}  func 0x{:08X}  {}".format(where, site.function[0],
+                                              format_args(site, regs)))
+    resolved = sum(1 for s in sites if any(s.args[r] for r in regs))
+    print()
+    print("  {} call sites, {} with resolved arguments ({:.2f}s)".format(
+        len(sites), resolved, elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
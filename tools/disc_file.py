@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+disc_file.py
+One file of the game BIN seen as a contiguous byte buffer.
+
+Scripts that read SLES_008.45 or patch BLAZE.ALL inside the BIN used to
+translate file offsets into sector offsets by hand (file sector * 2352 + 24,
+one slice per sector). DiscFile does it once: the image is memory-mapped and
+the file is a NumPy view of the user-data area of its sectors, (sectors,
+2048) with the image's sector stride, so nothing is copied until bytes are
+asked for.
+
+    from disc_file import open_file
+    with open_file(bin_path, "SLES_008.45") as exe:
+        exe[0:8]                                  # b'PS-X EXE'
+        exe.unpack_from('<I', 0x10)               # like struct.unpack_from
+        exe.find(b'\\x90\\x4F\\x00\\x0C')
+
+    with open_file(bin_path, "BLAZE.ALL", writable=True) as blaze:
+        blaze.write(0x1000, data)                 # both copies
+        blaze.dirty_sectors                       # [2]
+
+Files with several directory entries (the two BLAZE.ALL copies) are opened
+as one DiscFile: reads come from the first copy, writes go to all of them.
+On RAW images the EDC/ECC of every written sector is regenerated on flush()
+/ close() (tools/disc_sector.py).
+
+Usage:
+  py -3 tools/disc_file.py BIN FILE [OFFSET [LENGTH]]   Hex dump of a file range
+"""
+
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+import disc_sector
+from iso9660 import SECTOR_ISO, DiscImage, find_files, sectors_of
+
+FIND_CHUNK_SECTORS = 512        # sectors gathered per find() step
+
+
+class DiscFile:
+    """A file (and its mirror copies) inside a memory-mapped disc image."""
+
+    def __init__(self, disc, entries):
+        if not entries:
+            raise ValueError("no directory entry given")
+        self.disc = disc
+        self.name = entries[0].name
+        self.size = entries[0].size
+        self.num_sectors = sectors_of(entries[0])
+        self.lbas = [e.lba for e in entries]
+        for e in entries:
+            if e.lba + self.num_sectors > disc.num_sectors:
+                raise ValueError(f"{e.path} (LBA {e.lba}) runs past the end of the image")
+
+        image = np.frombuffer(disc.buffer, dtype=np.uint8)
+        image = image[:disc.num_sectors * disc.sector_size].reshape(-1, disc.sector_size)
+        user = slice(disc.user_off, disc.user_off + SECTOR_ISO)
+        self._views = [image[lba:lba + self.num_sectors, user] for lba in self.lbas]
+        self._dirty = set()          # file sector indices written
+        self._stale = set()          # ... whose EDC/ECC is not regenerated yet
+
+    @property
+    def capacity(self):
+        """Bytes of user data in the file's sectors (size rounded up)."""
+        return self.num_sectors * SECTOR_ISO
+
+    @property
+    def sectors(self):
+        """(num_sectors, 2048) uint8 view of the first copy (no copy)."""
+        return self._views[0]
+
+    @property
+    def dirty_sectors(self):
+        return sorted(self._dirty)
+
+    @property
+    def dirty_lbas(self):
+        return [lba + i for lba in self.lbas for i in sorted(self._dirty)]
+
+    def __len__(self):
+        return self.size
+
+    # -- reads -----------------------------------------------------------
+
+    def read(self, offset, size):
+        """size bytes at offset (fewer past the end of the file)."""
+        if offset < 0:
+            raise ValueError(f"negative offset {offset}")
+        end = min(offset + size, self.size)
+        if end <= offset:
+            return b''
+        first = offset // SECTOR_ISO
+        last = (end - 1) // SECTOR_ISO
+        rows = self._views[0][first:last + 1].reshape(-1)
+        start = offset - first * SECTOR_ISO
+        return rows[start:start + end - offset].tobytes()
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.size)
+            if step == 1:
+                return self.read(start, max(0, stop - start))
+            return self.read(0, self.size)[key]
+        if key < 0:
+            key += self.size
+        if not 0 <= key < self.size:
+            raise IndexError(f"offset {key} outside {self.name} ({self.size} bytes)")
+        return int(self._views[0][key // SECTOR_ISO, key % SECTOR_ISO])
+
+    def unpack_from(self, fmt, offset=0):
+        """struct.unpack_from(fmt, file, offset), across sector boundaries."""
+        st = fmt if isinstance(fmt, struct.Struct) else struct.Struct(fmt)
+        data = self.read(offset, st.size)
+        if len(data) < st.size:
+            raise struct.error(f"unpack_from requires {st.size} bytes at offset "
+                               f"{offset} of {self.name} ({self.size} bytes)")
+        return st.unpack(data)
+
+    def find(self, sub, start=0, end=None):
+        """Offset of the first occurrence of sub in [start, end), or -1."""
+        end = self.size if end is None else min(end, self.size)
+        chunk = FIND_CHUNK_SECTORS * SECTOR_ISO
+        pos = start
+        while pos < end:
+            # Overlap by len(sub) - 1 so matches across chunk boundaries are seen
+            data = self.read(pos, min(chunk + len(sub) - 1, end - pos))
+            found = data.find(sub)
+            if found >= 0:
+                return pos + found
+            pos += chunk
+        return -1
+
+    # -- writes ----------------------------------------------------------
+
+    def write(self, offset, data):
+        """Scatter data at offset into every copy; returns the sectors touched.
+
+        Writes may fill the slack of the last sector (up to capacity).
+        """
+        if not self.disc.writable:
+            raise ValueError(f"{self.name} was opened read-only")
+        data = np.frombuffer(bytes(data), dtype=np.uint8)
+        if offset < 0 or offset + data.size > self.capacity:
+            raise ValueError(f"write 0x{offset:X}+{data.size} outside {self.name} "
+                             f"({self.capacity} bytes)")
+        touched = []
+        pos = 0
+        while pos < data.size:
+            sector, in_sector = divmod(offset + pos, SECTOR_ISO)
+            n = min(SECTOR_ISO - in_sector, data.size - pos)
+            for view in self._views:
+                view[sector, in_sector:in_sector + n] = data[pos:pos + n]
+            touched.append(sector)
+            pos += n
+        self._dirty.update(touched)
+        self._stale.update(touched)
+        return touched
+
+    def __setitem__(self, key, data):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.capacity)
+            if step != 1 or stop - start != len(data):
+                raise ValueError("slice assignment must be contiguous and keep the size")
+            self.write(start, data)
+        else:
+            self.write(key, bytes([data]))
+
+    def flush(self):
+        """Regenerate EDC/ECC of the sectors written since the last flush
+        (RAW images). Returns the number of sectors regenerated."""
+        count = 0
+        if self._stale and self.disc.is_raw:
+            lbas = [lba + i for lba in self.lbas for i in self._stale]
+            count = disc_sector.regenerate_in_buffer(self.disc.buffer, lbas)
+        self._stale.clear()
+        if self.disc.writable:
+            self.disc.buffer.flush()
+        return count
+
+    def close(self):
+        if self.disc.writable:
+            self.flush()
+        self._views = None           # the mmap can't close while views exist
+        self.disc.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_file(bin_path, name, writable=False):
+    """DiscFile of every directory entry called name (same size) in bin_path."""
+    entries = find_files(bin_path, name)
+    if not entries:
+        raise ValueError(f"{name} not found in {Path(bin_path).name}")
+    entries = [e for e in entries if e.size == entries[0].size]
+    return DiscFile(DiscImage(bin_path, writable), entries)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        return 1
+    offset = int(sys.argv[3], 0) if len(sys.argv) > 3 else 0
+    length = int(sys.argv[4], 0) if len(sys.argv) > 4 else 0x100
+
+    with open_file(sys.argv[1], sys.argv[2]) as f:
+        print(f"{f.name}: {f.size:,} bytes, {f.num_sectors} sectors at LBA "
+              f"{', '.join(map(str, f.lbas))}")
+        data = f.read(offset, length)
+        for row in range(0, len(data), 16):
+            chunk = data[row:row + 16]
+            print(f"  {offset + row:08X}  {chunk.hex(' ').upper()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+disc_sector.py
+EDC / ECC regeneration and verification for RAW (2352-byte) CD sectors.
+
+Every data sector of the game BIN is MODE2/Form1:
+
+    0x000  sync (00 FF*10 00)
+    0x00C  header (MSF + mode byte, 2)
+    0x010  subheader (2 x 4 bytes)
+    0x018  user data (2048 bytes)            <- what our patchers modify
+    0x818  EDC  (CRC-32, over 0x010..0x817)
+    0x81C  ECC P parity (172 bytes)
+    0x8C8  ECC Q parity (104 bytes)
+
+Writing new user data without recomputing EDC/ECC leaves sectors that strict
+emulators and real drives flag as damaged (and sometimes "repair" back to
+the vanilla bytes). The functions here regenerate both codes for whole
+batches of sectors at once using NumPy: sectors are a (N, 2352) uint8 array,
+the CRC runs 4 bytes per step over all N sectors in parallel and the
+Reed-Solomon P/Q parities are gathered with precomputed index tables.
+
+Form2 sectors (XA audio / video, submode bit 0x20) only carry an optional EDC
+over 0x010..0x92B stored at 0x92C, no ECC.
+
+Usage:
+  py -3 tools/disc_sector.py BIN                 Verify every sector
+  py -3 tools/disc_sector.py BIN --fix           Verify and rewrite bad EDC/ECC
+  py -3 tools/disc_sector.py BIN --lba 163167 --count 22566
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+SECTOR_RAW = 2352       # RAW sector size
+USER_OFF = 24           # MODE2/Form1 user data offset
+USER_SIZE = 2048        # User data per sector
+
+HEADER_OFF = 0x00C
+SUBHEADER_OFF = 0x010
+EDC_OFF = 0x818
+P_OFF = 0x81C
+Q_OFF = 0x8C8
+FORM2_EDC_OFF = 0x92C
+SUBMODE_FORM2 = 0x20    # subheader byte 2, bit 5
+
+SYNC = b'\x00' + b'\xff' * 10 + b'\x00'
+
+# Sectors processed per NumPy batch when scanning files
+BATCH_SECTORS = 4096
+
+
+# ---------------------------------------------------------------------------
+# Lookup tables
+# ---------------------------------------------------------------------------
+
+def _build_tables():
+    ecc_f = np.zeros(256, dtype=np.uint8)
+    ecc_b = np.zeros(256, dtype=np.uint8)
+    edc = np.zeros(256, dtype=np.uint32)
+    for i in range(256):
+        j = (i << 1) ^ (0x11D if i & 0x80 else 0)
+        ecc_f[i] = j
+        ecc_b[i ^ j] = i
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ (0xD8018001 if crc & 1 else 0)
+        edc[i] = crc
+
+    # Slicing-by-4 tables: EDC_TABLES[k][b] = CRC of byte b followed by k zeros
+    tables = [edc]
+    for _ in range(3):
+        prev = tables[-1]
+        tables.append((prev >> 8) ^ edc[prev & 0xFF])
+    return ecc_f, ecc_b, tables
+
+
+ECC_F_LUT, ECC_B_LUT, EDC_TABLES = _build_tables()
+
+
+def _ecc_block_indices(major_count, minor_count, major_mult, minor_inc):
+    """(major_count, minor_count) table of byte indices for one parity block.
+
+    Same walk as the reference ecc_computeblock(): each major vector starts
+    at (major >> 1) * major_mult + (major & 1) and advances by minor_inc,
+    wrapping modulo the block size.
+    """
+    size = major_count * minor_count
+    idx = np.zeros((major_count, minor_count), dtype=np.intp)
+    for major in range(major_count):
+        index = (major >> 1) * major_mult + (major & 1)
+        for minor in range(minor_count):
+            idx[major, minor] = index
+            index += minor_inc
+            if index >= size:
+                index -= size
+    return idx
+
+
+# P: 86 vectors of 24 bytes, Q: 52 vectors of 43 bytes, both over sector+0xC
+P_INDEX = _ecc_block_indices(86, 24, 2, 86)
+Q_INDEX = _ecc_block_indices(52, 43, 86, 88)
+
+
+# ---------------------------------------------------------------------------
+# Vectorized EDC / ECC
+# ---------------------------------------------------------------------------
+
+def as_sectors(buf):
+    """View a bytes-like object (or array) as a (N, 2352) uint8 array."""
+    arr = np.frombuffer(buf, dtype=np.uint8) if not isinstance(buf, np.ndarray) else buf
+    if arr.size % SECTOR_RAW != 0:
+        raise ValueError("buffer size {} is not a multiple of {}".format(
+            arr.size, SECTOR_RAW))
+    return arr.reshape(-1, SECTOR_RAW)
+
+
+def compute_edc(block):
+    """CRC-32 (EDC) of each row of a (N, L) uint8 array. Returns uint32 (N,).
+
+    L must be a multiple of 4 (0x808 for Form1, 0x91C for Form2).
+    """
+    block = np.ascontiguousarray(block)
+    n, length = block.shape
+    if length % 4:
+        raise ValueError("EDC block length must be a multiple of 4")
+    words = block.view('<u4')
+    t0, t1, t2, t3 = EDC_TABLES
+    crc = np.zeros(n, dtype=np.uint32)
+    for k in range(words.shape[1]):
+        crc ^= words[:, k]
+        crc = (t3[crc & 0xFF]
+               ^ t2[(crc >> 8) & 0xFF]
+               ^ t1[(crc >> 16) & 0xFF]
+               ^ t0[crc >> 24])
+    return crc
+
+
+def _gf_mul2(x):
+    """Multiply uint8 symbols by alpha (x) in GF(2^8) / 0x11D, same as ECC_F_LUT."""
+    return (x << 1) ^ ((x >> 7) * np.uint8(0x1D))
+
+
+def _ecc_parity(block, index):
+    """Compute one RS parity block for each row of block (N, size)."""
+    symbols = block[:, index.T]                 # (N, minor, major)
+    ecc_a = np.zeros((block.shape[0], index.shape[0]), dtype=np.uint8)
+    for minor in range(symbols.shape[1]):
+        ecc_a = _gf_mul2(ecc_a ^ symbols[:, minor])
+    ecc_b = np.bitwise_xor.reduce(symbols, axis=1)
+    ecc_a = ECC_B_LUT[_gf_mul2(ecc_a) ^ ecc_b]
+    return np.concatenate([ecc_a, ecc_a ^ ecc_b], axis=1)
+
+
+def compute_ecc(sectors):
+    """P and Q parity of MODE2/Form1 sectors. Returns (P (N,172), Q (N,104)).
+
+    The header (address) bytes are treated as zero, as required for Mode 2.
+    """
+    block = np.array(sectors[:, HEADER_OFF:Q_OFF], dtype=np.uint8)
+    block[:, 0:4] = 0
+    p = _ecc_parity(block[:, :P_OFF - HEADER_OFF], P_INDEX)
+    block[:, P_OFF - HEADER_OFF:] = p
+    q = _ecc_parity(block, Q_INDEX)
+    return p, q
+
+
+def form2_mask(sectors):
+    """True for sectors whose subheader marks them as Form2."""
+    return (sectors[:, SUBHEADER_OFF + 2] & SUBMODE_FORM2) != 0
+
+
+def regenerate(sectors):
+    """Recompute EDC (and ECC for Form1) in place for a (N, 2352) array.
+
+    Form2 sectors get their EDC refreshed only if they had one (non-zero).
+    """
+    if not sectors.flags.writeable:
+        raise ValueError("sector array is read-only")
+    form2 = form2_mask(sectors)
+
+    form1 = np.flatnonzero(~form2)
+    if form1.size:
+        s1 = sectors[form1]
+        edc = compute_edc(s1[:, SUBHEADER_OFF:EDC_OFF])
+        s1[:, EDC_OFF:EDC_OFF + 4] = edc.astype('<u4').view(np.uint8).reshape(-1, 4)
+        p, q = compute_ecc(s1)
+        s1[:, P_OFF:Q_OFF] = p
+        s1[:, Q_OFF:] = q
+        sectors[form1] = s1
+
+    f2 = np.flatnonzero(form2)
+    if f2.size:
+        s2 = sectors[f2]
+        has_edc = s2[:, FORM2_EDC_OFF:].any(axis=1)
+        if has_edc.any():
+            edc = compute_edc(s2[:, SUBHEADER_OFF:FORM2_EDC_OFF])
+            edc_bytes = edc.astype('<u4').view(np.uint8).reshape(-1, 4)
+            s2[has_edc, FORM2_EDC_OFF:] = edc_bytes[has_edc]
+            sectors[f2] = s2
+    return sectors
+
+
+def check(sectors):
+    """Return a bool array, True where the stored EDC/ECC is correct.
+
+    Sectors without a sync pattern (audio / blank) are reported as valid.
+    """
+    sectors = as_sectors(sectors) if not isinstance(sectors, np.ndarray) else sectors
+    fixed = regenerate(np.array(sectors))
+    ok = (fixed == sectors).all(axis=1)
+    is_data = (sectors[:, :12] == np.frombuffer(SYNC, dtype=np.uint8)).all(axis=1)
+    return ok | ~is_data
+
+
+def regenerate_sector(raw):
+    """Return a copy of one 2352-byte sector with fresh EDC/ECC."""
+    sectors = np.array(as_sectors(raw))
+    regenerate(sectors)
+    return sectors.tobytes()
+
+
+# ---------------------------------------------------------------------------
+# In-buffer and in-file helpers
+# ---------------------------------------------------------------------------
+
+def _runs(lbas):
+    """Group sorted LBAs into (first_lba, count) runs."""
+    runs = []
+    for lba in sorted(set(lbas)):
+        if runs and runs[-1][0] + runs[-1][1] == lba:
+            runs[-1][1] += 1
+        else:
+            runs.append([lba, 1])
+    return runs
+
+
+def _batches(lbas):
+    """_runs() split so no batch exceeds BATCH_SECTORS (bounded memory)."""
+    batches = []
+    for first, n in _runs(lbas):
+        while n > 0:
+            step = min(n, BATCH_SECTORS)
+            batches.append((first, step))
+            first += step
+            n -= step
+    return batches
+
+
+def regenerate_in_buffer(bin_data, lbas):
+    """Recompute EDC/ECC of the given sectors inside a writable BIN image
+    (bytearray, or a writable mmap of the BIN file)."""
+    count = 0
+    view = np.frombuffer(bin_data, dtype=np.uint8)
+    for first, n in _batches(lbas):
+        start = first * SECTOR_RAW
+        sectors = view[start:start + n * SECTOR_RAW].reshape(-1, SECTOR_RAW)
+        regenerate(sectors)
+        count += n
+    return count
+
+
+def regenerate_in_file(bin_path, lbas):
+    """Recompute EDC/ECC of the given sectors in a RAW BIN file, in place.
+
+    Only the touched sectors are read and written back.
+    Returns the number of sectors regenerated.
+    """
+    count = 0
+    with open(bin_path, 'r+b') as f:
+        for first, n in _batches(lbas):
+            f.seek(first * SECTOR_RAW)
+            raw = bytearray(f.read(n * SECTOR_RAW))
+            if len(raw) != n * SECTOR_RAW:
+                raise ValueError("LBA {}+{} is past the end of {}".format(
+                    first, n, bin_path))
+            regenerate(as_sectors(raw))
+            f.seek(first * SECTOR_RAW)
+            f.write(raw)
+            count += n
+    return count
+
+
+def verify_file(bin_path, first_lba=0, count=None, fix=False):
+    """Scan a RAW BIN and return the list of LBAs with stale EDC/ECC.
+
+    With fix=True the bad sectors are rewritten with regenerated codes.
+    """
+    total = os.path.getsize(bin_path) // SECTOR_RAW
+    last = total if count is None else min(total, first_lba + count)
+    bad = []
+    mode = 'r+b' if fix else 'rb'
+    with open(bin_path, mode) as f:
+        lba = first_lba
+        while lba < last:
+            n = min(BATCH_SECTORS, last - lba)
+            f.seek(lba * SECTOR_RAW)
+            raw = bytearray(f.read(n * SECTOR_RAW))
+            sectors = as_sectors(raw)
+            ok = check(sectors)
+            bad_idx = np.flatnonzero(~ok)
+            bad.extend(int(lba + i) for i in bad_idx)
+            if fix and bad_idx.size:
+                regenerate(sectors)
+                for i in bad_idx:
+                    f.seek((lba + int(i)) * SECTOR_RAW)
+                    f.write(sectors[i].tobytes())
+            lba += n
+    return bad
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify / fix EDC+ECC of a RAW BIN")
+    parser.add_argument("bin", type=Path)
+    parser.add_argument("--lba", type=int, default=0, help="First LBA to scan")
+    parser.add_argument("--count", type=int, default=None, help="Sectors to scan")
+    parser.add_argument("--fix", action="store_true",
+                        help="Rewrite EDC/ECC of the bad sectors")
+    args = parser.parse_args()
+
+    if os.path.getsize(args.bin) % SECTOR_RAW != 0:
+        print("[ERROR] {} is not a RAW (2352) image".format(args.bin))
+        return 1
+
+    print("Scanning {}...".format(args.bin))
+    bad = verify_file(args.bin, args.lba, args.count, args.fix)
+    if not bad:
+        print("[OK] All sectors have valid EDC/ECC")
+        return 0
+
+    print("{} sector(s) with stale EDC/ECC{}".format(
+        len(bad), " (fixed)" if args.fix else ""))
+    for lba in bad[:20]:
+        print("  LBA {}".format(lba))
+    if len(bad) > 20:
+        print("  ... and {} more".format(len(bad) - 20))
+    return 0 if args.fix else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -66,5 +66,5 @@ if dump_num == 1 then
     print("6. Dis-moi quand c'est fait, je ferai le diff")
 else
     print("=== Les 2 dumps sont prets! ===")
-    print("Dis-moi et je lance le diff pour trouver le code de formation.")
+    print("Diff : py -3 tools/ram_diff.py")
 end
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+func_table.py
+Function boundary table of a MIPS code region (SLES_008.45, overlays, RAM).
+
+Resolving "which function contains this call site" used to walk backwards
+up to 0x2000 bytes for a prologue, once per call site. build() computes all
+the function ranges of a region in one sweep over its words:
+
+  - start: a prologue (addiu $sp,$sp,-N), a jal target inside the region,
+           or the region start;
+  - end:   after the delay slot of the last jr $ra before the next start
+           (the next start when there is none).
+
+The ranges are kept as sorted NumPy arrays; lookup() and prologue_before()
+are binary searches.
+
+    from func_table import functions_of
+    table = functions_of(exe, 0x80010000, 0x800)
+    table.lookup(0x80024FA0)        # (0x80024F90, 0x800250F8)
+
+cached_functions_of() keeps the tables of the last few images, so a script
+can call it for every lookup.
+
+Usage:
+  py -3 tools/func_table.py FILE ADDR [ADDR ...] [--base 0x80010000] [--offset 0x800]
+"""
+
+import argparse
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from mips_search import addiu, jal, words_view
+
+PROLOGUE = addiu(rt=29, rs=29)            # + negative immediate
+JR_RA = 0x03E00008
+
+
+class FunctionTable:
+    """Sorted [start, end) address ranges plus the prologue addresses."""
+
+    def __init__(self, starts, ends, prologues):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.prologues = np.asarray(prologues, dtype=np.int64)
+
+    def __len__(self):
+        return self.starts.size
+
+    def lookup(self, addr):
+        """(start, end) of the function containing addr, or None."""
+        k = int(np.searchsorted(self.starts, addr, side="right")) - 1
+        if k < 0 or addr >= self.ends[k]:
+            return None
+        return int(self.starts[k]), int(self.ends[k])
+
+    def start_of(self, addr):
+        found = self.lookup(addr)
+        return found[0] if found else None
+
+    def prologue_before(self, addr, max_search=0x2000, lower=None):
+        """Nearest prologue at or before addr, closer than max_search bytes
+        and above `lower` (same result as a backward walk)."""
+        k = int(np.searchsorted(self.prologues, addr, side="right")) - 1
+        if k < 0:
+            return None
+        found = int(self.prologues[k])
+        limit = addr - max_search if lower is None else max(addr - max_search, lower)
+        return found if found > limit else None
+
+    def __iter__(self):
+        return zip(self.starts.tolist(), self.ends.tolist())
+
+
+def build(words, base_addr, jal_targets=True):
+    """FunctionTable of a uint32 word array whose first word is at base_addr.
+
+    jal_targets=False when base_addr is not a RAM address (e.g. BLAZE.ALL
+    offsets of an overlay whose load address is unknown): prologues only.
+    """
+    n = words.size
+    if n == 0:
+        return FunctionTable([], [], [])
+    prologue = PROLOGUE.test(words) & ((words & np.uint32(0x8000)) != 0)
+    prologue_idx = np.flatnonzero(prologue)
+
+    calls = jal().test(words) if jal_targets else np.zeros(n, dtype=bool)
+    targets = ((words[calls] & np.uint32(0x3FFFFFF)).astype(np.int64) << 2) \
+        | (base_addr & 0xF0000000)
+    target_idx = (targets - base_addr) // 4
+    target_idx = target_idx[(targets % 4 == base_addr % 4)
+                            & (target_idx >= 0) & (target_idx < n)]
+
+    start_idx = np.union1d(np.union1d(prologue_idx, target_idx), [0])
+    next_idx = np.append(start_idx[1:], n)
+
+    returns = np.append(-1, np.flatnonzero(words == np.uint32(JR_RA)))
+    # last jr $ra before the next start
+    last_ret = returns[np.searchsorted(returns, next_idx, side="left") - 1]
+    has_ret = last_ret >= start_idx
+    end_idx = np.where(has_ret, np.minimum(last_ret + 2, next_idx), next_idx)
+
+    return FunctionTable(base_addr + 4 * start_idx, base_addr + 4 * end_idx,
+                         base_addr + 4 * prologue_idx)
+
+
+def functions_of(data, base_addr, data_offset=0, end=None, jal_targets=True):
+    """FunctionTable of data[data_offset:end] (base_addr = address of data[data_offset])."""
+    return build(words_view(data, data_offset, end), base_addr, jal_targets)
+
+
+@lru_cache(maxsize=8)
+def cached_functions_of(data, base_addr, data_offset=0, end=None, jal_targets=True):
+    """functions_of() built once per set of arguments, for scripts that look
+    functions up all along a run. data must be hashable: bytes, or a
+    DiscFile (tools/disc_file.py, read whole on the first call)."""
+    if not isinstance(data, bytes):
+        data = data[0:len(data)]
+    return functions_of(data, base_addr, data_offset, end, jal_targets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MIPS function boundaries")
+    parser.add_argument("file", help="SLES_008.45, BLAZE.ALL or RAM dump")
+    parser.add_argument("addrs", nargs="+", type=lambda v: int(v, 0))
+    parser.add_argument("--base", type=lambda v: int(v, 0), default=0,
+                        help="Address of file offset --offset (default 0)")
+    parser.add_argument("--offset", type=lambda v: int(v, 0), default=0)
+    args = parser.parse_args()
+
+    table = functions_of(Path(args.file).read_bytes(), args.base, args.offset)
+    print("{} functions".format(len(table)))
+    for addr in args.addrs:
+        found = table.lookup(addr)
+        if found:
+            print("  0x{:08X}: in 0x{:08X}-0x{:08X} (+0x{:X})".format(
+                addr, found[0], found[1], addr - found[0]))
+        else:
+            print("  0x{:08X}: not in a function".format(addr))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
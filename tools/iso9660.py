@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+iso9660.py
+ISO9660 directory reader for the game BIN (RAW 2352) or an ISO (2048).
+
+The patchers used to hardcode where files live on the disc (BLAZE.ALL at
+LBAs 163167 / 185765, 22566 sectors; SLES_008.45 at LBA 295081), which only
+holds for one dump. This module reads the Primary Volume Descriptor
+(LBA 16) and walks the directory records instead:
+
+    from iso9660 import find_file
+    sles = find_file(bin_path, "SLES_008.45")      # Entry(path, lba, size...)
+    copies = find_files(bin_path, "BLAZE.ALL")     # every directory entry
+
+The image is memory-mapped and only the descriptor / directory sectors (and
+the sectors of a file read with read_file) are touched; the 700 MB BIN is
+never loaded. The directory tree is cached per image (path, size, mtime),
+so several lookups in one run parse it once.
+
+BLAZE.ALL has two directory entries pointing at two copies of the data;
+find_files() returns them all, in directory order.
+
+Usage:
+  py -3 tools/iso9660.py BIN                 List every file (LBA, size)
+  py -3 tools/iso9660.py BIN BLAZE.ALL ...   Entries of the given files
+"""
+
+import mmap
+import os
+import struct
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+SECTOR_RAW = 2352       # RAW sector size
+SECTOR_ISO = 2048       # ISO sector size = user data per sector
+SYNC = b'\x00' + b'\xff' * 10 + b'\x00'
+
+PVD_LBA = 16
+PVD_ID = b'CD001'
+ROOT_RECORD_OFF = 156
+VOLUME_ID = slice(40, 72)
+
+FLAG_DIRECTORY = 0x02
+
+Entry = namedtuple("Entry", "path name lba size is_dir")
+
+
+def sectors_of(entry):
+    """Number of sectors spanned by an entry."""
+    return (entry.size + SECTOR_ISO - 1) // SECTOR_ISO
+
+
+class DiscImage:
+    """Memory-mapped view of a RAW or ISO disc image (read-only unless
+    writable=True)."""
+
+    def __init__(self, path, writable=False):
+        self.path = Path(path)
+        self.writable = writable
+        self.size = os.path.getsize(self.path)
+        self._file = open(self.path, 'r+b' if writable else 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0,
+                              access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        try:
+            self.sector_size, self.user_off = self._detect_format()
+        except ValueError:
+            self.close()
+            raise
+
+    def _detect_format(self):
+        """(sector size, user data offset) from the PVD sector content:
+        RAW when it starts with the sync pattern, ISO otherwise."""
+        raw = PVD_LBA * SECTOR_RAW
+        if self._map[raw:raw + len(SYNC)] == SYNC:
+            # MODE1 user data follows the 16-byte header, MODE2 the 8-byte subheader
+            user_off = 16 if self._map[raw + 15] == 1 else 24
+            if self._map[raw + user_off + 1:raw + user_off + 6] == PVD_ID:
+                return SECTOR_RAW, user_off
+        iso = PVD_LBA * SECTOR_ISO
+        if self._map[iso + 1:iso + 6] == PVD_ID:
+            return SECTOR_ISO, 0
+        raise ValueError(f"{self.path.name}: unknown image format "
+                         f"(no ISO9660 volume descriptor at LBA {PVD_LBA}, "
+                         f"RAW 2352 or ISO 2048)")
+
+    @property
+    def is_raw(self):
+        return self.sector_size == SECTOR_RAW
+
+    @property
+    def num_sectors(self):
+        return self.size // self.sector_size
+
+    @property
+    def buffer(self):
+        """The mmap itself (for NumPy views; release them before close())."""
+        return self._map
+
+    def close(self):
+        if self.writable:
+            self._map.flush()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def user_offset(self, lba):
+        """Absolute image offset of the user data of sector lba."""
+        return lba * self.sector_size + self.user_off
+
+    def read_sector(self, lba):
+        """2048 user bytes of sector lba."""
+        if not 0 <= lba < self.num_sectors:
+            raise ValueError(f"LBA {lba} outside the image (0-{self.num_sectors - 1})")
+        off = self.user_offset(lba)
+        return self._map[off:off + SECTOR_ISO]
+
+    def read(self, lba, size):
+        """size bytes of user data starting at sector lba."""
+        out = bytearray()
+        while len(out) < size:
+            out += self.read_sector(lba)
+            lba += 1
+        del out[size:]
+        return bytes(out)
+
+    def read_file(self, entry):
+        return self.read(entry.lba, entry.size)
+
+    # -- ISO9660 ---------------------------------------------------------
+
+    def volume_descriptor(self):
+        pvd = self.read_sector(PVD_LBA)
+        if pvd[0] != 1 or pvd[1:6] != PVD_ID:
+            raise ValueError(f"{self.path.name}: no ISO9660 volume descriptor at LBA {PVD_LBA}")
+        return pvd
+
+    def volume_id(self):
+        return self.volume_descriptor()[VOLUME_ID].decode('ascii', 'replace').strip()
+
+    def entries(self):
+        """Every file and directory entry, depth first, in directory order."""
+        root = _parse_record(self.volume_descriptor(), ROOT_RECORD_OFF)
+        result = []
+        seen = set()
+        self._walk(root[0], root[1], "", result, seen)
+        return result
+
+    def _walk(self, lba, size, parent, result, seen):
+        if lba in seen:                 # malformed image: directory loop
+            return
+        seen.add(lba)
+        data = self.read(lba, size)
+        subdirs = []
+        for sector_start in range(0, len(data), SECTOR_ISO):
+            pos = sector_start
+            end = min(sector_start + SECTOR_ISO, len(data))
+            # Records never cross a sector boundary; a 0 length byte pads
+            # the rest of the sector
+            while pos < end and data[pos]:
+                rec_lba, rec_size, flags, raw_name = _parse_record(data, pos)
+                pos += data[pos]
+                if raw_name in (b'\x00', b'\x01'):       # "." and ".."
+                    continue
+                name = raw_name.decode('ascii', 'replace').split(';')[0]
+                is_dir = bool(flags & FLAG_DIRECTORY)
+                if not is_dir:
+                    name = name.rstrip('.')
+                path = f"{parent}/{name}"
+                result.append(Entry(path, name, rec_lba, rec_size, is_dir))
+                if is_dir:
+                    subdirs.append((rec_lba, rec_size, path))
+        for rec_lba, rec_size, path in subdirs:
+            self._walk(rec_lba, rec_size, path, result, seen)
+
+
+def _parse_record(buf, pos):
+    """(lba, size, flags, name bytes) of the directory record at buf[pos]."""
+    lba = struct.unpack_from('<I', buf, pos + 2)[0]
+    size = struct.unpack_from('<I', buf, pos + 10)[0]
+    flags = buf[pos + 25]
+    name_len = buf[pos + 32]
+    return lba, size, flags, bytes(buf[pos + 33:pos + 33 + name_len])
+
+
+# ---------------------------------------------------------------------------
+# Cached lookups
+# ---------------------------------------------------------------------------
+
+_tree_cache = {}
+
+
+def directory(path):
+    """Entries of an image, parsed once per (path, size, mtime)."""
+    st = os.stat(path)
+    key = (str(Path(path).resolve()), st.st_size, st.st_mtime_ns)
+    if key not in _tree_cache:
+        with DiscImage(path) as disc:
+            _tree_cache[key] = disc.entries()
+    return _tree_cache[key]
+
+
+def find_files(path, name):
+    """Every file entry called name (case-insensitive, any directory)."""
+    name = name.upper()
+    return [e for e in directory(path)
+            if not e.is_dir and name in (e.name.upper(), e.path.upper())]
+
+
+def find_file(path, name):
+    """The first entry called name; ValueError when the image has none."""
+    found = find_files(path, name)
+    if not found:
+        raise ValueError(f"{name} not found in {Path(path).name}")
+    return found[0]
+
+
+def read_file(path, name):
+    """Content of the first entry called name, read from the image."""
+    entry = find_file(path, name)
+    with DiscImage(path) as disc:
+        return disc.read_file(entry)
+
+
+def duplicates(entries):
+    """{name: [entries]} of the file names with several entries."""
+    by_name = {}
+    for e in entries:
+        if not e.is_dir:
+            by_name.setdefault(e.name.upper(), []).append(e)
+    return {name: found for name, found in by_name.items() if len(found) > 1}
+
+
+def _format(entry):
+    kind = "<DIR>" if entry.is_dir else f"{entry.size:>11,}"
+    return f"  LBA {entry.lba:>7}  {sectors_of(entry):>6} sect  {kind}  {entry.path}"
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return 1
+    path = Path(sys.argv[1])
+    names = sys.argv[2:]
+
+    with DiscImage(path) as disc:
+        print(f"{path.name}: {'RAW (2352)' if disc.is_raw else 'ISO (2048)'}, "
+              f"{disc.num_sectors} sectors, volume '{disc.volume_id()}'")
+    entries = directory(path)
+
+    if names:
+        for name in names:
+            found = find_files(path, name)
+            if not found:
+                print(f"  {name}: not found")
+            for e in found:
+                print(_format(e))
+        return 0
+
+    for e in entries:
+        print(_format(e))
+    dups = duplicates(entries)
+    if dups:
+        print("\nDuplicate entries:")
+        for found in dups.values():
+            for e in found:
+                print(_format(e))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+item_locator.py
+Locates every copy of every item in BLAZE.ALL in one pass.
+
+Item entries are 128-byte records:
+  +0x00  name, null-padded to 16 bytes (names of 16+ chars fill the field)
+  +0x41  description, "Name/Description" or "Description", null-terminated
+         (63 chars max)
+  +0x88  base price (u16, used by the auction formula)
+
+The same item exists in many copies (one per area/shop table), plus a few
+"Name/Description" texts outside any entry. Instead of one data.find() per
+item and per patcher, locate_items() builds the whole name -> offsets table
+with tools/name_scan.py (one NumPy pass for the null-padded names, one for
+the "Name/" texts) and is shared by:
+  - Data/auction_prices/patch_auction_base_prices.py  (entries only)
+  - Data/items/patch_items_in_bin.py --regen-offsets  (all_offsets lists)
+
+Usage:
+  py -3 tools/item_locator.py BLAZE.ALL [all_items_clean.json]
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from name_scan import NAME_FIELD, find_fields, find_names
+
+ITEM_ENTRY_SIZE = 128
+DESC_OFFSET = 0x41
+DESC_MAX = 63
+BASE_PRICE_OFFSET = 0x88
+
+# Regions that are NOT item data (spells, UI strings, herb name lists)
+BAD_RANGES = [
+    (0x00908000, 0x00910000),  # Spells area
+    (0x0090A000, 0x0090C000),  # UI strings, herb names list
+]
+
+
+def in_bad_range(offset):
+    return any(start <= offset < end for start, end in BAD_RANGES)
+
+
+def has_entry_layout(data, offset):
+    """True if offset looks like an item entry: the record fits in data and
+    +0x41 holds a printable, null-terminated description (or nothing)."""
+    if offset + ITEM_ENTRY_SIZE > len(data):
+        return False
+    desc = data[offset + DESC_OFFSET:offset + DESC_OFFSET + DESC_MAX + 1]
+    end = desc.find(b'\x00')
+    if end == -1:
+        return False
+    return all(0x20 <= b < 0x7F for b in desc[:end])
+
+
+def find_entries(data, names):
+    """{name: [offsets]} of the 16-byte name fields (name + null padding).
+
+    Same matches as searching name.ljust(16, b'\\x00') (or name[:16] for
+    names of 16+ chars) with data.find(), minus BAD_RANGES. No layout check.
+    """
+    names = [n for n in dict.fromkeys(names) if n]
+    found = find_fields(data, names)
+
+    index = {}
+    for name in names:
+        try:
+            raw = name.encode('ascii')
+        except UnicodeEncodeError:
+            index[name] = []
+            continue
+        offsets = found[name]
+        if len(raw) >= NAME_FIELD:
+            # Name fills the field: plain search for the first 16 bytes
+            pattern = raw[:NAME_FIELD]
+            pos = data.find(pattern)
+            while pos != -1:
+                offsets.append(pos)
+                pos = data.find(pattern, pos + 1)
+        index[name] = [pos for pos in offsets if not in_bad_range(pos)]
+    return index
+
+
+def find_texts(data, names):
+    """{name: [offsets]} of "Name/Description" texts (outside BAD_RANGES)."""
+    found = find_names(data, [n for n in names if n], field_size=DESC_MAX + 1,
+                       terminator=ord('/'))
+    return {name: [pos for pos in offsets if not in_bad_range(pos)]
+            for name, offsets in found.items()}
+
+
+def locate_items(data, names, layout=True):
+    """Full item table: {name: {"entries": [...], "texts": [...], "rejected": [...]}}
+
+    entries:  item entries (name field at +0x00), layout-checked if `layout`
+    texts:    "Name/Description" texts that are not the +0x41 description of
+              one of the entries above
+    rejected: name-field matches that fail the 128-byte layout check
+    """
+    entries = find_entries(data, names)
+    texts = find_texts(data, names)
+
+    table = {}
+    for name in entries:
+        ok, rejected = [], []
+        for pos in entries[name]:
+            (ok if not layout or has_entry_layout(data, pos) else rejected).append(pos)
+        desc_offsets = {pos + DESC_OFFSET for pos in ok}
+        table[name] = {
+            "entries": ok,
+            "texts": [pos for pos in texts.get(name, []) if pos not in desc_offsets],
+            "rejected": rejected,
+        }
+    return table
+
+
+def all_offsets(located):
+    """Sorted offsets (entries + texts) of one locate_items() value."""
+    return sorted(located["entries"] + located["texts"])
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: py -3 tools/item_locator.py <BLAZE.ALL> [all_items_clean.json]")
+        return 1
+    items_json = (Path(sys.argv[2]) if len(sys.argv) > 2 else
+                  Path(__file__).parent.parent / "Data" / "items" / "all_items_clean.json")
+    data = Path(sys.argv[1]).read_bytes()
+    with open(items_json, 'r', encoding='utf-8') as f:
+        names = [item.get('name', '') for item in json.load(f)['items']]
+
+    table = locate_items(data, names)
+    n_entries = sum(len(v["entries"]) for v in table.values())
+    n_texts = sum(len(v["texts"]) for v in table.values())
+    n_rejected = sum(len(v["rejected"]) for v in table.values())
+    print("=" * 60)
+    print("  Item locator: {}".format(sys.argv[1]))
+    print("=" * 60)
+    print("  Items: {}  Entries: {}  Texts: {}  Rejected (layout): {}".format(
+        len(table), n_entries, n_texts, n_rejected))
+    print()
+    for name, located in table.items():
+        print("  {:<24} {:>3} entries {:>2} texts".format(
+            name, len(located["entries"]), len(located["texts"])))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
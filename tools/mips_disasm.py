@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+mips_disasm.py
+Table-driven MIPS R3000 disassembler shared by the research scripts.
+
+decode() splits a whole range of words into op/rs/rt/rd/shamt/funct/imm
+NumPy arrays at once and maps every word to an entry of a 256-slot dispatch
+table (opcode, SPECIAL funct, REGIMM rt, COP0/COP2 rs). Text is only built
+when a line is printed, so decoding a full overlay costs a few array
+operations and listing 100 lines costs 100 format calls.
+
+    from mips_disasm import decode_range
+    d = decode_range(exe, EXE_LOAD_ADDR, 0x80024F90, 0x80025100, EXE_HEADER_SIZE)
+    for line in d.listing(symbols):
+        print(line)
+
+Analysis helpers on a Decoded range:
+  - lui_pairs()      lui + addiu/ori/load/store -> full 32-bit value
+  - targets()        jump/branch target of every word (0 = none)
+  - dest()           register written by every word (-1 = none)
+  - annotate(i)      symbol name, call target, resolved constant, RETURN...
+
+Usage:
+  py -3 tools/mips_disasm.py FILE START END [--base 0x80010000] [--offset 0x800]
+  (SLES_008.45: --base 0x80010000 --offset 0x800, RAM dump: --base 0x80000000)
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from mips_search import REGS
+
+REG = ['$' + name for name in REGS]
+
+# Operand formats
+R3 = "rd,rs,rt"
+SHIFT = "rd,rt,sa"
+SHIFTV = "rd,rt,rs"
+RS = "rs"
+RD = "rd"
+RS_RT = "rs,rt"
+NONE = ""
+JALR = "jalr"
+BRANCH2 = "rs,rt,off"
+BRANCH1 = "rs,off"
+JUMP = "target"
+IMM = "rt,rs,simm"
+UIMM = "rt,rs,uimm"
+LUI = "rt,uimm"
+MEM = "rt,simm(rs)"
+MEM_COP1 = "ft,simm(rs)"
+MEM_COP2 = "gte,simm(rs)"
+COP_MOVE = "rt,cd"
+COP_CMD = "cmd"
+
+OPCODES = {
+    0x02: ("j", JUMP), 0x03: ("jal", JUMP),
+    0x04: ("beq", BRANCH2), 0x05: ("bne", BRANCH2),
+    0x06: ("blez", BRANCH1), 0x07: ("bgtz", BRANCH1),
+    0x08: ("addi", IMM), 0x09: ("addiu", IMM),
+    0x0A: ("slti", IMM), 0x0B: ("sltiu", IMM),
+    0x0C: ("andi", UIMM), 0x0D: ("ori", UIMM), 0x0E: ("xori", UIMM),
+    0x0F: ("lui", LUI),
+    0x20: ("lb", MEM), 0x21: ("lh", MEM), 0x22: ("lwl", MEM), 0x23: ("lw", MEM),
+    0x24: ("lbu", MEM), 0x25: ("lhu", MEM), 0x26: ("lwr", MEM),
+    0x28: ("sb", MEM), 0x29: ("sh", MEM), 0x2A: ("swl", MEM), 0x2B: ("sw", MEM),
+    0x2E: ("swr", MEM),
+    0x31: ("lwc1", MEM_COP1), 0x39: ("swc1", MEM_COP1),
+    0x32: ("lwc2", MEM_COP2), 0x3A: ("swc2", MEM_COP2),
+}
+
+SPECIAL = {
+    0x00: ("sll", SHIFT), 0x02: ("srl", SHIFT), 0x03: ("sra", SHIFT),
+    0x04: ("sllv", SHIFTV), 0x06: ("srlv", SHIFTV), 0x07: ("srav", SHIFTV),
+    0x08: ("jr", RS), 0x09: ("jalr", JALR),
+    0x0C: ("syscall", NONE), 0x0D: ("break", NONE),
+    0x10: ("mfhi", RD), 0x11: ("mthi", RS), 0x12: ("mflo", RD), 0x13: ("mtlo", RS),
+    0x18: ("mult", RS_RT), 0x19: ("multu", RS_RT),
+    0x1A: ("div", RS_RT), 0x1B: ("divu", RS_RT),
+    0x20: ("add", R3), 0x21: ("addu", R3), 0x22: ("sub", R3), 0x23: ("subu", R3),
+    0x24: ("and", R3), 0x25: ("or", R3), 0x26: ("xor", R3), 0x27: ("nor", R3),
+    0x2A: ("slt", R3), 0x2B: ("sltu", R3),
+}
+
+REGIMM = {
+    0x00: ("bltz", BRANCH1), 0x01: ("bgez", BRANCH1),
+    0x10: ("bltzal", BRANCH1), 0x11: ("bgezal", BRANCH1),
+}
+
+# COP0 / COP2 (GTE), keyed by rs
+COP = {
+    (0, 0x00): ("mfc0", COP_MOVE), (0, 0x04): ("mtc0", COP_MOVE),
+    (0, 0x10): ("rfe", NONE),
+    (2, 0x00): ("mfc2", COP_MOVE), (2, 0x02): ("cfc2", COP_MOVE),
+    (2, 0x04): ("mtc2", COP_MOVE), (2, 0x06): ("ctc2", COP_MOVE),
+}
+for _rs in range(0x10, 0x20):
+    COP[(2, _rs)] = ("cop2", COP_CMD)
+
+# Dispatch table: key = op, 64 + funct (SPECIAL), 128 + rt (REGIMM),
+# 192 + rs (COP0), 224 + rs (COP2)
+KEY_SPECIAL, KEY_REGIMM, KEY_COP0, KEY_COP2 = 64, 128, 192, 224
+TABLE = [None] * 256
+for _op, _entry in OPCODES.items():
+    TABLE[_op] = _entry
+for _funct, _entry in SPECIAL.items():
+    TABLE[KEY_SPECIAL + _funct] = _entry
+for _rt, _entry in REGIMM.items():
+    TABLE[KEY_REGIMM + _rt] = _entry
+for (_cop, _rs), _entry in COP.items():
+    TABLE[(KEY_COP2 if _cop == 2 else KEY_COP0) + _rs] = _entry
+
+BRANCH_OPS = (0x01, 0x04, 0x05, 0x06, 0x07)
+LOAD_OPS = (0x20, 0x21, 0x22, 0x23, 0x24, 0x25, 0x26)
+STORE_OPS = (0x28, 0x29, 0x2A, 0x2B, 0x2E)
+# SPECIAL functs that do not write rd
+NO_RD = (0x08, 0x0C, 0x0D, 0x11, 0x13, 0x18, 0x19, 0x1A, 0x1B)
+
+
+class Decoded:
+    """A range of instructions decoded into NumPy field arrays."""
+
+    def __init__(self, words, base_addr, valid=None):
+        w = np.ascontiguousarray(words, dtype=np.uint32)
+        self.words = w
+        self.base_addr = base_addr
+        self.addrs = (base_addr + 4 * np.arange(w.size, dtype=np.int64)) & 0xFFFFFFFF
+        self.valid = valid                  # None = every word is in the data
+        self.op = (w >> 26).astype(np.uint8)
+        self.rs = ((w >> 21) & 0x1F).astype(np.uint8)
+        self.rt = ((w >> 16) & 0x1F).astype(np.uint8)
+        self.rd = ((w >> 11) & 0x1F).astype(np.uint8)
+        self.shamt = ((w >> 6) & 0x1F).astype(np.uint8)
+        self.funct = (w & 0x3F).astype(np.uint8)
+        self.imm = (w & 0xFFFF).astype(np.int64)
+        self.simm = self.imm - ((self.imm & 0x8000) << 1)
+
+        key = self.op.astype(np.int32)
+        key = np.where(self.op == 0, KEY_SPECIAL + self.funct, key)
+        key = np.where(self.op == 1, KEY_REGIMM + self.rt, key)
+        key = np.where(self.op == 0x10, KEY_COP0 + self.rs, key)
+        key = np.where(self.op == 0x12, KEY_COP2 + self.rs, key)
+        self.key = key
+        self._dest = None
+        self._targets = None
+
+    def __len__(self):
+        return self.words.size
+
+    def index(self, addr):
+        """Index of the word at addr (no range check)."""
+        return (addr - self.base_addr) // 4
+
+    # -- text ---------------------------------------------------------------
+
+    def text(self, i):
+        """Assembly text of word i."""
+        if self.valid is not None and not self.valid[i]:
+            return "??? (out of range)"
+        word = int(self.words[i])
+        if word == 0:
+            return "nop"
+        entry = TABLE[self.key[i]]
+        if entry is None:
+            if self.op[i] == 0:
+                return "SPECIAL.%02X %s,%s,%s" % (
+                    self.funct[i], REG[self.rd[i]], REG[self.rs[i]], REG[self.rt[i]])
+            if self.op[i] == 1:
+                return "REGIMM.%02X %s" % (self.rt[i], REG[self.rs[i]])
+            return "op%02X    0x%08X" % (self.op[i], word)
+        mnemonic, fmt = entry
+        operands = self._operands(i, fmt)
+        if not operands:
+            return mnemonic
+        return "%-7s %s" % (mnemonic, operands)
+
+    def _operands(self, i, fmt):
+        rs, rt, rd = REG[self.rs[i]], REG[self.rt[i]], REG[self.rd[i]]
+        if fmt == R3:
+            return "%s,%s,%s" % (rd, rs, rt)
+        if fmt == SHIFT:
+            return "%s,%s,%d" % (rd, rt, self.shamt[i])
+        if fmt == SHIFTV:
+            return "%s,%s,%s" % (rd, rt, rs)
+        if fmt == RS:
+            return rs
+        if fmt == RD:
+            return rd
+        if fmt == RS_RT:
+            return "%s,%s" % (rs, rt)
+        if fmt == JALR:
+            return rs if self.rd[i] == 31 else "%s,%s" % (rd, rs)
+        if fmt == BRANCH2:
+            return "%s,%s,0x%08X" % (rs, rt, self.targets()[i])
+        if fmt == BRANCH1:
+            return "%s,0x%08X" % (rs, self.targets()[i])
+        if fmt == JUMP:
+            return "0x%08X" % self.targets()[i]
+        if fmt == IMM:
+            return "%s,%s,%d" % (rt, rs, self.simm[i])
+        if fmt == UIMM:
+            return "%s,%s,0x%04X" % (rt, rs, self.imm[i])
+        if fmt == LUI:
+            return "%s,0x%04X" % (rt, self.imm[i])
+        if fmt == MEM:
+            return "%s,%d(%s)" % (rt, self.simm[i], rs)
+        if fmt == MEM_COP1:
+            return "$f%d,%d(%s)" % (self.rt[i], self.simm[i], rs)
+        if fmt == MEM_COP2:
+            return "$%d,%d(%s)" % (self.rt[i], self.simm[i], rs)
+        if fmt == COP_MOVE:
+            return "%s,$%d" % (rt, self.rd[i])
+        if fmt == COP_CMD:
+            return "0x%07X" % (int(self.words[i]) & 0x1FFFFFF)
+        return ""
+
+    def lines(self, valid_only=False):
+        """[(addr, word, text)] for the whole range (valid_only: skip the
+        words outside the data)."""
+        return [(int(self.addrs[i]), int(self.words[i]), self.text(i))
+                for i in range(len(self))
+                if not valid_only or self.valid is None or self.valid[i]]
+
+    # -- analysis -----------------------------------------------------------
+
+    def targets(self):
+        """Jump/branch target address of every word (0 when not a jump/branch)."""
+        if self._targets is None:
+            op = self.op
+            branch = np.isin(op, BRANCH_OPS)
+            branch_t = (self.addrs + 4 + (self.simm << 2)) & 0xFFFFFFFF
+            jump_t = (self.addrs & 0xF0000000) | ((self.words.astype(np.int64) & 0x3FFFFFF) << 2)
+            self._targets = np.where((op == 2) | (op == 3), jump_t,
+                                     np.where(branch, branch_t, 0))
+        return self._targets
+
+    def dest(self):
+        """Register written by every word (-1 when none, $zero excluded)."""
+        if self._dest is None:
+            op = self.op
+            dest = np.full(len(self), -1, dtype=np.int8)
+            i_type = ((op >= 0x08) & (op <= 0x0F)) | np.isin(op, LOAD_OPS)
+            dest[i_type] = self.rt[i_type]
+            r_type = (op == 0) & ~np.isin(self.funct, NO_RD)
+            dest[r_type] = self.rd[r_type]
+            cop_read = ((op == 0x10) | (op == 0x12)) & ((self.rs == 0) | (self.rs == 2))
+            dest[cop_read] = self.rt[cop_read]
+            link = (op == 3) | ((op == 1) & ((self.rt == 0x10) | (self.rt == 0x11)))
+            dest[link] = 31
+            dest[dest == 0] = -1
+            self._dest = dest
+        return self._dest
+
+    def lui_pairs(self, window=10):
+        """{index: (value, lui index)} for every addiu/ori/load/store that
+        completes a lui within `window` words, until the register is
+        overwritten. addiu and loads/stores sign-extend the low half."""
+        n = len(self)
+        lui_idx = np.flatnonzero((self.op == 0x0F) & (self.rt != 0))
+        reg = self.rt[lui_idx]
+        hi = self.imm[lui_idx] << 16
+        alive = np.ones(lui_idx.size, dtype=bool)
+        dest = self.dest()
+        pairs = {}
+        for k in range(1, window + 1):
+            j = lui_idx + k
+            alive &= j < n
+            if not alive.any():
+                break
+            j = np.minimum(j, n - 1)
+            op = self.op[j]
+            uses = alive & (self.rs[j] == reg)
+            signed = uses & ((op == 0x09) | np.isin(op, LOAD_OPS) | np.isin(op, STORE_OPS))
+            zero_ext = uses & (op == 0x0D)
+            value = np.where(zero_ext, hi | self.imm[j], (hi + self.simm[j]) & 0xFFFFFFFF)
+            for m in np.flatnonzero(signed | zero_ext).tolist():
+                pairs.setdefault(int(j[m]), (int(value[m]), int(lui_idx[m])))
+            alive &= dest[j] != reg
+        return pairs
+
+    def annotate(self, i, symbols=None, pairs=None):
+        """Notes for word i: label, call target, resolved constant, jumps."""
+        symbols = symbols or {}
+        notes = []
+        addr = int(self.addrs[i])
+        if addr in symbols:
+            notes.append("<%s>" % symbols[addr])
+        op, funct = self.op[i], self.funct[i]
+        if op == 0x03:
+            target = int(self.targets()[i])
+            notes.append("call %s" % symbols.get(target, "0x%08X" % target))
+        elif op == 0 and funct == 0x09:
+            notes.append("INDIRECT CALL via %s" % REG[self.rs[i]])
+        elif op == 0 and funct == 0x08:
+            notes.append("RETURN" if self.rs[i] == 31 else
+                         "INDIRECT JUMP via %s" % REG[self.rs[i]])
+        if pairs and i in pairs:
+            value = pairs[i][0]
+            name = symbols.get(value)
+            notes.append("= 0x%08X%s" % (value, " (%s)" % name if name else ""))
+        return notes
+
+    def listing(self, symbols=None, resolve_pairs=True):
+        """Printable lines "  0xADDR: WORD  asm  ; notes" for the range."""
+        pairs = self.lui_pairs() if resolve_pairs else None
+        out = []
+        for i in range(len(self)):
+            line = "  0x%08X: %08X  %s" % (self.addrs[i], self.words[i], self.text(i))
+            notes = self.annotate(i, symbols, pairs)
+            if notes:
+                line = "%-56s ; %s" % (line, " | ".join(notes))
+            out.append(line)
+        return out
+
+
+def decode(words, base_addr):
+    """Decode a uint32 array whose first word is at base_addr."""
+    return Decoded(words, base_addr)
+
+
+def decode_range(data, base_addr, start_addr, end_addr, data_offset=0):
+    """Decode start_addr..end_addr of data (base_addr = address of
+    data[data_offset]). Words outside data are flagged "out of range"."""
+    count = max(0, (end_addr - start_addr + 3) // 4)
+    first = start_addr - base_addr + data_offset
+    idx = first + 4 * np.arange(count, dtype=np.int64)
+    valid = (idx >= 0) & (idx + 4 <= len(data))
+    words = np.zeros(count, dtype=np.uint32)
+    if valid.any():
+        lo = int(np.flatnonzero(valid)[0])
+        hi = int(np.flatnonzero(valid)[-1]) + 1
+        words[lo:hi] = np.frombuffer(data, dtype='<u4', count=hi - lo,
+                                     offset=int(idx[lo]))
+    return Decoded(words, start_addr, None if valid.all() else valid)
+
+
+def disasm(word, addr):
+    """Text of a single instruction."""
+    return Decoded(np.array([word], dtype=np.uint32), addr).text(0)
+
+
+def disasm_range(data, base_addr, start_addr, count, data_offset=0):
+    """[(addr, word, text)] for `count` instructions from start_addr.
+    Words outside data give (addr, 0, "??? (out of range)")."""
+    return decode_range(data, base_addr, start_addr, start_addr + 4 * count,
+                        data_offset).lines()
+
+
+def symbols_from(addresses):
+    """{addr: name} from a {name: addr} table (e.g. breakpoint_helper.ADDRESSES),
+    RAM addresses only."""
+    return {addr: name for name, addr in addresses.items() if addr >= 0x80000000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MIPS R3000 disassembler")
+    parser.add_argument("file", help="SLES_008.45, BLAZE.ALL or RAM dump")
+    parser.add_argument("start", type=lambda v: int(v, 0), help="First address")
+    parser.add_argument("end", type=lambda v: int(v, 0), help="End address (excluded)")
+    parser.add_argument("--base", type=lambda v: int(v, 0), default=0,
+                        help="Address of file offset --offset (default 0)")
+    parser.add_argument("--offset", type=lambda v: int(v, 0), default=0)
+    args = parser.parse_args()
+
+    data = Path(args.file).read_bytes()
+    decoded = decode_range(data, args.base, args.start, args.end, args.offset)
+    for line in decoded.listing():
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+mips_search.py
+Vectorized MIPS instruction-sequence search (BLAZE.ALL overlays, SLES, RAM).
+
+The code range is viewed as a uint32 NumPy array and every pattern is a
+(mask, value) test on whole arrays, so a query over the 9 million overlay
+words takes a fraction of a second instead of a Python loop per word.
+
+A query is a list of terms:
+  insn(op=0x09, rs=0, rt=5, imm="dmg")   fixed fields (int), wildcards
+                                         (None) and captures (str)
+  gap(0, 4)                              0 to 4 arbitrary words before the
+                                         next term (every distance is tried)
+Helpers build the usual instructions: jal(addr), jalr(), addiu(rt, rs, imm),
+ori(), addu(), word(value), ANY. A capture name used twice must capture the
+same value (e.g. the same register).
+
+    from mips_search import addiu, addu, gap, jal, search
+    # every addiu a1, zero, N within 5 words before jal 0x80024F90
+    search(data, [addiu(5, 0, "n"), gap(0, 4), jal(0x80024F90)],
+           start=0x900000, end=0x2D00000)
+
+search() returns Match(offset, offsets, fields): byte offset of the first
+term in `data`, byte offset of each term, and the captured fields.
+
+Usage:
+  py -3 tools/mips_search.py FILE "addiu a1,zero,?n; ...0-4; jal 0x80024F90"
+                             [--start 0x900000] [--end 0x2D00000]
+                             [--base 0x80010000] [--limit 50]
+  Query terms: MNEMONIC ARGS, "*" (any word), "...N" or "...MIN-MAX" (gap).
+  Arguments: register name/number, number, "?" wildcard, "?name" capture.
+"""
+
+import argparse
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+# name: (shift, width)
+FIELDS = {
+    "op": (26, 6),
+    "rs": (21, 5),
+    "rt": (16, 5),
+    "rd": (11, 5),
+    "shamt": (6, 5),
+    "funct": (0, 6),
+    "imm": (0, 16),
+    "target": (0, 26),
+}
+
+REGS = ['zero', 'at', 'v0', 'v1', 'a0', 'a1', 'a2', 'a3',
+        't0', 't1', 't2', 't3', 't4', 't5', 't6', 't7',
+        's0', 's1', 's2', 's3', 's4', 's5', 's6', 's7',
+        't8', 't9', 'k0', 'k1', 'gp', 'sp', 'fp', 'ra']
+REG_NUM = {name: i for i, name in enumerate(REGS)}
+
+Match = namedtuple("Match", ["offset", "offsets", "fields"])
+
+
+class Insn:
+    """One word pattern: (word & mask) == value, plus field captures."""
+
+    def __init__(self, mask=0, value=0, captures=()):
+        self.mask = mask
+        self.value = value & mask
+        self.captures = tuple(captures)     # (name, shift, width)
+
+    def test(self, words):
+        """Boolean array: which words match the pattern."""
+        if self.mask == 0:
+            return np.ones(words.shape, dtype=bool)
+        return (words & np.uint32(self.mask)) == np.uint32(self.value)
+
+    def __repr__(self):
+        return "Insn(0x{:08X}, 0x{:08X}, {})".format(
+            self.mask, self.value, [c[0] for c in self.captures])
+
+
+class Gap:
+    """min..max arbitrary words before the next term."""
+
+    def __init__(self, min_words, max_words):
+        if not 0 <= min_words <= max_words:
+            raise ValueError("bad gap {}-{}".format(min_words, max_words))
+        self.min = min_words
+        self.max = max_words
+
+
+def insn(**fields):
+    """Pattern from field values: int = fixed, None = any, str = capture."""
+    mask = value = 0
+    captures = []
+    for name, spec in fields.items():
+        shift, width = FIELDS[name]
+        if spec is None:
+            continue
+        if isinstance(spec, str):
+            captures.append((spec, shift, width))
+            continue
+        field_mask = ((1 << width) - 1) << shift
+        mask |= field_mask
+        value |= (spec << shift) & field_mask
+    return Insn(mask, value, captures)
+
+
+def gap(min_words, max_words=None):
+    return Gap(min_words, min_words if max_words is None else max_words)
+
+
+def word(value):
+    return Insn(0xFFFFFFFF, value)
+
+
+ANY = Insn()
+
+
+def jal(target=None):
+    if target is None or isinstance(target, str):
+        return insn(op=0x03, target=target)
+    return insn(op=0x03, target=(target >> 2) & 0x3FFFFFF)
+
+
+def j(target=None):
+    if target is None or isinstance(target, str):
+        return insn(op=0x02, target=target)
+    return insn(op=0x02, target=(target >> 2) & 0x3FFFFFF)
+
+
+def jalr(rs=None, rd=None):
+    return insn(op=0x00, rs=rs, rd=rd, funct=0x09)
+
+
+def jr(rs=None):
+    return insn(op=0x00, rs=rs, funct=0x08)
+
+
+def _i_type(op):
+    def build(rt=None, rs=None, imm=None):
+        return insn(op=op, rs=rs, rt=rt, imm=imm)
+    return build
+
+
+def _r_type(funct):
+    def build(rd=None, rs=None, rt=None):
+        return insn(op=0x00, rs=rs, rt=rt, rd=rd, shamt=0, funct=funct)
+    return build
+
+
+addiu = _i_type(0x09)
+slti = _i_type(0x0A)
+sltiu = _i_type(0x0B)
+andi = _i_type(0x0C)
+ori = _i_type(0x0D)
+lb = _i_type(0x20)
+lh = _i_type(0x21)
+lw = _i_type(0x23)
+lbu = _i_type(0x24)
+lhu = _i_type(0x25)
+sb = _i_type(0x28)
+sh = _i_type(0x29)
+sw = _i_type(0x2B)
+addu = _r_type(0x21)
+subu = _r_type(0x23)
+and_ = _r_type(0x24)
+or_ = _r_type(0x25)
+slt = _r_type(0x2A)
+sltu = _r_type(0x2B)
+
+
+def lui(rt=None, imm=None):
+    return insn(op=0x0F, rs=0, rt=rt, imm=imm)
+
+
+def simm16(value):
+    """Sign-extend a captured 16-bit immediate."""
+    return value - 0x10000 if value & 0x8000 else value
+
+
+def words_view(data, start=0, end=None):
+    """uint32 view of data[start:end] (start word-aligned, end rounded down)."""
+    end = len(data) if end is None else min(end, len(data))
+    count = max(0, (end - start) // 4)
+    if count == 0:
+        return np.zeros(0, dtype='<u4')
+    return np.frombuffer(data, dtype='<u4', offset=start, count=count)
+
+
+def classify(words, rules, default=0):
+    """Code of the first rule (pattern, code) matching each word."""
+    codes = np.full(words.shape, default, dtype=np.int32)
+    undecided = np.ones(words.shape, dtype=bool)
+    for pattern, code in rules:
+        hit = undecided & pattern.test(words)
+        codes[hit] = code
+        undecided &= ~hit
+    return codes
+
+
+def _bind(pattern, w, fields, rows):
+    """(ok, new captures) of the words w extending the matches rows: a name
+    already bound (earlier term or same word) must capture the same value."""
+    ok = np.ones(w.shape, dtype=bool)
+    bound = {}
+    for name, shift, width in pattern.captures:
+        values = (w >> np.uint32(shift)) & np.uint32((1 << width) - 1)
+        if name in bound:
+            ok &= bound[name] == values
+        elif name in fields:
+            ok &= fields[name][rows] == values
+        else:
+            bound[name] = values
+    return ok, bound
+
+
+def search_words(words, query):
+    """Run a query on a uint32 array. Returns (first index, [term index
+    arrays], {capture: values}) as NumPy arrays, one entry per match.
+
+    Every gap distance is tried: a partial match is one row per (start,
+    distances) combination, and each term keeps the rows it extends, so a
+    later term or capture can still reject one distance and accept another.
+    A start may therefore give several matches, in (start, offsets) order.
+    """
+    terms = []
+    pending = Gap(0, 0)
+    for term in query:
+        if isinstance(term, Gap):
+            pending = Gap(pending.min + term.min, pending.max + term.max)
+            continue
+        terms.append((pending, term))
+        pending = Gap(0, 0)
+    if not terms:
+        raise ValueError("query has no instruction")
+
+    n = words.size
+    first = terms[0][1]
+    pos = np.flatnonzero(first.test(words))
+    ok, fields = _bind(first, words[pos], {}, pos)
+    pos = pos[ok]
+    fields = {name: values[ok] for name, values in fields.items()}
+    positions = [pos]
+
+    for gap_spec, pattern in terms[1:]:
+        rows, found, bound = [], [], []
+        for d in range(gap_spec.min, gap_spec.max + 1):
+            idx = pos + 1 + d
+            cand = np.flatnonzero(idx < n)
+            cand = cand[pattern.test(words[idx[cand]])]
+            ok, values = _bind(pattern, words[idx[cand]], fields, cand)
+            rows.append(cand[ok])
+            found.append(idx[cand[ok]])
+            bound.append({name: v[ok] for name, v in values.items()})
+        rows = np.concatenate(rows)
+        found = np.concatenate(found)
+        order = np.lexsort((found, rows))       # keep the rows in match order
+        rows, pos = rows[order], found[order]
+        positions = [p[rows] for p in positions] + [pos]
+        fields = {name: values[rows] for name, values in fields.items()}
+        for name in bound[0]:
+            fields[name] = np.concatenate([b[name] for b in bound])[order]
+
+    return positions[0], positions, fields
+
+
+def search(data, query, start=0, end=None, words=None):
+    """Find every match of query in data[start:end] (word-aligned).
+
+    `words` may be a words_view(data, start, end) shared by several
+    queries. Returns a list of Match with byte offsets into data.
+    """
+    if words is None:
+        words = words_view(data, start, end)
+    _, positions, fields = search_words(words, query)
+    offsets = [(start + 4 * p).tolist() for p in positions]
+    names = list(fields)
+    values = [fields[name].tolist() for name in names]
+    matches = []
+    for k in range(len(offsets[0]) if offsets else 0):
+        matches.append(Match(offsets[0][k], tuple(o[k] for o in offsets),
+                             {name: values[i][k] for i, name in enumerate(names)}))
+    return matches
+
+
+# ---------------------------------------------------------------------------
+# One-line text queries (CLI)
+# ---------------------------------------------------------------------------
+
+# mnemonic: (builder, argument names in assembly order)
+MNEMONICS = {
+    "addiu": (addiu, ("rt", "rs", "imm")),
+    "slti": (slti, ("rt", "rs", "imm")),
+    "sltiu": (sltiu, ("rt", "rs", "imm")),
+    "andi": (andi, ("rt", "rs", "imm")),
+    "ori": (ori, ("rt", "rs", "imm")),
+    "lui": (lui, ("rt", "imm")),
+    "addu": (addu, ("rd", "rs", "rt")),
+    "subu": (subu, ("rd", "rs", "rt")),
+    "and": (and_, ("rd", "rs", "rt")),
+    "or": (or_, ("rd", "rs", "rt")),
+    "slt": (slt, ("rd", "rs", "rt")),
+    "sltu": (sltu, ("rd", "rs", "rt")),
+    "jr": (jr, ("rs",)),
+    "jal": (jal, ("target",)),
+    "j": (j, ("target",)),
+}
+# loads/stores: "lw rt, imm(rs)"
+for _name, _builder in (("lb", lb), ("lh", lh), ("lw", lw), ("lbu", lbu),
+                        ("lhu", lhu), ("sb", sb), ("sh", sh), ("sw", sw)):
+    MNEMONICS[_name] = (_builder, ("rt", "imm", "rs"))
+
+
+def _parse_arg(text, kind):
+    text = text.strip()
+    if text == "?":
+        return None
+    if text.startswith("?"):
+        return text[1:]
+    if kind in ("rs", "rt", "rd"):
+        name = text.lstrip("$")
+        if name in REG_NUM:
+            return REG_NUM[name]
+        return int(name, 0)
+    return int(text, 0) & 0xFFFF if kind == "imm" else int(text, 0)
+
+
+def parse_query(text):
+    """Parse "addiu a1,zero,?n; ...0-4; jal 0x80024F90" into query terms."""
+    query = []
+    for part in text.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        if part == "*":
+            query.append(ANY)
+            continue
+        if part.startswith("..."):
+            lo, _, hi = part[3:].partition("-")
+            query.append(gap(int(lo), int(hi) if hi else None))
+            continue
+        if part.startswith("word "):
+            query.append(word(int(part[5:], 0)))
+            continue
+        mnemonic, _, args = part.partition(" ")
+        if mnemonic == "nop":
+            query.append(word(0))
+            continue
+        if mnemonic == "jalr":
+            regs = [_parse_arg(a, "rs") for a in args.split(",")] if args else []
+            rd, rs = (31, regs[0]) if len(regs) == 1 else (regs + [None, None])[:2]
+            query.append(jalr(rs=rs, rd=rd))
+            continue
+        if mnemonic not in MNEMONICS:
+            raise ValueError("unknown mnemonic: {}".format(mnemonic))
+        builder, kinds = MNEMONICS[mnemonic]
+        args = args.replace("(", ",").replace(")", "")
+        values = [_parse_arg(a, kind) for a, kind in zip(args.split(","), kinds)]
+        query.append(builder(**dict(zip(kinds, values))))
+    return query
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized MIPS sequence search")
+    parser.add_argument("file", help="BLAZE.ALL, SLES_008.45 or RAM dump")
+    parser.add_argument("query", help='e.g. "addiu a1,zero,?n; ...0-4; jal 0x80024F90"')
+    parser.add_argument("--start", type=lambda v: int(v, 0), default=0)
+    parser.add_argument("--end", type=lambda v: int(v, 0), default=None)
+    parser.add_argument("--base", type=lambda v: int(v, 0), default=None,
+                        help="Address of file offset 0 (print addresses)")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    data = Path(args.file).read_bytes()
+    matches = search(data, parse_query(args.query), args.start, args.end)
+    print("{} match(es)".format(len(matches)))
+    for m in matches[:args.limit]:
+        where = "0x{:08X}".format(m.offset)
+        if args.base is not None:
+            where += "  (0x{:08X})".format(args.base + m.offset)
+        fields = " ".join("{}=0x{:X}".format(k, v) for k, v in m.fields.items())
+        print("  {}  {}".format(where, fields))
+    if len(matches) > args.limit:
+        print("  ... and {} more".format(len(matches) - args.limit))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+name_scan.py
+Single-pass lookup of many null-terminated names in BLAZE.ALL.
+
+Monster entries (and most other named records) start with an ASCII name
+terminated by 0x00 inside a 16-byte field. Instead of one data.find() pass
+per name, find_names() walks the image once:
+
+  1. NumPy marks every 0x00 byte preceded by a printable character, i.e.
+     every possible end of a null-terminated string (tens of thousands of
+     candidates instead of 46 million positions);
+  2. for each candidate, the bytes just before the null are looked up in a
+     {length: set(names)} table, so every name ending there is found, even
+     when one name is a suffix of another ("Goblin" in "Lv20.Goblin").
+
+Same rules as the old per-name search in patch_monster_stats.py:
+  - the name must be followed by 0x00 within the 16-byte name field
+    (so names of 16+ characters never match);
+  - the byte before the name must not be a letter or '-' (the match would
+    be the tail of a longer name).
+
+Usage:
+  py -3 tools/name_scan.py BLAZE.ALL Name1 Name2 ...
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+NAME_FIELD = 16                  # name + terminating null fit in 16 bytes
+REJECT_PREV = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-")
+
+# Bytes that can appear in a name (printable ASCII)
+_PRINTABLE = np.zeros(256, dtype=bool)
+_PRINTABLE[0x20:0x7F] = True
+
+
+def string_ends(data, terminator=0):
+    """Offsets of every terminator byte (0x00) directly preceded by a printable byte."""
+    arr = np.frombuffer(data, dtype=np.uint8)
+    if arr.size < 2:
+        return []
+    nulls = np.flatnonzero(arr[1:] == terminator) + 1
+    return nulls[_PRINTABLE[arr[nulls - 1]]].tolist()
+
+
+def find_names(data, names, field_size=NAME_FIELD, reject_prev=REJECT_PREV,
+               terminator=0):
+    """Return {name: [offsets]} for every null-terminated occurrence.
+
+    names: iterable of str (ASCII). Offsets are sorted, names that are not
+    found map to an empty list. terminator: byte that must follow the name
+    (0x00, or e.g. ord('/') for "Name/Description" texts).
+    """
+    by_length = {}
+    index = {}
+    for name in names:
+        index[name] = []
+        try:
+            raw = name.encode("ascii")
+        except UnicodeEncodeError:
+            continue
+        if 0 < len(raw) < field_size:
+            by_length.setdefault(len(raw), {})[raw] = name
+    if not by_length:
+        return index
+
+    lengths = sorted(by_length)
+    longest = lengths[-1]
+    for end in string_ends(data, terminator):
+        tail = bytes(data[max(0, end - longest):end])
+        for length in lengths:
+            if length > len(tail):
+                break
+            name = by_length[length].get(tail[-length:])
+            if name is None:
+                continue
+            pos = end - length
+            if pos > 0 and data[pos - 1] in reject_prev:
+                continue
+            index[name].append(pos)
+    return index
+
+
+def find_fields(data, names, field_size=NAME_FIELD):
+    """Return {name: [offsets]} of exact name fields: the name followed by
+    0x00 up to the end of the field (no other rule on the byte before).
+
+    Same matches as searching name.ljust(field_size, b'\\x00') with
+    data.find(); names of field_size+ chars never match.
+    """
+    found = find_names(data, names, field_size, reject_prev=frozenset())
+    index = {}
+    for name, offsets in found.items():
+        size = len(name.encode('ascii', 'replace'))
+        padding = bytes(field_size - size) if size < field_size else None
+        index[name] = [pos for pos in offsets
+                       if data[pos + size:pos + field_size] == padding]
+    return index
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: py -3 tools/name_scan.py <BLAZE.ALL> <name> [name ...]")
+        return 1
+    data = Path(sys.argv[1]).read_bytes()
+    for name, offsets in find_names(data, sys.argv[2:]).items():
+        print("{:<20} {}".format(name, " ".join("0x{:08X}".format(o) for o in offsets)
+                                 or "(not found)"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+patch_journal.py
+Journaled BLAZE.ALL buffer: records every write made by the build stages.
+
+JournaledBuffer is a bytearray, so patchers keep using data[a:b] = ... and
+data[i] = v as before. Each write is recorded in a PatchJournal as
+(offset, old bytes, new bytes, stage, source), where `stage` is the build
+stage name (set by build_gameplay_patch.py) and `source` the config entry
+being applied (set by the patcher with `with tagged(data, "..."):`).
+
+Writes are trimmed to the bytes that actually changed, and adjacent or
+overlapping writes from the same (stage, source) are coalesced into one
+range. The journal is saved as JSON next to the build output so later steps
+(BIN injection, patch export, incremental rebuild) work from this compact
+change list instead of diffing two 46 MB images.
+
+Note: struct.pack_into() writes through the buffer protocol and is NOT seen
+by the journal; patchers write packed values with slice assignment instead
+(data[off:off+2] = struct.pack('<H', v)). find_untracked() catches any write
+that still bypasses the journal.
+
+Usage:
+  py -3 tools/patch_journal.py output/BLAZE.ALL.journal.json   Summary
+"""
+
+import hashlib
+import json
+import sys
+from contextlib import contextmanager, nullcontext
+
+SECTOR_SIZE = 2048
+JOURNAL_VERSION = 1
+UNTRACKED = "<untracked>"
+
+
+class PatchRange:
+    """One coalesced journal entry."""
+
+    __slots__ = ("offset", "old", "new", "stage", "source")
+
+    def __init__(self, offset, old, new, stage=None, source=None):
+        self.offset = offset
+        self.old = bytearray(old)
+        self.new = bytearray(new)
+        self.stage = stage
+        self.source = source
+
+    @property
+    def end(self):
+        return self.offset + len(self.new)
+
+    def merge(self, offset, old, new):
+        """Merge an overlapping/adjacent write into this range."""
+        start = min(self.offset, offset)
+        end = max(self.end, offset + len(new))
+        merged_old = bytearray(end - start)
+        merged_new = bytearray(end - start)
+        # Old bytes: the first recorded value wins (this range, then the write)
+        merged_old[offset - start:offset - start + len(old)] = old
+        merged_old[self.offset - start:self.end - start] = self.old
+        # New bytes: the latest write wins
+        merged_new[self.offset - start:self.end - start] = self.new
+        merged_new[offset - start:offset - start + len(new)] = new
+        self.offset = start
+        self.old = merged_old
+        self.new = merged_new
+
+    def to_dict(self):
+        return {
+            "offset": self.offset,
+            "stage": self.stage,
+            "source": self.source,
+            "old": self.old.hex(),
+            "new": self.new.hex(),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["offset"], bytes.fromhex(d["old"]), bytes.fromhex(d["new"]),
+                   d.get("stage"), d.get("source"))
+
+    def __repr__(self):
+        return "PatchRange(0x{:08X}+{}, {}/{})".format(
+            self.offset, len(self.new), self.stage, self.source)
+
+
+class PatchJournal:
+    """Ordered list of PatchRange, plus the current (stage, source) tag."""
+
+    def __init__(self):
+        self.ranges = []
+        self.stage = None
+        self.source = None
+
+    def record(self, offset, old, new):
+        """Record one write. Unchanged leading/trailing bytes are dropped."""
+        if old == new:
+            return
+        n = len(new)
+        lo = 0
+        while lo < n and old[lo] == new[lo]:
+            lo += 1
+        hi = n
+        while hi > lo and old[hi - 1] == new[hi - 1]:
+            hi -= 1
+        offset += lo
+        old = old[lo:hi]
+        new = new[lo:hi]
+
+        if self.ranges:
+            last = self.ranges[-1]
+            if (last.stage == self.stage and last.source == self.source
+                    and offset <= last.end and last.offset <= offset + len(new)):
+                last.merge(offset, old, new)
+                return
+        self.ranges.append(PatchRange(offset, old, new, self.stage, self.source))
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def __iter__(self):
+        return iter(self.ranges)
+
+    def changed_bytes(self):
+        return sum(len(r.new) for r in self.ranges)
+
+    def sectors(self, sector_size=SECTOR_SIZE):
+        """Sorted list of the sector indices touched by the journal."""
+        sectors = set()
+        for r in self.ranges:
+            sectors.update(range(r.offset // sector_size,
+                                 (r.end - 1) // sector_size + 1))
+        return sorted(sectors)
+
+    def by_stage(self):
+        """{stage: (ranges, bytes)} summary, in first-write order."""
+        summary = {}
+        for r in self.ranges:
+            n, size = summary.get(r.stage, (0, 0))
+            summary[r.stage] = (n + 1, size + len(r.new))
+        return summary
+
+    def conflicts(self):
+        """Pairs (earlier, later) of ranges from different (stage, source)
+        that write the same bytes - the later one wins."""
+        order = {id(r): i for i, r in enumerate(self.ranges)}
+        ordered = sorted(self.ranges, key=lambda r: r.offset)
+        found = []
+        active = []
+        for r in ordered:
+            active = [a for a in active if a.end > r.offset]
+            for a in active:
+                if (a.stage, a.source) != (r.stage, r.source):
+                    pair = (a, r) if order[id(a)] < order[id(r)] else (r, a)
+                    found.append(pair)
+            active.append(r)
+        return found
+
+    def apply(self, data):
+        """Replay the journal onto data (in write order)."""
+        for r in self.ranges:
+            data[r.offset:r.end] = r.new
+
+    def revert(self, data):
+        """Undo the journal on data (reverse order)."""
+        for r in reversed(self.ranges):
+            data[r.offset:r.end] = r.old
+
+    def to_dict(self, base=None, result=None):
+        d = {"version": JOURNAL_VERSION}
+        if base is not None:
+            d["size"] = len(base)
+            d["base_sha1"] = hashlib.sha1(base).hexdigest()
+        if result is not None:
+            d["result_sha1"] = hashlib.sha1(result).hexdigest()
+        d["changed_bytes"] = self.changed_bytes()
+        d["sectors"] = self.sectors()
+        d["ranges"] = [r.to_dict() for r in self.ranges]
+        return d
+
+    def save(self, path, base=None, result=None):
+        """Write the journal as JSON. base/result add image hashes."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(base, result), f, indent=1)
+
+    @classmethod
+    def from_dict(cls, d):
+        if d.get("version") != JOURNAL_VERSION:
+            raise ValueError("unsupported journal version {}".format(d.get("version")))
+        journal = cls()
+        journal.ranges = [PatchRange.from_dict(r) for r in d["ranges"]]
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+class JournaledBuffer(bytearray):
+    """bytearray that records every item/slice assignment in a PatchJournal."""
+
+    def __init__(self, data=b"", journal=None):
+        super().__init__(data)
+        self.journal = journal if journal is not None else PatchJournal()
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("JournaledBuffer does not support extended slices")
+            stop = max(start, stop)
+            if len(value) != stop - start:
+                raise ValueError("JournaledBuffer writes must not resize the buffer")
+            old = bytes(bytearray.__getitem__(self, slice(start, stop)))
+            bytearray.__setitem__(self, key, value)
+            new = bytes(bytearray.__getitem__(self, slice(start, stop)))
+        else:
+            index = key + len(self) if key < 0 else key
+            old = bytes((bytearray.__getitem__(self, index),))
+            bytearray.__setitem__(self, key, value)
+            new = bytes((bytearray.__getitem__(self, index),))
+            start = index
+        self.journal.record(start, old, new)
+
+    def replay(self, journal):
+        """Apply another journal's ranges, keeping their stage/source tags.
+
+        Every range's old bytes must match the buffer (as left by the ranges
+        before it). On the first mismatch the ranges already applied are
+        undone and False is returned, with nothing recorded.
+        """
+        applied = []
+        for r in journal:
+            if bytearray.__getitem__(self, slice(r.offset, r.end)) != r.old:
+                for a in reversed(applied):
+                    bytearray.__setitem__(self, slice(a.offset, a.end), a.old)
+                return False
+            bytearray.__setitem__(self, slice(r.offset, r.end), r.new)
+            applied.append(r)
+
+        saved = (self.journal.stage, self.journal.source)
+        for r in applied:
+            self.journal.stage, self.journal.source = r.stage, r.source
+            self.journal.record(r.offset, bytes(r.old), bytes(r.new))
+        self.journal.stage, self.journal.source = saved
+        return True
+
+    @contextmanager
+    def tagged(self, source):
+        """Tag the writes made inside the block with a config-entry label."""
+        previous = self.journal.source
+        self.journal.source = source
+        try:
+            yield self
+        finally:
+            self.journal.source = previous
+
+
+def tagged(data, source):
+    """`with tagged(data, "entry"):` - no-op for plain bytearrays."""
+    if isinstance(data, JournaledBuffer):
+        return data.tagged(source)
+    return nullcontext(data)
+
+
+def find_untracked(journal, base, data):
+    """Record differences between replay(base) and data as UNTRACKED ranges.
+
+    Catches writes that bypassed the journal (struct.pack_into, memoryview,
+    NumPy views). They are tagged with the journal's current stage.
+    Returns the number of untracked ranges added.
+    """
+    import numpy as np
+
+    replay = bytearray(base)
+    journal.apply(replay)
+    a = np.frombuffer(replay, dtype=np.uint8)
+    b = np.frombuffer(data, dtype=np.uint8)
+    diff = np.flatnonzero(a != b)
+    if diff.size == 0:
+        return 0
+
+    # Split the differing positions into contiguous runs
+    breaks = np.flatnonzero(np.diff(diff) != 1) + 1
+    starts = diff[np.concatenate(([0], breaks))]
+    ends = diff[np.concatenate((breaks - 1, [diff.size - 1]))] + 1
+
+    saved = journal.source
+    journal.source = UNTRACKED
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        journal.record(start, bytes(replay[start:end]), bytes(data[start:end]))
+    journal.source = saved
+    return len(starts)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: py -3 tools/patch_journal.py <journal.json>")
+        return 1
+    journal = PatchJournal.load(sys.argv[1])
+    print("=" * 60)
+    print("  Patch journal: {}".format(sys.argv[1]))
+    print("=" * 60)
+    print("  Ranges: {}  Bytes: {:,}  Sectors: {}".format(
+        len(journal), journal.changed_bytes(), len(journal.sectors())))
+    print()
+    for stage, (n, size) in journal.by_stage().items():
+        print("  {:<20} {:>6} ranges {:>9,} bytes".format(str(stage), n, size))
+    conflicts = journal.conflicts()
+    if conflicts:
+        print()
+        print("  {} overlapping write(s):".format(len(conflicts)))
+        for a, b in conflicts[:20]:
+            print("    0x{:08X} {}/{} <-> {}/{}".format(
+                max(a.offset, b.offset), a.stage, a.source, b.stage, b.source))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+ram_diff.py
+Diff of 2 MB RAM snapshots (tools/dump_ram.lua dumps, savestates).
+
+dump_ram.lua writes output/ram_before.bin and output/ram_after.bin around an
+area load; this compares them (or any sequence of snapshots, pairwise) in a
+few milliseconds with NumPy:
+
+  1. pages: RAM is compared 8 bytes at a time and split into 4 KB pages,
+     only the pages with a difference are diffed byte by byte;
+  2. regions: changed bytes closer than --gap bytes are merged;
+  3. kind: a change inside one aligned halfword / word is a u8 / u16 / u32
+     value change, or a "pointer" when the old and new words are RAM
+     pointers (0x80000000-0x801FFFFF) or NULL; longer regions are "block"s,
+     or "pointers" when every changed word is a pointer (relocated table);
+  4. known: regions are labelled with the nearest RAM address of
+     Scripts/breakpoint_helper.py ADDRESSES below them (entity array,
+     player blocks...) and the struct field when the offset is a known one.
+
+The report is ranked by changed bytes (--sort addr for address order).
+
+    from ram_diff import diff
+    for r in diff(before, after):
+        print(hex(r.start), r.kind, r.known)
+
+Usage:
+  py -3 tools/ram_diff.py [SNAPSHOT SNAPSHOT ...] [--gap 8] [--limit 40] [--sort addr]
+  (default: output/ram_before.bin output/ram_after.bin)
+"""
+
+import argparse
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+import savestate
+
+TOOLS_DIR = Path(__file__).parent
+PROJECT_ROOT = TOOLS_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT / "Scripts"))
+from breakpoint_helper import ADDRESSES, ENTITY_OFFSETS, PLAYER_OFFSETS
+
+DEFAULT_DUMPS = [PROJECT_ROOT / "output" / "ram_before.bin",
+                 PROJECT_ROOT / "output" / "ram_after.bin"]
+
+RAM_BASE = 0x80000000
+RAM_END = RAM_BASE + savestate.RAM_SIZE
+PAGE_SIZE = 0x1000
+DEFAULT_GAP = 8
+KNOWN_SPAN = 0x2000              # label distance limit (player blocks are 0x2000 apart)
+
+# Known RAM addresses (the BLAZE.ALL offsets of ADDRESSES are skipped)
+KNOWN = sorted((addr, name) for name, addr in ADDRESSES.items()
+               if RAM_BASE <= addr < RAM_END)
+KNOWN_ADDRS = np.array([addr for addr, _ in KNOWN], dtype=np.int64)
+FIELDS = {"entity_array": ENTITY_OFFSETS,
+          "player_0_block": PLAYER_OFFSETS,
+          "player_1_block": PLAYER_OFFSETS}
+
+Region = namedtuple("Region", "start end changed kind old new pointers known")
+
+
+def ram_array(snapshot):
+    """uint8 view of a snapshot (path, SaveState or bytes-like)."""
+    if isinstance(snapshot, (str, Path)):
+        snapshot = savestate.load(snapshot)
+    if isinstance(snapshot, savestate.SaveState):
+        snapshot = snapshot.ram
+    arr = np.frombuffer(snapshot, dtype=np.uint8)
+    if arr.size != savestate.RAM_SIZE:
+        raise ValueError("RAM snapshot must be {} bytes, got {}".format(
+            savestate.RAM_SIZE, arr.size))
+    return arr
+
+
+def changed_bytes(a, b):
+    """Sorted offsets of the bytes that differ, diffing only changed pages."""
+    words_a, words_b = a.view('<u8'), b.view('<u8')
+    pages = np.flatnonzero((words_a != words_b).reshape(-1, PAGE_SIZE // 8).any(axis=1))
+    offsets = [p * PAGE_SIZE + np.flatnonzero(a[p * PAGE_SIZE:(p + 1) * PAGE_SIZE]
+                                              != b[p * PAGE_SIZE:(p + 1) * PAGE_SIZE])
+               for p in pages.tolist()]
+    return np.concatenate(offsets) if offsets else np.zeros(0, dtype=np.int64)
+
+
+def group(offsets, gap=DEFAULT_GAP):
+    """(start, end, changed bytes) runs of offsets, merged across <= gap bytes."""
+    if offsets.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(offsets) > gap + 1)
+    first = np.concatenate(([0], breaks + 1))
+    last = np.concatenate((breaks, [offsets.size - 1]))
+    return list(zip(offsets[first].tolist(), (offsets[last] + 1).tolist(),
+                    (last - first + 1).tolist()))
+
+
+def is_pointer(values):
+    return (values >= RAM_BASE) & (values < RAM_END)
+
+
+def _pointer_or_null(values):
+    return is_pointer(values) | (values == 0)
+
+
+def known_label(addr):
+    """'name+0xOFF (field)' of the nearest known structure below addr, or ''."""
+    k = int(np.searchsorted(KNOWN_ADDRS, addr, side="right")) - 1
+    if k < 0:
+        return ""
+    base, name = KNOWN[k]
+    off = addr - base
+    if off >= KNOWN_SPAN:
+        return ""
+    field = {v: f for f, v in FIELDS.get(name, {}).items()}.get(off)
+    return "{}+0x{:X}".format(name, off) + (" ({})".format(field) if field else "")
+
+
+def classify(a, b, start, end):
+    """(kind, old, new, pointer words) of the changed range [start, end)."""
+    w0, w1 = start & ~3, (end + 3) & ~3
+    old = a[w0:w1].view('<u4')
+    new = b[w0:w1].view('<u4')
+    changed = old != new
+    pointers = int(np.count_nonzero(changed & (is_pointer(old) | is_pointer(new))))
+
+    if w1 - w0 == 4:
+        o, n = int(old[0]), int(new[0])
+        if pointers and _pointer_or_null(old).all() and _pointer_or_null(new).all():
+            return "pointer", o, n, pointers
+        if start // 2 == (end - 1) // 2:
+            if end - start == 1:
+                return "u8", int(a[start]), int(b[start]), 0
+            h = start & ~1
+            return "u16", int(a[h:h + 2].view('<u2')[0]), int(b[h:h + 2].view('<u2')[0]), 0
+        return "u32", o, n, 0
+
+    if pointers and pointers == np.count_nonzero(changed) \
+            and _pointer_or_null(old[changed]).all() and _pointer_or_null(new[changed]).all():
+        return "pointers", None, None, pointers
+    return "block", None, None, pointers
+
+
+def diff(before, after, gap=DEFAULT_GAP):
+    """Regions that differ between two snapshots, in address order."""
+    a, b = ram_array(before), ram_array(after)
+    regions = []
+    for start, end, changed in group(changed_bytes(a, b), gap):
+        kind, old, new, pointers = classify(a, b, start, end)
+        regions.append(Region(RAM_BASE + start, RAM_BASE + end, changed, kind,
+                              old, new, pointers, known_label(RAM_BASE + start)))
+    return regions
+
+
+def rank(regions):
+    return sorted(regions, key=lambda r: (-r.changed, r.start))
+
+
+def format_region(r):
+    if r.old is not None:
+        width = {"u8": 2, "u16": 4}.get(r.kind, 8)
+        values = "0x{:0{w}X} -> 0x{:0{w}X}".format(r.old, r.new, w=width)
+    elif r.pointers:
+        values = "{} pointer word(s)".format(r.pointers)
+    else:
+        values = ""
+    return "0x{:08X}  {:>7}  {:>6}  {:<8}  {:<26}  {}".format(
+        r.start, "0x{:X}".format(r.end - r.start), r.changed, r.kind, values, r.known)
+
+
+def report(regions, limit=40, by_addr=False):
+    kinds = {}
+    for r in regions:
+        kinds[r.kind] = kinds.get(r.kind, 0) + 1
+    print("  {} region(s), {:,} bytes changed  ({})".format(
+        len(regions), sum(r.changed for r in regions),
+        ", ".join("{} {}".format(n, k) for k, n in sorted(kinds.items()))))
+    shown = (regions if by_addr else rank(regions))[:limit]
+    if shown:
+        print("  {:<4}  {:<10}  {:>7}  {:>6}  {:<8}  {:<26}  {}".format(
+            "#", "Address", "Size", "Bytes", "Kind", "Values", "Known"))
+    for i, r in enumerate(shown, 1):
+        print("  {:<4}  {}".format(i, format_region(r)))
+    if len(regions) > len(shown):
+        print("  ... and {} more".format(len(regions) - len(shown)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff of RAM snapshots")
+    parser.add_argument("snapshots", nargs="*", default=DEFAULT_DUMPS,
+                        help="RAM dumps / savestates, diffed pairwise in order")
+    parser.add_argument("--gap", type=int, default=DEFAULT_GAP,
+                        help="Merge changes closer than this many bytes")
+    parser.add_argument("--limit", type=int, default=40)
+    parser.add_argument("--sort", choices=("rank", "addr"), default="rank")
+    args = parser.parse_args()
+
+    if len(args.snapshots) < 2:
+        parser.error("need at least two snapshots")
+    for path in args.snapshots:
+        if not Path(path).exists():
+            print("[ERROR] Snapshot not found: {}".format(path))
+            return 1
+
+    for before, after in zip(args.snapshots, args.snapshots[1:]):
+        print("=" * 70)
+        print("  {} -> {}".format(Path(before).name, Path(after).name))
+        print("=" * 70)
+        report(diff(before, after, args.gap), args.limit, args.sort == "addr")
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
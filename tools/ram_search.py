@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+ram_search.py
+Vectorized RAM value search over one or more savestates ("cheat search").
+
+Finding a RAM variable (the chest timer...) used to mean a Python loop of
+struct.unpack_from over the 2 MB for each value, then comparing the hits of
+several savestates by hand. Here RAM is a NumPy view of u8/u16/s16/u32
+elements and the candidates are a bitset (one bool per element): every
+snapshot adds a condition and the bitset is ANDed with its result.
+
+    from ram_search import RamSearch
+    s = RamSearch("u16")
+    s.add("chest_0.000", "== 1000")       # timer just started
+    s.add("chest_1.000", "dec")           # ... then decreasing
+    s.add("chest_2.000", "dec, > 500")
+    s.add("chest_3.000", "same")          # game paused
+    for addr, values in s.results():      # values in each snapshot
+        ...
+
+Conditions (comma-separated, all must hold):
+  == N  != N  < N  <= N  > N  >= N  N..M   value in this snapshot
+  same / changed                           vs the previous snapshot
+  inc / dec                                increased / decreased
+  inc N / dec N                            changed by exactly +N / -N
+  any                                      no condition (just record)
+
+Elements are aligned to their size (the R3000 has no unaligned loads);
+addresses are KSEG0 (0x80000000 + offset). Snapshots are savestates
+(tools/savestate.py: ePSXe, DuckStation, RAM dumps) or bytes-like RAM.
+
+find_values(ram, values, "u16") is the one-snapshot multi-value search:
+{value: [addresses]}.
+
+Usage:
+  py -3 tools/ram_search.py [--type u16] [--limit 50]
+                            --step SAVESTATE "== 1000" --step SAVESTATE "dec" ...
+"""
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+
+import savestate
+
+RAM_BASE = 0x80000000
+
+TYPES = {"u8": "<u1", "u16": "<u2", "s16": "<i2", "u32": "<u4"}
+
+_COMPARE = {
+    "==": np.equal, "!=": np.not_equal,
+    "<": np.less, "<=": np.less_equal,
+    ">": np.greater, ">=": np.greater_equal,
+}
+_NUM = r"(-?(?:0x[0-9a-fA-F]+|\d+))"
+_TERMS = [
+    (re.compile(r"^(==|!=|<=|>=|<|>)\s*" + _NUM + "$"), "compare"),
+    (re.compile(r"^" + _NUM + r"\s*\.\.\s*" + _NUM + "$"), "range"),
+    (re.compile(r"^(inc|dec)\s+" + _NUM + "$"), "delta"),
+    (re.compile(r"^(same|changed|inc|dec|any)$"), "relation"),
+]
+
+
+def ram_bytes(snapshot):
+    """RAM of a snapshot: savestate path, SaveState or bytes-like."""
+    if isinstance(snapshot, (str, Path)):
+        return savestate.load(snapshot).ram
+    if isinstance(snapshot, savestate.SaveState):
+        return snapshot.ram
+    return snapshot
+
+
+def view(ram, dtype="u16"):
+    """NumPy view of RAM as aligned dtype elements (no copy)."""
+    dt = np.dtype(TYPES[dtype])
+    ram = ram_bytes(ram)
+    return np.frombuffer(ram, dtype=dt, count=len(ram) // dt.itemsize)
+
+
+def find_values(ram, values, dtype="u16", start=0, end=None):
+    """{value: [addresses]} of every aligned element of ram[start:end] equal
+    to one of values (one pass per value over the whole array)."""
+    arr = view(ram, dtype)
+    size = arr.itemsize
+    first = -(-start // size)
+    last = (len(arr) * size if end is None else end) // size
+    arr = arr[first:last]
+    result = {}
+    for value in values:
+        hits = np.flatnonzero(arr == value)
+        result[value] = [RAM_BASE + (first + int(i)) * size for i in hits]
+    return result
+
+
+def parse_condition(text):
+    """List of (kind, args) terms of a condition string."""
+    terms = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        for pattern, kind in _TERMS:
+            m = pattern.match(part)
+            if m:
+                terms.append((kind, m.groups()))
+                break
+        else:
+            raise ValueError("bad condition: {!r}".format(part))
+    return terms
+
+
+class RamSearch:
+    """Candidate bitset narrowed over an ordered sequence of snapshots."""
+
+    def __init__(self, dtype="u16"):
+        if dtype not in TYPES:
+            raise ValueError("type must be one of {}".format(", ".join(TYPES)))
+        self.dtype = dtype
+        self.size = np.dtype(TYPES[dtype]).itemsize
+        self.snapshots = []          # element views, one per snapshot
+        self.mask = None             # bool per element: still a candidate
+        self.counts = []             # candidates left after each step
+
+    def __len__(self):
+        return 0 if self.mask is None else int(np.count_nonzero(self.mask))
+
+    def add(self, snapshot, condition="any"):
+        """Add the next snapshot, keep the candidates matching condition.
+        Returns the number of candidates left."""
+        cur = view(snapshot, self.dtype)
+        if self.mask is None:
+            self.mask = np.ones(len(cur), dtype=bool)
+        elif len(cur) != len(self.mask):
+            raise ValueError("snapshots differ in size")
+        prev = self.snapshots[-1] if self.snapshots else None
+
+        keep = np.ones(len(cur), dtype=bool)
+        for kind, args in parse_condition(condition):
+            keep &= self._test(kind, args, cur, prev)
+        self.mask &= keep
+        self.snapshots.append(cur)
+        self.counts.append(len(self))
+        return self.counts[-1]
+
+    def _test(self, kind, args, cur, prev):
+        if kind == "compare":
+            return _COMPARE[args[0]](cur, int(args[1], 0))
+        if kind == "range":
+            return (cur >= int(args[0], 0)) & (cur <= int(args[1], 0))
+        if kind == "relation" and args[0] == "any":
+            return np.ones(len(cur), dtype=bool)
+
+        if prev is None:
+            raise ValueError("'{}' needs a previous snapshot".format(" ".join(args)))
+        if kind == "relation":
+            op = args[0]
+            if op == "same":
+                return cur == prev
+            if op == "changed":
+                return cur != prev
+            return cur > prev if op == "inc" else cur < prev
+        # Exact delta, computed in int64 so u16 0 -> 65535 is not "dec 1"
+        step = int(args[1], 0)
+        delta = cur.astype(np.int64) - prev.astype(np.int64)
+        return delta == (step if args[0] == "inc" else -step)
+
+    def addresses(self):
+        return [RAM_BASE + int(i) * self.size for i in np.flatnonzero(self.mask)]
+
+    def results(self, limit=None):
+        """[(address, [value in each snapshot])] of the candidates."""
+        idx = np.flatnonzero(self.mask)[:limit]
+        history = np.stack([s[idx] for s in self.snapshots], axis=1) if len(idx) else []
+        return [(RAM_BASE + int(i) * self.size, [int(v) for v in row])
+                for i, row in zip(idx, history)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAM value search over savestates")
+    parser.add_argument("--type", default="u16", choices=sorted(TYPES))
+    parser.add_argument("--step", nargs=2, action="append", required=True,
+                        metavar=("SAVESTATE", "CONDITION"),
+                        help='e.g. --step a.000 "== 1000" --step b.000 "dec"')
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    search = RamSearch(args.type)
+    for path, condition in args.step:
+        left = search.add(path, condition)
+        print("{:<40} {:<20} {:>9,} candidates".format(Path(path).name, condition, left))
+
+    results = search.results(args.limit)
+    print()
+    for addr, values in results:
+        print("  0x{:08X}  {}".format(addr, " -> ".join(str(v) for v in values)))
+    if len(search) > len(results):
+        print("  ... and {} more".format(len(search) - len(results)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+savestate.py
+PSX RAM / scratchpad / VRAM of an emulator savestate, extracted once.
+
+The research scripts each gunzipped the ePSXe savestate on every run,
+sliced RAM at 0x1BA and indexed it with addr - 0x80000000. This module does
+it once per savestate:
+
+    from savestate import load
+    state = load(SAVESTATE)
+    state.u32(0x800F4A20)                   # any segment: 0x80/0xA0/0x00...
+    state.read(0x80010000, 8)
+    state.ram                               # 2 MB bytes-like (mmap)
+    state.words()                           # NumPy <u4 view of RAM
+    state.vram                              # (512, 1024) uint16 or None
+
+Formats (detected from the content, not the extension):
+  - ePSXe (*.000, *.gpz)   gzip; RAM at 0x1BA, scratchpad right after it,
+                            VRAM at 0x2733DF
+  - DuckStation (*.sav)    "DUCC" header, deflate or zstd (`zstandard`
+                            module) data; RAM found by the BIOS exception
+                            vector the kernel writes at RAM 0x80
+  - RAM dump               exactly 2 MB (tools/dump_ram.lua, PCSX-Redux)
+
+Compressed states are decompressed once into a cache file keyed by the
+savestate's SHA-1 (output/savestate_cache/<sha1>.bin + .json). Later runs
+memory-map the cache, so they start at once and share pages with the OS
+cache instead of holding private copies. RAM dumps are mapped directly.
+
+Usage:
+  py -3 tools/savestate.py SAVESTATE [ADDR [LENGTH]]   Format, sections, hex dump
+"""
+
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+TOOLS_DIR = Path(__file__).parent
+PROJECT_ROOT = TOOLS_DIR.parent
+CACHE_DIR = PROJECT_ROOT / "output" / "savestate_cache"
+
+CACHE_VERSION = 1
+MAX_CACHED = 8                   # older cache files are deleted
+SECTION_ALIGN = 0x10000          # mmap offsets: Windows allocation granularity
+
+RAM_SIZE = 0x200000              # 2 MB main RAM
+SCRATCH_SIZE = 0x400             # 1 KB scratchpad (0x1F800000)
+SCRATCH_BASE = 0x1F800000
+VRAM_WIDTH, VRAM_HEIGHT = 1024, 512
+VRAM_SIZE = VRAM_WIDTH * VRAM_HEIGHT * 2
+
+GZIP_MAGIC = b'\x1f\x8b'
+EPSXE_MAGIC = b'ePSXe'
+EPSXE_RAM_OFF = 0x1BA
+EPSXE_SCRATCH_OFF = EPSXE_RAM_OFF + RAM_SIZE
+EPSXE_VRAM_OFF = 0x2733DF
+
+DUCK_MAGIC = b'DUCC'             # SAVE_STATE_MAGIC 0x43435544, little-endian
+DUCK_PREFIX = struct.Struct("<4sI128s32s")       # magic, version, title, serial
+# u32 fields between the serial and the data block fields (compression type,
+# compressed size, uncompressed size, offset):
+#   < 69: media filename len/offset, subimage, playlist offset,
+#         screenshot w/h/size/offset
+#  >= 69: media filename len/offset, subimage, screenshot compression type,
+#         compressed size, w/h, uncompressed size, offset
+DUCK_SCREENSHOT_COMPRESSION_VERSION = 69
+DUCK_LAYOUTS = {"old": 8, "new": 9}
+DUCK_DATA = struct.Struct("<4I")
+DUCK_COMPRESSION = {0: "none", 1: "deflate", 2: "zstd"}
+
+# lui k0,0; addiu k0,k0,0x0C80; jr k0; nop - installed by the BIOS at RAM 0x80
+EXCEPTION_VECTOR = struct.pack("<4I", 0x3C1A0000, 0x275A0C80, 0x03400008, 0)
+EXCEPTION_VECTOR_ADDR = 0x80
+
+
+def ram_index(addr):
+    """Offset in the 2 MB RAM of a KUSEG/KSEG0/KSEG1 address (or offset)."""
+    return addr & (RAM_SIZE - 1)
+
+
+# ---------------------------------------------------------------------------
+# Format decoding
+# ---------------------------------------------------------------------------
+
+def detect_format(head, size):
+    """'epsxe', 'duckstation' or 'raw' from the first bytes of a file."""
+    if head.startswith(GZIP_MAGIC):
+        return "epsxe"
+    if head.startswith(DUCK_MAGIC):
+        return "duckstation"
+    if size == RAM_SIZE:
+        return "raw"
+    raise ValueError("unknown savestate format (not ePSXe, DuckStation or a 2 MB RAM dump)")
+
+
+def _find_ram(data):
+    """Offset of the RAM image in decompressed state data."""
+    pos = data.find(EXCEPTION_VECTOR)
+    while pos >= 0:
+        start = pos - EXCEPTION_VECTOR_ADDR
+        if start >= 0 and start + RAM_SIZE <= len(data):
+            return start
+        pos = data.find(EXCEPTION_VECTOR, pos + 1)
+    raise ValueError("RAM image not found in the savestate data")
+
+
+def _decode_epsxe(raw):
+    data = gzip.decompress(raw)
+    if not data.startswith(EPSXE_MAGIC):
+        raise ValueError("gzip file is not an ePSXe savestate")
+    if len(data) < EPSXE_RAM_OFF + RAM_SIZE:
+        raise ValueError(f"ePSXe savestate too small: {len(data)} bytes")
+    sections = {"ram": data[EPSXE_RAM_OFF:EPSXE_RAM_OFF + RAM_SIZE],
+                "scratchpad": data[EPSXE_SCRATCH_OFF:EPSXE_SCRATCH_OFF + SCRATCH_SIZE]}
+    if len(data) >= EPSXE_VRAM_OFF + VRAM_SIZE:
+        sections["vram"] = data[EPSXE_VRAM_OFF:EPSXE_VRAM_OFF + VRAM_SIZE]
+    return sections
+
+
+def duck_data_fields(raw):
+    """(compression, compressed size, uncompressed size, data offset) of a
+    DuckStation header. The layout is picked from the version; the other one
+    is tried when the data block it gives falls outside the file."""
+    if len(raw) < DUCK_PREFIX.size:
+        raise ValueError("DuckStation savestate header truncated")
+    version = DUCK_PREFIX.unpack_from(raw)[1]
+    order = ["new", "old"] if version >= DUCK_SCREENSHOT_COMPRESSION_VERSION else ["old", "new"]
+    for layout in order:
+        header_size = DUCK_PREFIX.size + 4 * DUCK_LAYOUTS[layout] + DUCK_DATA.size
+        if len(raw) < header_size:
+            continue
+        fields = DUCK_DATA.unpack_from(raw, header_size - DUCK_DATA.size)
+        compression, compressed_size, _, data_off = fields
+        if (compression in DUCK_COMPRESSION and data_off >= header_size
+                and data_off + compressed_size <= len(raw)):
+            return fields
+    raise ValueError(f"DuckStation savestate version {version}: unknown header layout")
+
+
+def _decode_duckstation(raw):
+    compression, compressed_size, uncompressed_size, data_off = duck_data_fields(raw)
+    block = raw[data_off:data_off + compressed_size]
+    kind = DUCK_COMPRESSION.get(compression)
+    if kind == "none":
+        data = block
+    elif kind == "deflate":
+        try:
+            data = zlib.decompress(block)
+        except zlib.error:
+            data = zlib.decompress(block, -15)          # raw deflate stream
+    elif kind == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd savestate: py -3 -m pip install zstandard") from None
+        data = zstandard.ZstdDecompressor().decompress(block, max_output_size=uncompressed_size)
+    else:
+        raise ValueError(f"DuckStation savestate: unknown compression {compression}")
+    start = _find_ram(data)
+    return {"ram": data[start:start + RAM_SIZE]}
+
+
+DECODERS = {"epsxe": _decode_epsxe, "duckstation": _decode_duckstation}
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+def _cached_sections(path, fmt, cache_dir):
+    """(cache file, {name: (offset, size)}) of a compressed savestate,
+    decoding it on the first run."""
+    raw = Path(path).read_bytes()
+    sha1 = hashlib.sha1(raw).hexdigest()
+    cache_dir = Path(cache_dir)
+    bin_path = cache_dir / f"{sha1}.bin"
+    meta_path = cache_dir / f"{sha1}.json"
+
+    if bin_path.exists() and meta_path.exists():
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("version") == CACHE_VERSION and meta.get("format") == fmt:
+                return bin_path, {k: tuple(v) for k, v in meta["sections"].items()}
+        except (OSError, ValueError, KeyError):
+            pass
+
+    sections = DECODERS[fmt](raw)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    layout = {}
+    tmp = bin_path.with_suffix(".tmp")
+    with open(tmp, 'wb') as f:
+        for name, data in sections.items():
+            f.write(b'\x00' * (-f.tell() % SECTION_ALIGN))
+            layout[name] = (f.tell(), len(data))
+            f.write(data)
+    os.replace(tmp, bin_path)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": CACHE_VERSION, "format": fmt, "source": str(path),
+                   "sections": layout}, f, indent=1)
+
+    cached = sorted(cache_dir.glob("*.bin"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in cached[MAX_CACHED:]:
+        old.unlink()
+        old.with_suffix(".json").unlink(missing_ok=True)
+    return bin_path, layout
+
+
+# ---------------------------------------------------------------------------
+# SaveState
+# ---------------------------------------------------------------------------
+
+class SaveState:
+    """Memory-mapped RAM (plus scratchpad / VRAM when the format has them).
+
+    Each section is its own read-only mmap, so state.ram slices to bytes and
+    supports find(), struct.unpack_from() and np.frombuffer() like the
+    bytes the scripts used to slice out of the decompressed state.
+    """
+
+    def __init__(self, path, cache_dir=CACHE_DIR):
+        self.path = Path(path)
+        size = self.path.stat().st_size
+        with open(self.path, 'rb') as f:
+            head = f.read(16)
+        self.format = detect_format(head, size)
+
+        if self.format == "raw":
+            mapped, layout = self.path, {"ram": (0, RAM_SIZE)}
+        else:
+            mapped, layout = _cached_sections(self.path, self.format, cache_dir)
+        with open(mapped, 'rb') as f:
+            self._sections = {name: mmap.mmap(f.fileno(), n, offset=off,
+                                              access=mmap.ACCESS_READ)
+                              for name, (off, n) in layout.items()}
+        self.ram = self._sections["ram"]
+
+    def close(self):
+        for section in self._sections.values():
+            section.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def sections(self):
+        return sorted(self._sections)
+
+    # -- typed access ----------------------------------------------------
+
+    def read(self, addr, length):
+        idx = ram_index(addr)
+        return bytes(self.ram[idx:idx + length])
+
+    def u8(self, addr):
+        return self.ram[ram_index(addr)]
+
+    def u16(self, addr):
+        return struct.unpack_from('<H', self.ram, ram_index(addr))[0]
+
+    def s16(self, addr):
+        return struct.unpack_from('<h', self.ram, ram_index(addr))[0]
+
+    def u32(self, addr):
+        return struct.unpack_from('<I', self.ram, ram_index(addr))[0]
+
+    def array(self, dtype=np.uint8, addr=0x80000000, count=-1):
+        """Read-only NumPy view of RAM from addr (no copy)."""
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self.ram, dtype=dtype, count=count,
+                             offset=ram_index(addr))
+
+    def words(self):
+        """RAM as a <u4 array (index = (addr & 0x1FFFFF) // 4)."""
+        return self.array('<u4')
+
+    # -- other memories --------------------------------------------------
+
+    @property
+    def scratchpad(self):
+        """1 KB scratchpad (0x1F800000-0x1F8003FF), or None."""
+        return self._sections.get("scratchpad")
+
+    def scratch_u32(self, addr):
+        return struct.unpack_from('<I', self.scratchpad, addr - SCRATCH_BASE)[0]
+
+    @property
+    def vram(self):
+        """VRAM as a (512, 1024) uint16 array, or None."""
+        data = self._sections.get("vram")
+        if data is None:
+            return None
+        return np.frombuffer(data, dtype='<u2').reshape(VRAM_HEIGHT, VRAM_WIDTH)
+
+
+def load(path, cache_dir=CACHE_DIR):
+    return SaveState(path, cache_dir)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return 1
+    addr = int(sys.argv[2], 0) if len(sys.argv) > 2 else None
+    length = int(sys.argv[3], 0) if len(sys.argv) > 3 else 0x100
+
+    with load(sys.argv[1]) as state:
+        print(f"{state.path.name}: {state.format}")
+        for name in state.sections:
+            print(f"  {name:<10} {len(state._sections[name]):>9,} bytes")
+        if addr is not None:
+            data = state.read(addr, length)
+            for row in range(0, len(data), 16):
+                print(f"  {addr + row:08X}  {data[row:row + 16].hex(' ').upper()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+test_mips_search.py
+Regression tests of tools/mips_search.py gaps (py -3 -m pytest tools).
+"""
+
+import struct
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from mips_search import addiu, gap, lui, parse_query, search, word
+
+A, B, C, X = 0x11111111, 0x22222222, 0x33333333, 0x44444444
+
+# lui t0,0x8005; addiu t1,t1,4; addiu t0,t0,0x490C
+LUI_ADDIU = [0x3C088005, 0x25290004, 0x2508490C]
+
+
+def _data(words):
+    return struct.pack("<{}I".format(len(words)), *words)
+
+
+def test_gap_capture_rejects_nearer_candidate():
+    query = [lui(rt='r', imm='hi'), gap(0, 4), addiu(rt='r', rs='r', imm='lo')]
+    matches = search(_data(LUI_ADDIU), query)
+    assert [(m.offset, m.offsets, m.fields) for m in matches] == \
+        [(0, (0, 8), {'r': 8, 'hi': 0x8005, 'lo': 0x490C})]
+
+
+def test_gap_capture_text_query():
+    query = parse_query("lui ?r,?hi; ...0-4; addiu ?r,?r,?lo")
+    matches = search(_data(LUI_ADDIU), query)
+    assert [m.offsets for m in matches] == [(0, 8)]
+
+
+def test_gap_later_term_rejects_nearer_candidate():
+    query = [word(A), gap(0, 4), word(B), word(C)]
+    matches = search(_data([A, B, X, B, C]), query)
+    assert [m.offsets for m in matches] == [(0, 12, 16)]
+
+
+def test_gap_every_distance_matches():
+    matches = search(_data([A, B, B]), [word(A), gap(0, 4), word(B)])
+    assert [m.offsets for m in matches] == [(0, 4), (0, 8)]
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+test_savestate.py
+DuckStation savestate decoding of tools/savestate.py (py -3 -m pytest tools).
+"""
+
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+import savestate
+from savestate import EXCEPTION_VECTOR, EXCEPTION_VECTOR_ADDR, RAM_SIZE
+
+
+def _ram():
+    ram = bytearray(RAM_SIZE)
+    ram[EXCEPTION_VECTOR_ADDR:EXCEPTION_VECTOR_ADDR + len(EXCEPTION_VECTOR)] = EXCEPTION_VECTOR
+    struct.pack_into('<I', ram, 0xF4A20, 0x12345678)
+    return bytes(ram)
+
+
+def _duckstation(version, compression, extra_fields):
+    """SAVE_STATE_HEADER (magic 0x43435544) + media name + data block."""
+    data = b'CPU state' * 40 + _ram() + b'GPU state' * 40
+    block = zlib.compress(data) if compression == 1 else data
+    media = b'Blaze & Blade.cue'
+    fields = 8 + extra_fields
+    header_size = 4 + 4 + 128 + 32 + 4 * fields + 16
+    # media filename len/offset, subimage, then screenshot fields (none)
+    middle = [len(media), header_size, 0] + [0] * (fields - 3)
+    header = struct.pack("<II128s32s", 0x43435544, version,
+                         b'Blaze & Blade - Eternal Quest', b'SLES-00845')
+    header += struct.pack("<{}I".format(fields), *middle)
+    header += struct.pack("<4I", compression, len(block), len(data),
+                          header_size + len(media))
+    assert len(header) == header_size
+    return header + media + block
+
+
+@pytest.mark.parametrize("version,compression,extra", [
+    (55, 1, 0),          # screenshot w/h/size/offset
+    (55, 0, 0),
+    (72, 1, 1),          # + screenshot compression fields
+])
+def test_duckstation(tmp_path, version, compression, extra):
+    path = tmp_path / "SLES-00845_1.sav"
+    path.write_bytes(_duckstation(version, compression, extra))
+    assert path.read_bytes()[:4] == b'DUCC'
+    with savestate.load(path, tmp_path / "cache") as state:
+        assert state.format == "duckstation"
+        assert state.u32(0x800F4A20) == 0x12345678
+        assert state.read(EXCEPTION_VECTOR_ADDR, 16) == EXCEPTION_VECTOR
+
+
+def test_duckstation_bad_header(tmp_path):
+    raw = _duckstation(72, 1, 1)
+    path = tmp_path / "broken.sav"
+    path.write_bytes(raw[:300])
+    with pytest.raises(ValueError):
+        savestate.load(path, tmp_path / "cache")
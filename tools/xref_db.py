@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+xref_db.py
+Cross-reference database of SLES_008.45 and the BLAZE.ALL overlay code.
+
+Questions like "who calls 0x80024F90", "which jalr go through the handler
+table 0x8003C1B0" or "who touches 0x8005490C" used to mean rerunning a
+scanning script (find_jal_callers, section8_comprehensive_jalr...). The
+indexer decodes every region once (tools/mips_disasm.py) and stores the
+references in SQLite:
+
+    output/xref.sqlite
+
+  kind        source                      target
+  call        jal                         called address
+  jump        j                           jump address
+  addr        lui + addiu/ori             materialized address
+  load/store  lui + load/store            absolute address read/written
+  table_load  lui + addu index + lw       table base (indexed table read)
+  icall       jalr fed by a table_load    table base
+  ijump       jr fed by a table_load      table base
+  table       table slot (SLES only)      code address stored in the slot
+
+Function ranges (tools/func_table.py) are stored per region in the same
+space as `source`, so every reference can be mapped to its function.
+
+source is a file offset in the region's file; `addr` is the RAM address of
+the source when the region's load address is known (SLES), else NULL (the
+BLAZE.ALL overlays are loaded at per-area addresses). Targets are absolute
+RAM addresses, valid for any load address.
+
+A region is re-indexed only when the SHA-1 of its file changes.
+
+Usage:
+  py -3 tools/xref_db.py [--rebuild] stats
+  py -3 tools/xref_db.py callers 0x80024F90
+  py -3 tools/xref_db.py refs 0x8005490C [--kind load]
+  py -3 tools/xref_db.py table 0x8003C1B0
+  py -3 tools/xref_db.py func 0x80024FA0 [--region SLES]
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from func_table import FunctionTable, functions_of
+from mips_disasm import LOAD_OPS, STORE_OPS, decode
+from mips_search import words_view
+
+TOOLS_DIR = Path(__file__).parent
+PROJECT_ROOT = TOOLS_DIR.parent
+EXTRACT_DIR = PROJECT_ROOT / "Blaze  Blade - Eternal Quest (Europe)" / "extract"
+DB_PATH = PROJECT_ROOT / "output" / "xref.sqlite"
+
+XREF_VERSION = 2
+
+# name: (file, RAM address of file_start or None, file_start, file_end or None)
+REGIONS = {
+    "SLES": (EXTRACT_DIR / "SLES_008.45", 0x80010000, 0x800, None),
+    "BLAZE": (EXTRACT_DIR / "BLAZE.ALL", None, 0x00900000, 0x02D00000),
+}
+
+RAM_START = 0x80000000
+RAM_END = 0x80200000              # 2 MB main RAM
+LUI_WINDOW = 10                   # words searched after a lui
+TABLE_MAX = 256                   # entries read from one code pointer table
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS regions (
+    name TEXT PRIMARY KEY, file TEXT, sha1 TEXT, base INTEGER,
+    file_start INTEGER, file_end INTEGER);
+CREATE TABLE IF NOT EXISTS xrefs (
+    region TEXT, source INTEGER, addr INTEGER, target INTEGER, kind TEXT);
+CREATE INDEX IF NOT EXISTS xrefs_target ON xrefs (target, kind);
+CREATE INDEX IF NOT EXISTS xrefs_source ON xrefs (region, source);
+CREATE INDEX IF NOT EXISTS xrefs_addr ON xrefs (addr);
+CREATE TABLE IF NOT EXISTS functions (region TEXT, start INTEGER, "end" INTEGER);
+CREATE INDEX IF NOT EXISTS functions_start ON functions (region, start);
+"""
+
+
+def _in_ram(values):
+    return (values >= RAM_START) & (values < RAM_END)
+
+
+def table_loads(d, window=LUI_WINDOW):
+    """Indexed table reads: lui r,hi / addu b,r,idx / lw v,lo(b).
+
+    Returns [(lw index, table base, loaded register)].
+    """
+    n = len(d)
+    lui_idx = np.flatnonzero((d.op == 0x0F) & (d.rt != 0))
+    reg = d.rt[lui_idx].astype(np.int16)
+    hi = d.imm[lui_idx] << 16
+    dest = d.dest()
+
+    # 1. addu b, r, idx (or idx, r) before r is overwritten
+    base_at = np.full(lui_idx.size, -1, dtype=np.int64)
+    alive = np.ones(lui_idx.size, dtype=bool)
+    for k in range(1, window + 1):
+        j = np.minimum(lui_idx + k, n - 1)
+        alive &= lui_idx + k < n
+        addu = (alive & (base_at < 0) & (d.op[j] == 0) & (d.funct[j] == 0x21)
+                & ((d.rs[j] == reg) | (d.rt[j] == reg)) & (d.rd[j] != 0))
+        base_at[addu] = j[addu]
+        alive &= dest[j] != reg
+
+    found = []
+    for m in np.flatnonzero(base_at >= 0).tolist():
+        b = int(d.rd[base_at[m]])
+        # 2. lw v, lo(b) before b is overwritten
+        for j in range(int(base_at[m]) + 1, min(int(base_at[m]) + window, n)):
+            if d.op[j] == 0x23 and d.rs[j] == b:
+                found.append((j, (int(hi[m]) + int(d.simm[j])) & 0xFFFFFFFF, int(d.rt[j])))
+                break
+            if dest[j] == b:
+                break
+    return found
+
+
+def region_xrefs(d, source_of, addr_of):
+    """[(source, addr, target, kind)] of a decoded region.
+
+    source_of(i) / addr_of(i): file offset / RAM address (or None) of word i.
+    """
+    rows = []
+    targets = d.targets()
+    for op, kind in ((0x03, "call"), (0x02, "jump")):
+        idx = np.flatnonzero((d.op == op) & _in_ram(targets))
+        rows += [(source_of(i), addr_of(i), int(targets[i]), kind) for i in idx.tolist()]
+
+    for j, (value, _) in d.lui_pairs(LUI_WINDOW).items():
+        if not RAM_START <= value < RAM_END:
+            continue
+        op = int(d.op[j])
+        kind = "load" if op in LOAD_OPS else "store" if op in STORE_OPS else "addr"
+        rows.append((source_of(j), addr_of(j), value, kind))
+
+    tables = []
+    for j, base, reg in table_loads(d):
+        if not RAM_START <= base < RAM_END:
+            continue
+        rows.append((source_of(j), addr_of(j), base, "table_load"))
+        # jr/jalr through the loaded register
+        for k in range(j + 1, min(j + 6, len(d))):
+            if d.op[k] == 0 and d.funct[k] in (0x08, 0x09) and d.rs[k] == reg:
+                rows.append((source_of(k), addr_of(k), base,
+                             "icall" if d.funct[k] == 0x09 else "ijump"))
+                tables.append(base)
+                break
+            if d.dest()[k] == reg:
+                break
+    return rows, sorted(set(tables))
+
+
+def table_entries(data, base_addr, file_start, code_end, table):
+    """[(slot offset, slot addr, entry)] of a code pointer table in data."""
+    off = table - base_addr + file_start
+    if off < file_start or off % 4:
+        return []
+    words = words_view(data, off, off + 4 * TABLE_MAX)
+    entries = []
+    for k, value in enumerate(words.tolist()):
+        if not (base_addr <= value < code_end and value % 4 == 0):
+            break
+        entries.append((off + 4 * k, table + 4 * k, value))
+    return entries
+
+
+def index_region(data, base_addr, file_start, file_end):
+    """All xref rows of one region: [(source, addr, target, kind)]."""
+    file_end = len(data) if file_end is None else min(file_end, len(data))
+    # Unknown load address: any KSEG0 base gives the right jal targets
+    d = decode(words_view(data, file_start, file_end),
+               base_addr if base_addr is not None else RAM_START)
+
+    def source_of(i):
+        return file_start + 4 * i
+
+    def addr_of(i):
+        return None if base_addr is None else base_addr + 4 * i
+
+    rows, tables = region_xrefs(d, source_of, addr_of)
+    if base_addr is not None:
+        code_end = base_addr + (file_end - file_start)
+        for table in tables:
+            for slot, slot_addr, entry in table_entries(data, base_addr, file_start,
+                                                        code_end, table):
+                rows.append((slot, slot_addr, entry, "table"))
+    return rows
+
+
+def region_functions(data, base_addr, file_start, file_end):
+    """FunctionTable of one region, addresses in the `source` space (file offsets)."""
+    if base_addr is None:
+        return functions_of(data, file_start, file_start, file_end, jal_targets=False)
+    # Build on RAM addresses (jal targets), then map back to file offsets
+    table = functions_of(data, base_addr, file_start, file_end)
+    shift = file_start - base_addr
+    return FunctionTable(table.starts + shift, table.ends + shift, table.prologues + shift)
+
+
+def _sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 22), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class XrefDB:
+    """SQLite xref index; update() re-indexes the regions whose file changed."""
+
+    def __init__(self, path=DB_PATH, regions=None):
+        self.path = Path(path)
+        self.regions = REGIONS if regions is None else regions
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(SCHEMA)
+        version = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if version is None or int(version[0]) != XREF_VERSION:
+            with self.conn:
+                self.conn.execute("DELETE FROM xrefs")
+                self.conn.execute("DELETE FROM functions")
+                self.conn.execute("DELETE FROM regions")
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)",
+                                  (str(XREF_VERSION),))
+
+    def update(self, rebuild=False):
+        """Index missing/changed regions. Returns the names re-indexed."""
+        done = []
+        for name, (file, base, start, end) in self.regions.items():
+            file = Path(file)
+            if not file.exists():
+                continue
+            sha1 = _sha1(file)
+            row = self.conn.execute("SELECT sha1 FROM regions WHERE name = ?",
+                                    (name,)).fetchone()
+            if row and row[0] == sha1 and not rebuild:
+                continue
+            data = file.read_bytes()
+            rows = index_region(data, base, start, end)
+            functions = region_functions(data, base, start, end)
+            with self.conn:
+                self.conn.execute("DELETE FROM xrefs WHERE region = ?", (name,))
+                self.conn.execute("DELETE FROM functions WHERE region = ?", (name,))
+                self.conn.executemany(
+                    "INSERT INTO xrefs VALUES (?, ?, ?, ?, ?)",
+                    [(name,) + r for r in rows])
+                self.conn.executemany(
+                    "INSERT INTO functions VALUES (?, ?, ?)",
+                    [(name, s, e) for s, e in functions])
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO regions VALUES (?, ?, ?, ?, ?, ?)",
+                    (name, str(file), sha1, base, start, end))
+            done.append(name)
+        return done
+
+    def refs(self, target, kind=None):
+        """[(region, source, addr, kind)] of the references to target."""
+        sql = "SELECT region, source, addr, kind FROM xrefs WHERE target = ?"
+        args = [target]
+        if kind:
+            sql += " AND kind = ?"
+            args.append(kind)
+        return self.conn.execute(sql + " ORDER BY region, source", args).fetchall()
+
+    def callers(self, target):
+        return self.refs(target, "call")
+
+    def table(self, base):
+        """Table slots and their targets, plus the sites reading the table."""
+        slots = self.conn.execute(
+            "SELECT source, addr, target FROM xrefs WHERE kind = 'table' "
+            "AND addr >= ? AND addr < ? ORDER BY addr",
+            (base, base + 4 * TABLE_MAX)).fetchall()
+        entries = []
+        for source, addr, target in slots:
+            if addr != base + 4 * len(entries):
+                break
+            entries.append((source, addr, target))
+        return entries, self.conn.execute(
+            "SELECT region, source, addr, kind FROM xrefs WHERE target = ? "
+            "AND kind IN ('table_load', 'icall', 'ijump') ORDER BY region, source",
+            (base,)).fetchall()
+
+    def function_of(self, region, source):
+        """(start, end) file offsets of the function containing source, or None."""
+        row = self.conn.execute(
+            'SELECT start, "end" FROM functions WHERE region = ? AND start <= ? '
+            'ORDER BY start DESC LIMIT 1', (region, source)).fetchone()
+        if row is None or source >= row[1]:
+            return None
+        return row
+
+    def function_table(self, region):
+        """FunctionTable of a region (file offsets) for bulk lookups."""
+        rows = self.conn.execute(
+            'SELECT start, "end" FROM functions WHERE region = ? ORDER BY start',
+            (region,)).fetchall()
+        return FunctionTable([r[0] for r in rows], [r[1] for r in rows], [])
+
+    def to_source(self, region, addr):
+        """File offset of a RAM address in a region with a known load address."""
+        row = self.conn.execute("SELECT base, file_start FROM regions WHERE name = ?",
+                                (region,)).fetchone()
+        if row is None or row[0] is None:
+            return addr
+        return addr - row[0] + row[1]
+
+    def stats(self):
+        return self.conn.execute(
+            "SELECT region, kind, COUNT(*) FROM xrefs GROUP BY region, kind "
+            "ORDER BY region, kind").fetchall()
+
+
+def _where(db, region, source, addr):
+    where = "{:<5} 0x{:08X}".format(region, source)
+    if addr is not None:
+        where += "  (0x{:08X})".format(addr)
+    func = db.function_of(region, source)
+    if func:
+        where += "  in 0x{:08X}+0x{:X}".format(
+            func[0] if addr is None else func[0] + addr - source, source - func[0])
+    return where
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SLES / BLAZE.ALL xref database")
+    parser.add_argument("--rebuild", action="store_true", help="Re-index every region")
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    parser.add_argument("command", choices=["stats", "callers", "refs", "table", "func"])
+    parser.add_argument("address", nargs="?", type=lambda v: int(v, 0))
+    parser.add_argument("--kind", default=None)
+    parser.add_argument("--region", default="SLES", help="Region of `func` (SLES, BLAZE)")
+    args = parser.parse_args()
+
+    db = XrefDB(args.db)
+    for name in db.update(args.rebuild):
+        print("[INDEX] {} re-indexed".format(name))
+
+    if args.command == "stats":
+        for region, kind, count in db.stats():
+            print("  {:<6} {:<11} {:>8}".format(region, kind, count))
+        return 0
+    if args.address is None:
+        print("[ERROR] {} needs an address".format(args.command))
+        return 1
+
+    if args.command == "func":
+        source = db.to_source(args.region, args.address)
+        func = db.function_of(args.region, source)
+        if func is None:
+            print("0x{:08X}: not in a function".format(args.address))
+        else:
+            shift = args.address - source
+            print("0x{:08X}: in 0x{:08X}-0x{:08X} (+0x{:X})".format(
+                args.address, func[0] + shift, func[1] + shift, source - func[0]))
+        return 0
+
+    if args.command == "table":
+        entries, users = db.table(args.address)
+        print("Table 0x{:08X}: {} entries".format(args.address, len(entries)))
+        for k, (_, addr, target) in enumerate(entries):
+            print("  [{:3d}] 0x{:08X} -> 0x{:08X}".format(k, addr, target))
+        for region, source, addr, kind in users:
+            print("  {:<10} {}".format(kind, _where(db, region, source, addr)))
+        return 0
+
+    rows = db.callers(args.address) if args.command == "callers" else \
+        db.refs(args.address, args.kind)
+    print("{} reference(s) to 0x{:08X}".format(len(rows), args.address))
+    for region, source, addr, kind in rows:
+        print("  {:<10} {}".format(kind, _where(db, region, source, addr)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())